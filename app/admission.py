@@ -0,0 +1,338 @@
+"""
+Admission control for the Gemini/Speech backed routes.
+
+Two checks run before a request is allowed to call out:
+- a per-client token bucket (by IP or session) for each route family,
+  rejected with 429 and Retry-After when the client is over its rate;
+  buckets live in memory or in a SQLite file that every worker on the host
+  shares, so the limit holds however many processes serve the app
+- a per-backend gate capping requests in flight, with a bounded FIFO wait
+  queue. A request that would not get a slot before its deadline (judged
+  from the queue ahead of it and recent service times) is shed at once
+  with 503 instead of waiting out its timeout.
+
+The gates sit in front of the per-call executors in backends.py: those
+bound concurrent SDK calls, these bound whole requests, so an overloaded
+process answers quickly instead of piling requests up on every thread.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from logs import HOT_PATH_SAMPLE, get_logger
+
+log = get_logger('admission')
+
+
+class RateLimited(Exception):
+    """Raised when a client is over its rate limit."""
+
+    def __init__(self, message, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed because its backend gate is full."""
+
+    def __init__(self, message, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ==========================================
+# TOKEN BUCKETS
+# ==========================================
+def _refill(tokens, updated, now, rate, burst):
+    return min(burst, tokens + max(0.0, now - updated) * rate)
+
+
+class MemoryBucketStore:
+    """Token buckets for one process; idle full buckets are dropped."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1.0):
+        """Takes cost tokens from key's bucket; returns seconds to wait, 0 when allowed."""
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = _refill(tokens, updated, now, rate, burst)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (cost - tokens) / rate
+            if len(self._buckets) > self.max_keys:
+                self._prune(now, rate, burst)
+        return wait
+
+    def _prune(self, now, rate, burst):
+        full = [k for k, (tokens, updated) in self._buckets.items() if _refill(tokens, updated, now, rate, burst) >= burst]
+        for key in full:
+            del self._buckets[key]
+
+
+class SQLiteBucketStore:
+    """Token buckets in a SQLite file, shared by every worker process on the host."""
+
+    def __init__(self, path: str, prune_every: int = 1000):
+        self.path = path
+        self.prune_every = prune_every
+        self._takes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1.0):
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE serializes the read-modify-write across processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE key = ?",
+                                         (key,)).fetchone()
+                tokens = _refill(row[0], row[1], now, rate, burst) if row else burst
+                wait = 0.0 if tokens >= cost else (cost - tokens) / rate
+                if not wait:
+                    tokens -= cost
+                self._conn.execute("INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                                   (key, tokens, now))
+                self._takes += 1
+                if self._takes % self.prune_every == 0:
+                    # A bucket untouched for burst/rate seconds is full again
+                    self._conn.execute("DELETE FROM rate_buckets WHERE updated_at < ?", (now - burst / rate,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+
+def make_bucket_store(url: str):
+    """Builds a bucket store from a URL: empty for in-process, or sqlite:///path/to/file.db."""
+    url = (url or '').strip()
+    if not url or url == 'memory://':
+        return MemoryBucketStore()
+    if url.startswith('sqlite:///'):
+        return SQLiteBucketStore(url[len('sqlite:///'):])
+    raise ValueError(f"Unsupported rate limit store: {url}")
+
+
+class RateLimiter:
+    """`per_minute` requests per client, with bursts of up to `burst`."""
+
+    def __init__(self, name: str, store, per_minute: float, burst: int = 1):
+        self.name = name
+        self.store = store
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, client: str, cost: float = 1.0):
+        """Raises RateLimited when client is over its rate."""
+        if self.rate <= 0:
+            return
+        wait = self.store.take(f"{self.name}:{client}", self.rate, self.burst, cost)
+        with self._lock:
+            if wait:
+                self.limited += 1
+            else:
+                self.allowed += 1
+        if wait:
+            raise RateLimited(f"Too many {self.name} requests; retry in {math.ceil(wait)}s", wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'per_minute': self.rate * 60, 'burst': self.burst,
+                    'allowed': self.allowed, 'limited': self.limited}
+
+
+# ==========================================
+# BACKEND GATES
+# ==========================================
+class AdmissionGate:
+    """
+    Admits up to max_in_flight requests at once; up to max_queue more wait
+    in FIFO order for at most max_wait seconds (or the request's own
+    deadline, if sooner).
+    """
+
+    def __init__(self, name: str, max_in_flight: int = 16, max_queue: int = 32,
+                 max_wait: float = 5.0, smoothing: float = 0.2):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self.in_flight = 0
+        self.service_time = 0.0  # moving average of how long a request holds a slot
+        self.admitted = 0
+        self.shed = {'queue_full': 0, 'deadline': 0, 'timeout': 0}
+
+    def expected_wait(self, position: int) -> float:
+        """Estimated seconds until the request at queue position `position` gets a slot."""
+        return (position + 1) * self.service_time / max(1, self.max_in_flight)
+
+    def acquire(self, deadline: float = None):
+        """Takes a slot, waiting in the queue if needed; raises Overloaded when shed."""
+        now = time.monotonic()
+        deadline = min(deadline, now + self.max_wait) if deadline is not None else now + self.max_wait
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+                self.admitted += 1
+                return
+            position = len(self._waiters)
+            if position >= self.max_queue:
+                raise self._shed('queue_full', position)
+            if now + self.expected_wait(position) > deadline:
+                raise self._shed('deadline', position)
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        if waiter.wait(max(0.0, deadline - now)):
+            return
+        with self._lock:
+            if waiter.is_set():  # handed a slot just as the wait ran out
+                return
+            self._waiters.remove(waiter)
+            raise self._shed('timeout', len(self._waiters))
+
+    def release(self, held: float = None):
+        """Frees a slot, handing it straight to the oldest waiter if there is one."""
+        with self._lock:
+            if held is not None:
+                self.service_time += self.smoothing * (held - self.service_time) if self.service_time else held
+            if self._waiters:
+                self.admitted += 1
+                self._waiters.popleft().set()
+            else:
+                self.in_flight -= 1
+
+    def _shed(self, reason: str, position: int) -> Overloaded:
+        self.shed[reason] += 1
+        retry_after = max(1.0, self.expected_wait(position))
+        log.info('admission.shed', sample=HOT_PATH_SAMPLE, gate=self.name, reason=reason, in_flight=self.in_flight,
+                    queued=len(self._waiters))
+        return Overloaded(f"{self.name} is overloaded ({reason.replace('_', ' ')}); retry in {math.ceil(retry_after)}s",
+                          retry_after)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'max_in_flight': self.max_in_flight,
+                'in_flight': self.in_flight,
+                'queued': len(self._waiters),
+                'max_queue': self.max_queue,
+                'service_time': round(self.service_time, 4),
+                'admitted': self.admitted,
+                'shed': dict(self.shed),
+            }
+
+
+class Admission:
+    """A request's hold on its gates; release() once the response is finished."""
+
+    def __init__(self, gates):
+        self._gates = gates
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        held = time.monotonic() - self._started
+        for gate in reversed(self._gates):
+            gate.release(held)
+
+
+class AdmissionController:
+    def __init__(self, limiters: dict, gates: dict, enabled: bool = True):
+        self.limiters = limiters
+        self.gates = gates
+        self.enabled = enabled
+
+    def admit(self, limit: str, client: str, backends=(), timeout: float = None) -> Admission:
+        """
+        Checks client against the `limit` rate limiter, then takes a slot on
+        each backend gate (in a fixed order, so requests needing several
+        never deadlock). timeout caps the wait for slots in seconds.
+        Raises RateLimited or Overloaded.
+        """
+        if not self.enabled:
+            return Admission([])
+        limiter = self.limiters.get(limit)
+        if limiter is not None:
+            limiter.check(client)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        held = []
+        try:
+            for name in sorted(backends):
+                gate = self.gates[name]
+                gate.acquire(deadline)
+                held.append(gate)
+        except Overloaded:
+            for gate in reversed(held):
+                gate.release()
+            raise
+        return Admission(held)
+
+    def stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'rate_limits': {name: limiter.stats() for name, limiter in self.limiters.items()},
+            'gates': {name: gate.stats() for name, gate in self.gates.items()},
+        }
+
+
+# route family -> (requests per minute, burst) per client
+DEFAULT_RATE_LIMITS = {
+    'chat': (30, 10),
+    'voice': (12, 4),
+}
+
+
+def admission_from_env(backend_limits: dict) -> AdmissionController:
+    """
+    Builds the controller from ADMISSION_* and RATE_LIMIT_* settings.
+    backend_limits maps backend name to its default in-flight cap.
+    """
+    store = make_bucket_store(os.environ.get("RATE_LIMIT_STORE", ""))
+    limiters = {}
+    for name, (per_minute, burst) in DEFAULT_RATE_LIMITS.items():
+        prefix = f"RATE_LIMIT_{name.upper()}_"
+        limiters[name] = RateLimiter(
+            name, store,
+            per_minute=float(os.environ.get(prefix + "PER_MINUTE", str(per_minute))),
+            burst=int(os.environ.get(prefix + "BURST", str(burst))),
+        )
+    gates = {}
+    for name, in_flight in backend_limits.items():
+        prefix = f"ADMISSION_{name.upper()}_"
+        in_flight = int(os.environ.get(prefix + "IN_FLIGHT", str(in_flight)))
+        gates[name] = AdmissionGate(
+            name,
+            max_in_flight=in_flight,
+            max_queue=int(os.environ.get(prefix + "QUEUE", str(2 * in_flight))),
+            max_wait=float(os.environ.get("ADMISSION_MAX_WAIT", "5")),
+        )
+    enabled = os.environ.get("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+    return AdmissionController(limiters, gates, enabled=enabled)
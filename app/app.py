@@ -2,81 +2,223 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
-import google.generativeai as genai
+
+# High-concurrency serving: ASYNC_MODE=gevent or eventlet must patch the
+# standard library before anything else opens sockets or starts threads.
+ASYNC_MODE = os.environ.get("ASYNC_MODE", "threading").lower()
+if ASYNC_MODE == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+elif ASYNC_MODE == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
+
 import requests
-from flask import Flask, render_template, request, jsonify
-from flask_socketio import SocketIO, emit
+import json
+import gzip
+import heapq
+import threading
+import click
+import functools
+import math
+import time
+import uuid
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g, make_response, send_file
+from flask_socketio import SocketIO, emit, join_room
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.date import DateTrigger
 from datetime import datetime, timedelta
-import smtplib
-from email.mime.text import MIMEText
-from twilio.rest import Client as TwilioClient
 from flask_cors import CORS
-from google.cloud import speech_v1p1beta1 as speech
-from google.cloud import texttospeech_v1 as texttospeech
-from google.oauth2 import service_account
-from pymongo import MongoClient
 from bson.objectid import ObjectId
-import certifi # Import certifi for SSL/TLS connections
+from clients import ClientRegistry
+from logs import configure_logging, get_logger, HOT_PATH_SAMPLE
+from metrics import registry as metrics, mongo_command_listener
+from session_store import session_store_from_env
+from chat_history import compactor_from_env, estimate_tokens, history_tokens
+from admission import admission_from_env, RateLimited, Overloaded
+from backends import run_blocking, submit_blocking, stream_blocking, backend_stats, BackendBusy, BackendTimeout, CompletedCall
+from voice_pipeline import split_sentences, synthesize_pipelined, StageTimer
+from tts_cache import tts_cache_from_env, cache_key
+from reminder_audio import ReminderAudioRenderer
+from notifications import NotificationDispatcher, SMTPConnectionPool, make_twilio_client
+from response_cache import response_cache_from_env
+from single_flight import SingleFlight
+from reminder_scheduler import ReminderScheduler, STATUS_PENDING, job_id_for, to_local_naive, apply_recurrence
+from reminder_workers import ReminderLeaseWorker, assign_shard, delivery_id_for
+from reminder_store import REMINDER_PROJECTION, NO_OWNER, assign_owner, ensure_reminder_indexes, find_reminders_page, serialize_reminder, encode_cursor, decode_cursor
+from hospital_lookup import HospitalLookup, PlacesClient
+from socket_queue import socketio_queue_options, start_local_broker
+from audio_ingest import audio_ingest_from_env, AudioTooLarge, UnsupportedAudio
+from assets import asset_pipeline_from_env, fetch_vendor as fetch_vendor_assets, IMMUTABLE, MIN_COMPRESS_BYTES
+from reminder_outbox import reminder_outbox_from_env
+from reminder_bulk import detect_format, iter_rows, import_reminders, find_reminders_for_export, export_rows, EXPORT_MIMETYPES
+
+# Structured logs (LOG_FORMAT=text|json, LOG_LEVEL, LOG_SAMPLE_RATE; see logs.py)
+configure_logging()
+log = get_logger('app')
 
 # ==========================================
 # FLASK INITIALIZATION
 # ==========================================
 app = Flask(__name__)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+
+# A message queue lets any process emit to clients connected to another one:
+# redis://... or local://host:port (see socket_queue.py)
+SOCKETIO_MESSAGE_QUEUE = os.environ.get("SOCKETIO_MESSAGE_QUEUE")
+if SOCKETIO_MESSAGE_QUEUE and os.environ.get("SOCKETIO_QUEUE_BROKER", "false").lower() in ("1", "true", "yes"):
+    start_local_broker(SOCKETIO_MESSAGE_QUEUE)
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE,
+                    **socketio_queue_options(SOCKETIO_MESSAGE_QUEUE))
+
+# ==========================================
+# METRICS (scraped from /metrics)
+# ==========================================
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    'healthmate_http_request_seconds', 'Time to produce a response, by route template.',
+    ('method', 'route', 'status'))
+REMINDER_LAG_SECONDS = metrics.histogram(
+    'healthmate_reminder_lag_seconds', 'Delay between a reminder\'s reminder_time and its delivery.',
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0))
+CHAT_PROMPT_TOKENS = metrics.histogram(
+    'healthmate_chat_prompt_tokens', 'Prompt tokens sent to Gemini per turn (history plus message).',
+    ('channel',), buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000))
+CHAT_TURN_SECONDS = metrics.histogram(
+    'healthmate_chat_turn_seconds', 'Gemini time per chat turn, until the whole reply arrived.', ('channel',))
+VOICE_STAGE_SECONDS = metrics.histogram(
+    'healthmate_voice_stage_seconds', 'Time from the start of a voice request until each stage finished.',
+    ('route', 'stage'))
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _observe_request(response):
+    # Streaming responses are timed until the response object is returned
+    started = g.pop('request_started', None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, route=route, status=response.status_code)
+        log.info('http.request', sample=HOT_PATH_SAMPLE, method=request.method, route=route,
+                 status=response.status_code, ms=round(elapsed * 1000, 1))
+    return response
+
+# ==========================================
+# EXTERNAL CLIENTS
+# ==========================================
+# SDKs are imported and clients created on first use, or warmed in
+# parallel in the background at startup (see clients.py)
+clients = ClientRegistry(retry_after=float(os.environ.get("CLIENT_RETRY_AFTER", "30")))
+REQUIRED_BACKENDS = {name.strip() for name in os.environ.get("REQUIRED_BACKENDS", "gemini,mongo").split(",")}
 
 # ==========================================
 # GEMINI API CONFIGURATION
 # ==========================================
-try:
-    GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-    GOOGLE_CLOUD_PROJECT_ID = os.environ.get("GOOGLE_CLOUD_PROJECT_ID")
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+GOOGLE_CLOUD_PROJECT_ID = os.environ.get("GOOGLE_CLOUD_PROJECT_ID")
+
+
+def _create_gemini_model():
+    import google.generativeai as genai
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai.GenerativeModel('gemini-2.5-flash')
 
-    if GEMINI_API_KEY:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        print("✓ Gemini API configured successfully")
-    else:
-        print("⚠ GEMINI_API_KEY not found in environment variables")
-        model = None
-except Exception as e:
-    print(f"✗ Error configuring Gemini API: {e}")
-    model = None
+
+clients.register('gemini', _create_gemini_model, enabled=bool(GEMINI_API_KEY),
+                 required='gemini' in REQUIRED_BACKENDS)
+if not GEMINI_API_KEY:
+    log.warning('config.missing', setting='GEMINI_API_KEY')
+
+
+def get_model():
+    return clients.get('gemini')
 
 # ==========================================
 # GLOBAL VARIABLES
 # ==========================================
-chat_sessions = {}
+def _summarize_history(prompt: str) -> str:
+    return run_blocking('gemini', get_model().generate_content, prompt).text
+
+
+# Bounded LRU/TTL store of Gemini chat sessions (see session_store.py); past
+# CHAT_SESSION_TOKEN_BUDGET older turns are summarized (see chat_history.py)
+chat_sessions = session_store_from_env(lambda history: get_model().start_chat(history=history),
+                                       compactor=compactor_from_env(_summarize_history))
+# Optional cache of first-turn answers to frequent questions (RESPONSE_CACHE=true)
+response_cache = response_cache_from_env()
+
+# Identical first-turn questions in flight at the same time share one Gemini
+# call (see single_flight.py); SINGLE_FLIGHT=false sends each one upstream
+SINGLE_FLIGHT = os.environ.get("SINGLE_FLIGHT", "true").lower() in ("1", "true", "yes")
+chat_flights = SingleFlight('chat', timeout=60.0, enabled=SINGLE_FLIGHT)
 GOOGLE_PLACES_API_KEY = os.environ.get("GOOGLE_PLACES_API_KEY")
+# Stream Gemini replies token-by-token (SSE on /chat, events on Socket.IO)
+CHAT_STREAMING = os.environ.get("CHAT_STREAMING", "false").lower() in ("1", "true", "yes")
 
 # ==========================================
 # MONGODB CONFIGURATION
 # ==========================================
 MONGO_URI = os.environ.get("MONGO_URI")
-mongo_client = None
-db = None
 
-if MONGO_URI:
+
+def _connect_mongo():
+    from pymongo import MongoClient
+    import certifi # Import certifi for SSL/TLS connections
+
+    # For cloud-hosted MongoDB with SSL/TLS
+    mongo_client = MongoClient(MONGO_URI, tlsAllowInvalidCertificates=False, tlsCAFile=certifi.where(),
+                               event_listeners=[mongo_command_listener()])
     try:
-        # For cloud-hosted MongoDB with SSL/TLS
-        mongo_client = MongoClient(MONGO_URI, tlsAllowInvalidCertificates=False, tlsCAFile=certifi.where())
-        db = mongo_client.health_assistant_db # Or your preferred database name
-        db.reminders.create_index("reminder_time")
-        print("✓ MongoDB connected successfully")
-    except Exception as e:
-        print(f"✗ Error connecting to MongoDB: {e}")
-        mongo_client = None
-        db = None
-else:
-    print("⚠ MONGO_URI not found in environment variables. MongoDB will not be available.")
+        database = mongo_client.health_assistant_db # Or your preferred database name
+        database.reminders.create_index("reminder_time")
+        ensure_reminder_indexes(database.reminders)
+    except Exception:
+        # The registry retries with a new client; don't leave this one's pool and monitors running
+        mongo_client.close()
+        raise
+    return database
+
+
+# The reminder scheduler is created once MongoDB is reachable (see _on_mongo_ready)
+clients.register('mongo', _connect_mongo, enabled=bool(MONGO_URI), required='mongo' in REQUIRED_BACKENDS,
+                 check=lambda database: database.client.admin.command('ping'),
+                 on_ready=lambda database: _on_mongo_ready())
+if not MONGO_URI:
+    log.warning('config.missing', setting='MONGO_URI', effect='MongoDB will not be available')
+
+
+def get_db():
+    return clients.get('mongo')
+
+REMINDER_PAGE_SIZE = int(os.environ.get("REMINDER_PAGE_SIZE", "50"))
+REMINDER_MAX_PAGE_SIZE = 500
+# Rows per insert_many call for bulk imports
+REMINDER_IMPORT_CHUNK = int(os.environ.get("REMINDER_IMPORT_CHUNK", "1000"))
 
 # ==========================================
 # BACKGROUND SCHEDULER
 # ==========================================
 scheduler = BackgroundScheduler()
 
+# Reminders live in db.reminders; only the next window is held as in-memory jobs
+REMINDER_HORIZON = float(os.environ.get("REMINDER_HORIZON", "3600"))
+REMINDER_REFILL_INTERVAL = float(os.environ.get("REMINDER_REFILL_INTERVAL", "300"))
+REMINDER_MISFIRE_GRACE = float(os.environ.get("REMINDER_MISFIRE_GRACE", "300"))
+reminder_scheduler = None
+
+# REMINDER_FIRING=lease lets several replicas share reminders: each one
+# leases due reminders from MongoDB instead of holding in-memory timers
+REMINDER_FIRING = os.environ.get("REMINDER_FIRING", "local").lower()
+REMINDER_WORKER_INDEX = int(os.environ.get("REMINDER_WORKER_INDEX", "0"))
+REMINDER_WORKER_COUNT = int(os.environ.get("REMINDER_WORKER_COUNT", "1"))
+REMINDER_LEASE_SECONDS = float(os.environ.get("REMINDER_LEASE_SECONDS", "60"))
+REMINDER_POLL_INTERVAL = float(os.environ.get("REMINDER_POLL_INTERVAL", "1"))
+REMINDER_TAKEOVER_AFTER = float(os.environ.get("REMINDER_TAKEOVER_AFTER", "30"))
+reminder_worker = None
+
 # ==========================================
 # TWILIO CONFIGURATION
 # ==========================================
@@ -92,24 +234,153 @@ SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
 SMTP_USER = os.environ.get("SMTP_USER")
 SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD")
 SMTP_FROM_EMAIL = os.environ.get("SMTP_FROM_EMAIL") or SMTP_USER
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes")
+
+# ==========================================
+# NOTIFICATION DISPATCHER
+# ==========================================
+# One shared Twilio client and a pool of logged-in SMTP connections,
+# fed by per-channel queues with rate limits and retries
+TWILIO_CONFIGURED = bool(TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_FROM_NUMBER)
+clients.register('twilio', lambda: make_twilio_client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN,
+                                                      base_url=os.environ.get("TWILIO_API_BASE")),
+                 enabled=TWILIO_CONFIGURED, required='twilio' in REQUIRED_BACKENDS)
+twilio_client = clients.proxy('twilio') if TWILIO_CONFIGURED else None
+
+smtp_pool = None
+if SMTP_HOST and SMTP_PORT and SMTP_USER and SMTP_PASSWORD and SMTP_FROM_EMAIL:
+    smtp_pool = SMTPConnectionPool(
+        SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD,
+        size=int(os.environ.get("SMTP_POOL_SIZE", "2")),
+        starttls=SMTP_STARTTLS,
+    )
+
+notifier = NotificationDispatcher(
+    twilio_client=twilio_client,
+    twilio_from=TWILIO_FROM_NUMBER,
+    smtp_pool=smtp_pool,
+    smtp_from=SMTP_FROM_EMAIL,
+    sms_rate=float(os.environ.get("SMS_RATE_LIMIT", "10")),
+    email_rate=float(os.environ.get("EMAIL_RATE_LIMIT", "20")),
+    email_workers=int(os.environ.get("SMTP_POOL_SIZE", "2")),
+)
 
 # ==========================================
 # GOOGLE CLOUD SPEECH/TTS
 # ==========================================
-speech_client = None
-tts_client = None
 GOOGLE_APPLICATION_CREDENTIALS = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+GOOGLE_CLOUD_CONFIGURED = bool(GOOGLE_APPLICATION_CREDENTIALS and GOOGLE_CLOUD_PROJECT_ID)
+
+
+def _google_credentials():
+    from google.oauth2 import service_account
+    return service_account.Credentials.from_service_account_file(GOOGLE_APPLICATION_CREDENTIALS)
+
+
+def _create_speech_client():
+    from google.cloud import speech_v1p1beta1 as speech
+    return speech.SpeechClient(credentials=_google_credentials())
+
+
+def _create_tts_client():
+    from google.cloud import texttospeech_v1 as texttospeech
+    return texttospeech.TextToSpeechClient(credentials=_google_credentials())
 
-if GOOGLE_APPLICATION_CREDENTIALS and GOOGLE_CLOUD_PROJECT_ID:
+
+clients.register('speech', _create_speech_client, enabled=GOOGLE_CLOUD_CONFIGURED,
+                 required='speech' in REQUIRED_BACKENDS)
+clients.register('tts', _create_tts_client, enabled=GOOGLE_CLOUD_CONFIGURED,
+                 required='tts' in REQUIRED_BACKENDS)
+if not GOOGLE_CLOUD_CONFIGURED:
+    log.warning('config.missing', setting='GOOGLE_APPLICATION_CREDENTIALS or GOOGLE_CLOUD_PROJECT_ID')
+
+
+def get_speech_client():
+    return clients.get('speech')
+
+
+def get_tts_client():
+    return clients.get('tts')
+
+# Synthesized speech cache (memory LRU in front of an mmap-backed disk tier)
+TTS_LANGUAGE_CODE = "en-US"
+TTS_VOICE_NAME = "en-US-Standard-C"
+TTS_ENCODING = "MP3"
+tts_cache = tts_cache_from_env()
+# Concurrent misses for the same text and voice share one synthesis
+tts_flights = SingleFlight('tts', timeout=30.0, enabled=SINGLE_FLIGHT)
+
+# Phrases synthesized ahead of time by warm_tts_cache()
+TTS_WARMUP_PHRASES = [
+    "Hello! I'm your AI Health Assistant. How can I help you today?",
+    "I'm not a doctor. For a medical emergency, please call your local emergency number right away.",
+    "Sorry, I didn't catch that. Could you please say it again?",
+]
+
+# ==========================================
+# ADMISSION CONTROL
+# ==========================================
+# Per-client rate limits for chat and voice, and a cap on requests in flight
+# per backend with a bounded wait queue (see admission.py)
+RATE_LIMIT_BY = os.environ.get("RATE_LIMIT_BY", "ip").lower()
+admission = admission_from_env(
+    {name: s['max_concurrency'] for name, s in backend_stats().items() if name in ('gemini', 'speech')})
+
+
+def _client_key() -> str:
+    """Who a rate limit applies to: the session with RATE_LIMIT_BY=session, else the client IP."""
+    if RATE_LIMIT_BY == 'session':
+        session_id = request.headers.get('X-Session-Id')
+        if not session_id and request.is_json:
+            session_id = (request.get_json(silent=True) or {}).get('session_id')
+        if session_id:
+            return f"session:{str(session_id)[:128]}"
+    return f"ip:{request.remote_addr}"
+
+
+def _request_timeout():
+    """The client's own time budget in seconds (X-Request-Timeout), if it sent one."""
     try:
-        credentials = service_account.Credentials.from_service_account_file(GOOGLE_APPLICATION_CREDENTIALS)
-        speech_client = speech.SpeechClient(credentials=credentials)
-        tts_client = texttospeech.TextToSpeechClient(credentials=credentials)
-        print("✓ Google Cloud Speech & Text-to-Speech clients initialized.")
-    except Exception as e:
-        print(f"✗ Error initializing Google Cloud clients: {e}")
-else:
-    print("⚠ GOOGLE_APPLICATION_CREDENTIALS or GOOGLE_CLOUD_PROJECT_ID not set")
+        timeout = float(request.headers.get('X-Request-Timeout', ''))
+    except ValueError:
+        return None
+    return timeout if timeout > 0 else None
+
+
+def _admission_error(e, status):
+    response = jsonify({'error': str(e), 'success': False})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+    return response
+
+
+def admission_controlled(limit, *backends):
+    """
+    Route decorator: rate limits the client for `limit` and holds a slot on
+    each backend gate until the response (streamed or not) is finished.
+    Over the rate limit gets 429, a shed request 503, both with Retry-After.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(*args, **kwargs):
+            try:
+                ticket = admission.admit(limit, _client_key(), backends, timeout=_request_timeout())
+            except RateLimited as e:
+                return _admission_error(e, 429)
+            except Overloaded as e:
+                return _admission_error(e, 503)
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                ticket.release()
+                raise
+            if response.is_streamed:
+                response.call_on_close(ticket.release)
+            else:
+                ticket.release()
+            return response
+        return wrapped
+    return decorator
 
 # ==========================================
 # HELPER FUNCTIONS
@@ -136,60 +407,190 @@ def _parse_reminder_time(reminder_time: str) -> datetime:
 
 
 def _send_sms_if_configured(to_number: str, message: str) -> bool:
+    """Queues an SMS on the notification dispatcher."""
     if not to_number:
         return False
-    if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_FROM_NUMBER):
-        print("Twilio not configured; skipping SMS")
-        return False
-    try:
-        client = TwilioClient(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        client.messages.create(to=to_number, from_=TWILIO_FROM_NUMBER, body=message)
-        print(f"✓ SMS sent to {to_number}")
-        return True
-    except Exception as e:
-        print(f"✗ SMS send error: {e}")
+    if notifier.twilio_client is None:
+        log.warning('notification.skipped', channel='sms', reason='Twilio not configured')
         return False
+    notifier.start()
+    return notifier.send_sms(to_number, message)
 
 
 def _send_email_if_configured(to_email: str, subject: str, body: str) -> bool:
+    """Queues an email on the notification dispatcher."""
     if not to_email:
         return False
-    if not (SMTP_HOST and SMTP_PORT and SMTP_USER and SMTP_PASSWORD and SMTP_FROM_EMAIL):
-        print("SMTP not configured; skipping email")
+    if notifier.smtp_pool is None:
+        log.warning('notification.skipped', channel='email', reason='SMTP not configured')
         return False
+    notifier.start()
+    return notifier.send_email(to_email, subject, body)
+
+
+def _reminder_text(medicine_name) -> str:
+    return f"⏰ Medicine Reminder: Take {medicine_name}"
+
+
+def owner_room(owner) -> str:
+    return f"owner:{owner}"
+
+
+# Only what the browser needs to show the alarm; no phone or email
+REMINDER_EVENT_FIELDS = ('_id', 'medicine_name', 'reminder_time', 'recurrence')
+
+
+def _reminder_audio_key(text) -> str:
+    return cache_key(text, TTS_VOICE_NAME, TTS_LANGUAGE_CODE, TTS_ENCODING)
+
+
+def _render_reminder_clip(text):
+    if get_tts_client() is None:
+        return None
+    return synthesize_speech_gcs(text)
+
+
+# Spoken reminder clips rendered in the background as reminders are created
+# (see reminder_audio.py); REMINDER_AUDIO=false leaves reminders with the alarm only
+reminder_audio = None
+if os.environ.get("REMINDER_AUDIO", "true").lower() in ("1", "true", "yes"):
+    reminder_audio = ReminderAudioRenderer(
+        _render_reminder_clip, _reminder_text, _reminder_audio_key, tts_cache.contains,
+        workers=int(os.environ.get("REMINDER_AUDIO_WORKERS", "4")),
+    )
+
+
+def deliver_reminder(reminder: dict, delivery_id: str):
+    """
+    Sends one due occurrence by SMS, email and to the owner's Socket.IO room.
+    Reminders without an owner (created before owners, or without one) are
+    broadcast to every client, as all reminders used to be.
+    """
+    due = reminder.get('reminder_time')
+    if isinstance(due, datetime):
+        REMINDER_LAG_SECONDS.observe(max(0.0, (datetime.now() - due).total_seconds()))
+    rem = serialize_reminder(reminder)
+    text = _reminder_text(rem.get('medicine_name'))
+    _send_sms_if_configured(rem.get('phone'), text)
+    _send_email_if_configured(rem.get('email'), "Medicine Reminder", text)
+    event = {'reminder': {k: rem.get(k) for k in REMINDER_EVENT_FIELDS}, 'delivery_id': delivery_id}
+    if reminder_audio is not None and rem.get('audio_key'):
+        # Rendered on request if this process has not got the clip (see reminder_audio_clip)
+        event['audio_url'] = f"/api/reminders/audio/{rem['audio_key']}"
+    room = owner_room(rem['owner']) if rem.get('owner') else None
+    if room is None:
+        log.warning('reminder.no_owner', reminder_id=rem.get('_id'), effect='broadcast to all clients')
+    with app.app_context():
+        # delivery_id lets clients drop a repeated delivery of the same occurrence
+        socketio.emit('reminder_due', event, to=room)
+    log.info('reminder.delivered', reminder_id=rem.get('_id'), delivery_id=delivery_id, due=rem.get('reminder_time'))
+
+
+def fire_reminder(reminder_id):
+    """Sends a due reminder; the status flip makes sure it goes out only once."""
+    reminder = reminder_scheduler.claim(reminder_id)
+    if reminder is None:
+        return  # deleted, or already sent before a restart
+    deliver_reminder(reminder, delivery_id_for(reminder))
+
+
+def init_reminder_scheduler():
+    """Creates the reminder scheduler (or, with REMINDER_FIRING=lease, the lease worker) on top of db.reminders."""
+    global reminder_scheduler, reminder_worker
+    db = get_db()
+    if db is None:
+        return None
+    if REMINDER_FIRING == 'lease':
+        reminder_worker = ReminderLeaseWorker(
+            db.reminders,
+            db.reminder_deliveries,
+            db.scheduler_leases,
+            deliver_reminder,
+            worker_index=REMINDER_WORKER_INDEX,
+            worker_count=REMINDER_WORKER_COUNT,
+            lease_seconds=REMINDER_LEASE_SECONDS,
+            poll_interval=REMINDER_POLL_INTERVAL,
+            misfire_grace=REMINDER_MISFIRE_GRACE,
+            takeover_after=REMINDER_TAKEOVER_AFTER,
+        )
+        try:
+            reminder_worker.ensure_indexes()
+        except Exception as e:
+            log.error('reminder.indexes_failed', error=str(e))
+        return reminder_worker
+
+    reminder_scheduler = ReminderScheduler(
+        scheduler,
+        db.reminders,
+        fire_reminder,
+        horizon=REMINDER_HORIZON,
+        refill_interval=REMINDER_REFILL_INTERVAL,
+        misfire_grace=REMINDER_MISFIRE_GRACE,
+    )
     try:
-        msg = MIMEText(body)
-        msg['Subject'] = subject
-        msg['From'] = SMTP_FROM_EMAIL
-        msg['To'] = to_email
-
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=15) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.send_message(msg)
-        print(f"✓ Email sent to {to_email}")
-        return True
+        reminder_scheduler.ensure_indexes()
     except Exception as e:
-        print(f"✗ Email send error: {e}")
-        return False
+        log.error('reminder.indexes_failed', error=str(e))
+    return reminder_scheduler
 
 
 def schedule_reminder_job(reminder: dict) -> str:
     """Schedules reminder notification."""
-    due_dt = _parse_reminder_time(str(reminder['reminder_time']))
+    if reminder_worker is not None:
+        return job_id_for(reminder['_id'])  # lease workers pick it up from MongoDB
+    if reminder_scheduler is None:
+        raise RuntimeError("Reminder scheduler not available (MongoDB not connected)")
+    if reminder_scheduler.schedule(reminder):
+        log.info('reminder.scheduled', reminder_id=reminder['_id'], due=reminder['reminder_time'])
+    return job_id_for(reminder['_id'])
+
+
+_reminder_engine_lock = threading.Lock()
+_reminder_engine_started = False
+
 
-    def _job_action(rem=reminder):
-        text = f"⏰ Medicine Reminder: Take {rem.get('medicine_name')}"
-        _send_sms_if_configured(rem.get('phone'), text)
-        _send_email_if_configured(rem.get('email'), "Medicine Reminder", text)
-        with app.app_context():
-            socketio.emit('reminder_due', {'reminder': rem})
-        print(f"Reminder triggered for {rem.get('medicine_name')} at {datetime.now()}")
+def start_reminder_engine():
+    """Starts firing reminders once both the scheduler and MongoDB are up."""
+    global _reminder_engine_started
+    with _reminder_engine_lock:
+        if _reminder_engine_started or not scheduler.running:
+            return
+        if reminder_scheduler is not None:
+            loaded = reminder_scheduler.start()
+            log.info('reminder.rehydrated', count=loaded)
+        elif reminder_worker is not None:
+            reminder_worker.start()
+            log.info('reminder.worker_started', worker_id=reminder_worker.worker_id)
+        else:
+            return
+        _reminder_engine_started = True
 
-    trigger = DateTrigger(run_date=due_dt)
-    job = scheduler.add_job(_job_action, trigger=trigger, id=f"reminder-{reminder['_id']}")
-    print(f"✓ Scheduled reminder for {due_dt}")
-    return job.id
+
+def _schedule_flushed(reminders):
+    """Schedules reminders the outbox has just written to MongoDB."""
+    for reminder in reminders:
+        reminder['_id'] = str(reminder['_id'])
+        try:
+            schedule_reminder_job(reminder)
+        except RuntimeError:
+            return  # no scheduler yet; its first refill picks these up from MongoDB
+
+
+def _reminders_collection():
+    db = get_db()
+    return db.reminders if db is not None else None
+
+
+# Write-behind: REMINDER_OUTBOX=sqlite:///path acknowledges new reminders once
+# they are in a local outbox and writes them to MongoDB in batches (see reminder_outbox.py)
+reminder_outbox = reminder_outbox_from_env(_reminders_collection, on_flushed=_schedule_flushed)
+
+
+def _on_mongo_ready():
+    init_reminder_scheduler()
+    start_reminder_engine()
+    if reminder_outbox is not None:
+        reminder_outbox.start()  # flushes whatever was accepted while MongoDB was away
 
 # ==========================================
 # ROUTES - FRONTEND PAGES
@@ -200,7 +601,7 @@ def index():
 
 @app.route('/chatbot')
 def chatbot():
-    return render_template('chatbot.html')
+    return render_template('chatbot.html', CHAT_STREAMING=CHAT_STREAMING)
 
 @app.route('/reminders')
 def reminders_page():
@@ -210,10 +611,224 @@ def reminders_page():
 def hospitals_page():
     return render_template('hospitals.html', GOOGLE_MAPS_API_KEY=os.environ.get("GOOGLE_MAPS_API_KEY"))
 
+# ==========================================
+# STATIC ASSETS
+# ==========================================
+# Minified, content-hashed and pre-compressed copies of static/ (see
+# assets.py), built at startup; pages link them with asset_url()
+assets = asset_pipeline_from_env(app.static_folder)
+if assets.enabled:
+    try:
+        assets.build()
+    except OSError as e:
+        log.warning('assets.build_skipped', error=str(e), build_dir=assets.build_dir)
+        assets.enabled = False
+app.jinja_env.globals['asset_url'] = assets.url
+
+
+@app.after_request
+def _compress_page(response):
+    """Gzips rendered pages; their inline CSS and scripts are most of what a navigation downloads."""
+    if (not assets.enabled or response.mimetype != 'text/html' or response.direct_passthrough
+            or response.status_code != 200 or 'Content-Encoding' in response.headers
+            or request.accept_encodings.quality('gzip') <= 0):
+        return response
+    body = response.get_data()
+    if len(body) >= MIN_COMPRESS_BYTES:
+        response.set_data(gzip.compress(body, 6))
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@app.route('/assets/<path:filename>')
+def fingerprinted_asset(filename):
+    """Serves a built asset; its URL changes with its content, so it may be cached forever."""
+    asset = assets.lookup(filename)
+    if asset is None:
+        return jsonify({'error': 'Unknown asset', 'success': False}), 404
+    path, encoding = assets.choose(asset, request.accept_encodings)
+    etag = f"{asset.digest}-{encoding}" if encoding else asset.digest
+    response = send_file(path, mimetype=asset.mimetype, etag=etag, conditional=True)
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+@app.cli.command('build-assets')
+@click.option('--fetch-vendor', is_flag=True, help='Download vendored files (e.g. the Socket.IO client) first')
+def build_assets_command(fetch_vendor):
+    """Builds the fingerprinted, pre-compressed assets into ASSET_BUILD_DIR."""
+    if fetch_vendor:
+        for name in fetch_vendor_assets(app.static_folder):
+            click.echo(f"✓ Fetched {name}")
+    for name, entry in assets.build().items():
+        sizes = ', '.join(f"{enc} {size}" for enc, size in entry['encodings'].items())
+        click.echo(f"✓ {name} -> {entry['file']} ({entry['source_size']} -> {entry['size']} bytes"
+                   f"{'; ' + sizes if sizes else ''})")
+
 # ==========================================
 # ROUTES - CHATBOT
 # ==========================================
+def _record_first_turn(session_id, chat, user_message, reply):
+    """Records a reply Gemini was not asked for on this session as if it had answered."""
+    chat.history = [
+        {'role': 'user', 'parts': [user_message]},
+        {'role': 'model', 'parts': [reply]},
+    ]
+    chat_sessions.save(session_id)
+
+
+def _cached_first_turn(session_id, chat, user_message):
+    """
+    Returns a cached reply for the first message of a session, or None.
+
+    A hit is recorded in the session history as if Gemini had answered,
+    so follow-up questions keep their context.
+    """
+    if response_cache is None or chat.history:
+        return None
+    reply = response_cache.get(user_message)
+    if reply is None:
+        return None
+    _record_first_turn(session_id, chat, user_message, reply)
+    return reply
+
+
+def _record_turn(session_id, history, user_message, seconds, response=None):
+    """Records prompt size and Gemini time for one turn; Gemini's own count is used when it reports one."""
+    usage = getattr(response, 'usage_metadata', None)
+    prompt_tokens = getattr(usage, 'prompt_token_count', None) or \
+        history_tokens(history) + estimate_tokens(user_message)
+    channel = 'voice' if session_id.startswith('voice:') else 'chat'
+    CHAT_PROMPT_TOKENS.observe(prompt_tokens, channel=channel)
+    CHAT_TURN_SECONDS.observe(seconds, channel=channel)
+    log.info('chat.turn', sample=HOT_PATH_SAMPLE, channel=channel, prompt_tokens=prompt_tokens,
+             history_messages=len(history), ms=round(seconds * 1000, 1))
+
+
+def _scratch_chat(history):
+    """
+    A chat on a copy of the session history for one Gemini call. A call that
+    times out keeps running on the pool, and can then only add its turn to
+    this copy, not to the session whose user was told it failed.
+    """
+    return chat_sessions.factory(list(history))
+
+
+def _commit_turn(chat, history, scratch):
+    """Appends the turn a finished call added to its scratch chat onto the session."""
+    chat.history = list(chat.history) + list(scratch.history)[len(history):]
+
+
+def send_chat_message(session_id, user_message) -> str:
+    """
+    Sends a message on a session and returns the full reply text. A first
+    turn asked by several sessions at once goes to Gemini once.
+    """
+    chat = chat_sessions.get_or_create(session_id)
+    cached = _cached_first_turn(session_id, chat, user_message)
+    if cached is not None:
+        return cached
+
+    history = list(chat.history)
+    first_turn = not history
+
+    def _ask():
+        started = time.perf_counter()
+        scratch = _scratch_chat(history)
+        response = run_blocking('gemini', scratch.send_message, user_message)
+        _commit_turn(chat, history, scratch)
+        _record_turn(session_id, history, user_message, time.perf_counter() - started, response)
+        return response.text
+
+    if not first_turn:
+        reply = _ask()
+        chat_sessions.save(session_id)
+        return reply
+
+    reply = chat_flights.do(user_message, _ask)
+    if chat.history:
+        chat_sessions.save(session_id)
+        if response_cache is not None:
+            response_cache.put(user_message, reply)
+    else:
+        # Another session asked Gemini; this one shares its answer
+        _record_first_turn(session_id, chat, user_message, reply)
+    return reply
+
+
+def stream_chat_reply(session_id, user_message):
+    """
+    Yields the Gemini reply text chunk by chunk as it is generated. A first
+    turn already being asked by another session is answered with its reply
+    in one chunk once that arrives.
+    """
+    chat = chat_sessions.get_or_create(session_id)
+    cached = _cached_first_turn(session_id, chat, user_message)
+    if cached is not None:
+        yield cached
+        return
+
+    history = list(chat.history)
+    first_turn = not history
+    flight = None
+    if first_turn and chat_flights.enabled:
+        flight, leader = chat_flights.join(user_message)
+        if not leader:
+            reply = flight.wait(chat_flights.timeout)
+            _record_first_turn(session_id, chat, user_message, reply)
+            yield reply
+            return
+
+    parts = []
+    try:
+        started = time.perf_counter()
+        response = None
+        scratch = _scratch_chat(history)
+        # Chunks are pulled on the Gemini executor, each within its timeout
+        for chunk in stream_blocking('gemini', scratch.send_message, user_message, stream=True):
+            response = chunk  # the last chunk carries the usage metadata
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. a bare finish reason)
+                continue
+            if text:
+                parts.append(text)
+                yield text
+        _commit_turn(chat, history, scratch)
+        _record_turn(session_id, history, user_message, time.perf_counter() - started, response)
+    except Exception as e:
+        if flight is not None:
+            chat_flights.finish(user_message, flight, error=e)
+        raise
+    except BaseException:
+        if flight is not None:
+            chat_flights.finish(user_message, flight, error=BackendTimeout("shared chat stream was closed"))
+        raise
+    if flight is not None:
+        chat_flights.finish(user_message, flight, value=''.join(parts))
+    chat_sessions.save(session_id)
+    if first_turn and response_cache is not None:
+        response_cache.put(user_message, ''.join(parts))
+
+
+def _sse(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def _wants_stream(data: dict) -> bool:
+    if not CHAT_STREAMING:
+        return False
+    return bool(data.get('stream')) or 'text/event-stream' in request.headers.get('Accept', '')
+
+
 @app.route('/chat', methods=['POST'])
+@admission_controlled('chat', 'gemini')
 def chat_api():
     try:
         data = request.get_json()
@@ -223,34 +838,193 @@ def chat_api():
         if not user_message:
             return jsonify({'error': 'No message provided', 'success': False}), 400
 
-        if model is None:
+        if get_model() is None:
             return jsonify({'error': 'Gemini API not configured', 'success': False}), 500
 
-        chat = chat_sessions.setdefault(session_id, model.start_chat(history=[]))
-        response = chat.send_message(user_message)
-        return jsonify({'response': response.text, 'success': True})
+        if _wants_stream(data):
+            def generate():
+                parts = []
+                try:
+                    for text in stream_chat_reply(session_id, user_message):
+                        parts.append(text)
+                        yield _sse({'text': text})
+                    yield _sse({'response': ''.join(parts), 'success': True}, event='done')
+                except Exception as e:
+                    log.exception('chat.stream_failed')
+                    yield _sse({'error': str(e), 'success': False}, event='error')
+
+            return Response(
+                stream_with_context(generate()),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+
+        reply = send_chat_message(session_id, user_message)
+        return jsonify({'response': reply, 'success': True})
+    except BackendBusy as e:
+        return jsonify({'error': str(e), 'success': False}), 503
+    except BackendTimeout as e:
+        return jsonify({'error': str(e), 'success': False}), 504
     except Exception as e:
-        print(f"Chat error: {e}")
+        log.exception('chat.failed')
         return jsonify({'error': str(e), 'success': False}), 500
 
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    """Joins the client to its owner's room so it only receives its own reminders."""
+    owner = ((auth or {}).get('owner') or request.args.get('owner') or '').strip()
+    if owner:
+        join_room(owner_room(owner))
+
+
+@socketio.on('chat_message')
+def handle_chat_message(data):
+    """
+    Socket.IO chat:
+    - Emits 'chat_chunk' for each piece of the reply when CHAT_STREAMING is on
+    - Emits 'chat_done' with the full reply, or 'chat_error' on failure
+    """
+    data = data or {}
+    user_message = (data.get('message') or '').strip()
+    session_id = data.get('session_id', 'default')
+
+    if not user_message:
+        emit('chat_error', {'session_id': session_id, 'error': 'No message provided', 'success': False})
+        return
+    if get_model() is None:
+        emit('chat_error', {'session_id': session_id, 'error': 'Gemini API not configured', 'success': False})
+        return
+
+    try:
+        ticket = admission.admit('chat', _client_key(), ('gemini',))
+    except (RateLimited, Overloaded) as e:
+        emit('chat_error', {'session_id': session_id, 'error': str(e), 'success': False,
+                            'retry_after': max(1, math.ceil(e.retry_after))})
+        return
+
+    try:
+        if CHAT_STREAMING:
+            parts = []
+            for text in stream_chat_reply(session_id, user_message):
+                parts.append(text)
+                emit('chat_chunk', {'session_id': session_id, 'text': text})
+            reply = ''.join(parts)
+        else:
+            reply = send_chat_message(session_id, user_message)
+        emit('chat_done', {'session_id': session_id, 'response': reply, 'success': True})
+    except Exception as e:
+        log.exception('chat.socket_failed', session_id=session_id)
+        emit('chat_error', {'session_id': session_id, 'error': str(e), 'success': False})
+    finally:
+        ticket.release()
+
+
+@app.route('/api/chat/stats', methods=['GET'])
+def chat_stats():
+    reminder_engine = reminder_worker if reminder_worker is not None else reminder_scheduler
+    return jsonify({
+        'sessions': chat_sessions.stats(),
+        'backends': backend_stats(),
+        'admission': admission.stats(),
+        'single_flight': single_flight_stats(),
+        'reminder_audio': reminder_audio.stats() if reminder_audio is not None else None,
+        'reminder_outbox': reminder_outbox.stats() if reminder_outbox is not None else None,
+        'tts_cache': tts_cache.stats(),
+        'response_cache': response_cache.stats() if response_cache is not None else None,
+        'notifications': notifier.stats(),
+        'reminders': reminder_engine.stats() if reminder_engine is not None else None,
+        'success': True
+    })
+
 # ==========================================
 # ROUTES - REMINDERS
 # ==========================================
+def _owner_from_request(data=None):
+    """Reads the reminder owner from the X-Owner-Id header or an 'owner' field."""
+    owner = request.headers.get('X-Owner-Id') or (data if data is not None else request.args).get('owner')
+    return (owner or '').strip() or None
+
+
+def _required_owner():
+    """The owner a listing is scoped to; listings never span owners, as they include phone and email."""
+    owner = _owner_from_request()
+    if owner is None:
+        raise ValueError('owner is required (owner parameter or X-Owner-Id header)')
+    return owner
+
+
+def _parse_query_time(name):
+    value = (request.args.get(name) or '').strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError as exc:
+        raise ValueError(f"Invalid {name} time: {value}") from exc
+
+
+def _merge_unflushed(page, unflushed, deleted):
+    seen = set()
+    fields = set(REMINDER_PROJECTION)
+    unflushed = ({k: v for k, v in doc.items() if k in fields} for doc in unflushed)
+    for reminder in heapq.merge(page, unflushed, key=lambda r: (r['reminder_time'], r['_id'])):
+        reminder_id = str(reminder['_id'])
+        if reminder_id in deleted or reminder_id in seen:
+            continue  # flushed while this page was read, or deleted but not yet in MongoDB
+        seen.add(reminder_id)
+        yield reminder
+
+
 @app.route('/api/reminders', methods=['GET'])
 def get_reminders():
+    """
+    Lists one owner's reminders a page at a time, ordered by reminder_time:
+    - owner (or X-Owner-Id header): required
+    - from / to: ISO datetimes bounding reminder_time
+    - limit: page size (default 50, max 500)
+    - cursor: next_cursor from the previous page
+    """
     try:
-        if not db:
+        db = get_db()
+        if db is None:
             return jsonify({'error': 'MongoDB not connected', 'success': False}), 500
 
-        reminders_list = list(db.reminders.find({}, {"_id": 1, "medicine_name": 1, "reminder_time": 1, "phone": 1, "email": 1}))
-        for r in reminders_list:
-            r['_id'] = str(r['_id'])
-            r['reminder_time'] = str(r['reminder_time'])
-        return jsonify({'reminders': reminders_list, 'success': True})
+        owner = _required_owner()
+        start = _parse_query_time('from')
+        end = _parse_query_time('to')
+        limit = min(max(int(request.args.get('limit', REMINDER_PAGE_SIZE)), 1), REMINDER_MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+        page = find_reminders_page(db.reminders, owner=owner, start=start, end=end, after=after, limit=limit)
+        if reminder_outbox is not None:
+            # Accepted reminders MongoDB has not got yet, merged in order; queued deletes hidden
+            unflushed, deleted = reminder_outbox.pending(owner=owner, start=start, end=end, after=after)
+            page = _merge_unflushed(page, unflushed, deleted)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
     except Exception as e:
-        print(f"Error fetching reminders: {e}")
+        log.exception('reminders.fetch_failed')
         return jsonify({'error': str(e), 'success': False}), 500
 
+    def generate():
+        # Written straight from the Mongo cursor instead of building a list
+        yield '{"reminders": ['
+        count = 0
+        last = None
+        has_more = False
+        for reminder in page:
+            if count == limit:
+                has_more = True
+                break
+            yield (',' if count else '') + json.dumps(serialize_reminder(reminder))
+            last = reminder
+            count += 1
+        next_cursor = encode_cursor(last['reminder_time'], last['_id']) if has_more else None
+        yield '], "next_cursor": ' + json.dumps(next_cursor) + ', "success": true}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
 
 @app.route('/api/reminders', methods=['POST'])
 def add_reminder():
@@ -260,98 +1034,560 @@ def add_reminder():
         reminder_time = data.get('reminder_time', '').strip()
         phone = (data.get('phone') or '').strip()
         email = (data.get('email') or '').strip()
+        recurrence = (data.get('recurrence') or '').strip()
+        owner = _owner_from_request(data)
 
         if not medicine_name or not reminder_time:
             return jsonify({'error': 'Medicine name and time required', 'success': False}), 400
 
-        if not db:
-            print("MongoDB not connected, cannot add reminder.")
+        db = get_db()
+        if db is None and reminder_outbox is None:
+            log.warning('reminders.unavailable', action='add', reason='MongoDB not connected')
             return jsonify({'error': 'MongoDB not connected', 'success': False}), 500
 
         reminder = {
             'medicine_name': medicine_name,
-            'reminder_time': _parse_reminder_time(reminder_time),
+            'reminder_time': to_local_naive(_parse_reminder_time(reminder_time)),
             'phone': phone or None,
             'email': email or None,
+            'owner': owner,
+            'status': STATUS_PENDING,
             'created_at': datetime.now()
         }
+        assign_shard(reminder)
+        if recurrence:
+            # e.g. FREQ=DAILY;BYHOUR=8,20;BYMINUTE=0;COUNT=28 starting at reminder_time
+            apply_recurrence(reminder, recurrence)
+        if reminder_audio is not None:
+            reminder_audio.prepare(reminder)
+
+        if reminder_outbox is not None:
+            # Acknowledged once it is in the local outbox; scheduled when it reaches MongoDB
+            reminder['_id'] = reminder_outbox.append_insert(reminder)
+        else:
+            result = db.reminders.insert_one(reminder)
+            reminder['_id'] = str(result.inserted_id)
+            schedule_reminder_job(reminder)
+        if reminder_audio is not None:
+            reminder_audio.render(reminder)
+
+        return jsonify({'reminder': serialize_reminder(reminder), 'success': True}), 201
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    except Exception as e:
+        log.exception('reminders.add_failed')
+        return jsonify({'error': str(e), 'success': False}), 500
+
+
+def _rerender_reminder_clip(audio_key):
+    db = get_db()
+    if db is None or get_tts_client() is None:
+        return None
+    reminder = db.reminders.find_one({'audio_key': audio_key}, {'medicine_name': 1})
+    if reminder is None:
+        return None
+    text = _reminder_text(reminder.get('medicine_name'))
+    if _reminder_audio_key(text) != audio_key:  # rendered with another voice or encoding
+        return None
+    return get_speech_audio(text)
+
+
+@app.route('/api/reminders/audio/<audio_key>', methods=['GET'])
+def reminder_audio_clip(audio_key):
+    """
+    Serves a spoken reminder; clips are addressed by content, so they never
+    change. A clip this process has not got (rendered by another worker or
+    replica, or evicted) is rendered again from a reminder that uses it.
+    """
+    if len(audio_key) != 64 or any(c not in '0123456789abcdef' for c in audio_key):
+        return jsonify({'error': 'Unknown reminder audio', 'success': False}), 404
+    clip = tts_cache.get(audio_key)
+    if clip is None:
+        clip = _rerender_reminder_clip(audio_key)
+    if clip is None:
+        return jsonify({'error': 'Unknown reminder audio', 'success': False}), 404
+    response = _audio_response(clip, 'reminder.mp3')
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+@app.route('/api/reminders/import', methods=['POST'])
+def import_reminders_api():
+    """
+    Creates reminders in bulk from a JSON Lines or CSV upload, sent either
+    as the raw request body or as a multipart 'file' field. The format comes
+    from ?format=, the file name or the Content-Type. Rows that fail
+    validation are reported by line number; the rest are inserted.
+    """
+    try:
+        db = get_db()
+        if db is None:
+            return jsonify({'error': 'MongoDB not connected', 'success': False}), 500
+
+        upload = request.files.get('file')
+        if upload is not None:
+            stream, filename, content_type = upload.stream, upload.filename, upload.mimetype
+        else:
+            stream, filename, content_type = request.stream, None, request.mimetype
+        fmt = detect_format(request.args.get('format'), content_type, filename)
+
+        result = import_reminders(
+            db.reminders,
+            iter_rows(stream, fmt),
+            _parse_reminder_time,
+            owner=_owner_from_request(),
+            scheduler=reminder_scheduler,
+            chunk_size=REMINDER_IMPORT_CHUNK,
+            audio=reminder_audio,
+        )
+        log.info('reminders.imported', inserted=result.inserted, rows=result.rows, rejected=result.failed)
+        return jsonify({**result.to_dict(), 'success': True})
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    except Exception as e:
+        log.exception('reminders.import_failed')
+        return jsonify({'error': str(e), 'success': False}), 500
 
-        result = db.reminders.insert_one(reminder)
-        reminder['_id'] = str(result.inserted_id)
-        schedule_reminder_job(reminder)
 
-        return jsonify({'reminder': reminder, 'success': True}), 201
+@app.route('/api/reminders/export', methods=['GET'])
+def export_reminders_api():
+    """
+    Streams one owner's reminders as JSON Lines or CSV; takes owner (required),
+    from and to like the list endpoint. Exports across owners are CLI-only.
+    """
+    try:
+        db = get_db()
+        if db is None:
+            return jsonify({'error': 'MongoDB not connected', 'success': False}), 500
+        fmt = detect_format(request.args.get('format') or 'jsonl')
+        reminders = find_reminders_for_export(
+            db.reminders,
+            owner=_required_owner(),
+            start=_parse_query_time('from'),
+            end=_parse_query_time('to'),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
     except Exception as e:
-        print(f"Error adding reminder: {e}")
+        log.exception('reminders.export_failed')
         return jsonify({'error': str(e), 'success': False}), 500
 
+    return Response(
+        stream_with_context(export_rows(reminders, fmt)),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename=reminders.{fmt}'},
+    )
+
+
+@app.cli.command('import-reminders')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', default=None, help='jsonl or csv (default: from the file name)')
+@click.option('--owner', default=None, help='Owner to assign to every imported reminder')
+def import_reminders_command(path, fmt, owner):
+    """Imports reminders from a JSON Lines or CSV file."""
+    db = get_db()
+    if db is None:
+        raise click.ClickException('MongoDB not connected')
+    fmt = detect_format(fmt, filename=path)
+    with open(path, 'rb') as f:
+        result = import_reminders(db.reminders, iter_rows(f, fmt), _parse_reminder_time,
+                                  owner=owner, scheduler=reminder_scheduler,
+                                  chunk_size=REMINDER_IMPORT_CHUNK, audio=reminder_audio)
+    for error in result.errors:
+        click.echo(f"✗ line {error['line']}: {error['error']}", err=True)
+    click.echo(f"✓ Imported {result.inserted}/{result.rows} reminders ({result.failed} rejected)")
+
+
+@app.cli.command('export-reminders')
+@click.option('--format', 'fmt', default='jsonl', help='jsonl or csv')
+@click.option('--owner', default=None, help='Only export this owner\'s reminders')
+@click.option('--unowned', is_flag=True, help='Only export reminders without an owner')
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Output file (default: stdout)')
+def export_reminders_command(fmt, owner, unowned, output):
+    """Exports reminders as JSON Lines or CSV."""
+    db = get_db()
+    if db is None:
+        raise click.ClickException('MongoDB not connected')
+    if owner and unowned:
+        raise click.UsageError('--owner and --unowned are mutually exclusive')
+    fmt = detect_format(fmt)
+    for chunk in export_rows(find_reminders_for_export(db.reminders, owner=NO_OWNER if unowned else owner), fmt):
+        output.write(chunk)
+
+
+@app.cli.command('assign-reminder-owner')
+@click.argument('owner')
+@click.option('--phone', default=None, help='Only reminders for this phone number')
+@click.option('--email', default=None, help='Only reminders for this email address')
+def assign_reminder_owner_command(owner, phone, email):
+    """
+    Gives reminders without an owner (created before owners existed) to
+    OWNER, so they show up in that owner's list and alerts again.
+    """
+    db = get_db()
+    if db is None:
+        raise click.ClickException('MongoDB not connected')
+    click.echo(f"✓ Assigned {assign_owner(db.reminders, owner.strip(), phone, email)} reminders to {owner}")
+
 
 @app.route('/api/reminders/<reminder_id>', methods=['DELETE'])
 def delete_reminder(reminder_id):
     try:
-        if not db:
-            print("MongoDB not connected, cannot delete reminder.")
+        if reminder_outbox is not None and reminder_outbox.is_pending_insert(reminder_id):
+            # Queued behind its insert, so MongoDB never keeps it
+            reminder_outbox.append_delete(reminder_id)
+            return jsonify({'message': 'Reminder deleted', 'success': True})
+
+        db = get_db()
+        if db is None:
+            log.warning('reminders.unavailable', action='delete', reason='MongoDB not connected')
             return jsonify({'error': 'MongoDB not connected', 'success': False}), 500
 
         result = db.reminders.delete_one({'_id': ObjectId(reminder_id)})
         if result.deleted_count == 0:
             return jsonify({'error': 'Reminder not found', 'success': False}), 404
+        if reminder_scheduler is not None:
+            reminder_scheduler.cancel(reminder_id)
         return jsonify({'message': 'Reminder deleted', 'success': True})
     except Exception as e:
-        print(f"Error deleting reminder: {e}")
+        log.exception('reminders.delete_failed', reminder_id=reminder_id)
         return jsonify({'error': str(e), 'success': False}), 500
     
+# ==========================================
+# ROUTES - HOSPITAL LOOKUP
+# ==========================================
+HOSPITAL_SEARCH_RADIUS = int(os.environ.get("HOSPITAL_SEARCH_RADIUS", "5000"))
+HOSPITAL_MAX_RESULTS = int(os.environ.get("HOSPITAL_MAX_RESULTS", "10"))
+
+# Places results cached per geohash cell (see hospital_lookup.py)
+hospital_lookup = None
+if GOOGLE_PLACES_API_KEY:
+    hospital_lookup = HospitalLookup(
+        PlacesClient(GOOGLE_PLACES_API_KEY,
+                     base_url=os.environ.get("GOOGLE_PLACES_BASE_URL", "https://maps.googleapis.com")),
+        ttl=float(os.environ.get("HOSPITAL_CACHE_TTL", "86400")),
+        precision=int(os.environ.get("HOSPITAL_CACHE_PRECISION", "6")),
+        fetch=lambda fn, *args: run_blocking('places', fn, *args),
+        flights=SingleFlight('places', timeout=15.0, enabled=SINGLE_FLIGHT),
+    )
+
+
+def single_flight_stats() -> dict:
+    flights = [chat_flights, tts_flights] + ([hospital_lookup.flights] if hospital_lookup is not None else [])
+    return {flight.name: flight.stats() for flight in flights}
+
+
+# Offline facilities (see facility_index.py): emergency and 24h filters,
+# and the fallback when Places is unavailable
+FACILITY_INDEX_PATH = os.environ.get("FACILITY_INDEX_PATH")
+facility_index = None
+if FACILITY_INDEX_PATH:
+    try:
+        from facility_index import FacilityIndex
+        facility_index = FacilityIndex.load(FACILITY_INDEX_PATH)
+        log.info('facility_index.loaded', facilities=len(facility_index), path=FACILITY_INDEX_PATH)
+    except (OSError, ValueError, KeyError) as e:
+        log.error('facility_index.load_failed', path=FACILITY_INDEX_PATH, error=str(e))
+
+
+def _demo_hospitals(latitude, longitude):
+    """Sample results around the user for when no Places API key is configured."""
+    offsets = [(0.008, 0.006, 4.5), (-0.012, 0.004, 4.2), (0.003, -0.015, 3.9), (-0.006, -0.009, 4.0)]
+    return [{
+        'name': f"Sample Hospital {i + 1}",
+        'address': "Demo address (configure GOOGLE_PLACES_API_KEY for real results)",
+        'rating': rating,
+        'place_id': None,
+        'lat': latitude + dlat,
+        'lng': longitude + dlng,
+    } for i, (dlat, dlng, rating) in enumerate(offsets)]
+
+
+def _offline_hospitals(latitude, longitude, radius, data):
+    hospitals = facility_index.find(latitude, longitude, radius, limit=HOSPITAL_MAX_RESULTS,
+                                    emergency=bool(data.get('emergency')), open_24h=bool(data.get('open_24h')))
+    return jsonify({'hospitals': hospitals, 'source': 'offline', 'success': True})
+
+
+@app.route('/api/find_hospitals', methods=['POST'])
+def find_hospitals_api():
+    """
+    Returns hospitals within `radius` meters (default 5000), nearest first.
+
+    `emergency` / `open_24h` filters and `source: "offline"` are answered
+    from the offline facility index, which also serves when Places fails.
+    """
+    try:
+        data = request.get_json() or {}
+        try:
+            latitude = float(data.get('latitude'))
+            longitude = float(data.get('longitude'))
+            radius = min(max(int(data.get('radius', HOSPITAL_SEARCH_RADIUS)), 100), 50000)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Latitude and Longitude are required', 'success': False}), 400
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return jsonify({'error': 'Latitude or Longitude out of range', 'success': False}), 400
+
+        wants_offline = data.get('source') == 'offline' or data.get('emergency') or data.get('open_24h')
+        if facility_index is not None and (wants_offline or hospital_lookup is None):
+            return _offline_hospitals(latitude, longitude, radius, data)
+        if hospital_lookup is None:
+            return jsonify({'hospitals': _demo_hospitals(latitude, longitude), 'demo_mode': True, 'success': True})
+
+        try:
+            hospitals, cached = hospital_lookup.find(latitude, longitude, radius, limit=HOSPITAL_MAX_RESULTS)
+        except (BackendBusy, BackendTimeout, requests.exceptions.RequestException, RuntimeError) as e:
+            if facility_index is None:
+                raise
+            log.warning('hospitals.places_failed', fallback='facility_index', error=str(e))
+            return _offline_hospitals(latitude, longitude, radius, data)
+        return jsonify({'hospitals': hospitals, 'cached': cached, 'source': 'places', 'success': True})
+    except BackendBusy as e:
+        return jsonify({'error': str(e), 'success': False}), 503
+    except (BackendTimeout, requests.exceptions.Timeout) as e:
+        return jsonify({'error': f'Places API timed out: {e}', 'success': False}), 504
+    except requests.exceptions.RequestException as e:
+        log.error('hospitals.places_failed', error=str(e))
+        return jsonify({'error': f'Error connecting to Google Places API: {e}', 'success': False}), 502
+    except Exception as e:
+        log.exception('hospitals.failed')
+        return jsonify({'error': str(e), 'success': False}), 500
+
+
+@app.route('/api/hospitals/stats', methods=['GET'])
+def hospital_stats():
+    return jsonify({
+        'cache': hospital_lookup.stats() if hospital_lookup is not None else None,
+        'offline_facilities': len(facility_index) if facility_index is not None else None,
+        'backend': backend_stats().get('places'),
+        'success': True
+    })
+
+
+@app.cli.command('build-facility-index')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', '-o', required=True, type=click.Path(file_okay=False), help='Index directory to write')
+@click.option('--cell-deg', default=0.1, show_default=True, help='Grid cell size in degrees')
+def build_facility_index_command(source, output, cell_deg):
+    """Builds the offline facility index from a CSV or GeoJSON file."""
+    from facility_index import FacilityIndex, read_facilities
+
+    records, skipped = read_facilities(source)
+    FacilityIndex.build(records, cell_deg).save(output)
+    click.echo(f"✓ Indexed {len(records)} facilities into {output} ({skipped} skipped)")
+
 # ==========================================
 # VOICE ASSISTANT ROUTES
 # ==========================================
 from flask import send_file
+import base64
 import io
 
-def transcribe_audio_gcs(audio_content):
+SPEECH_LANGUAGE_CODE = os.environ.get("SPEECH_LANGUAGE_CODE", "en-US")
+audio_ingest = audio_ingest_from_env()
+
+
+def open_voice_upload():
+    """
+    The request's audio as an IngestedAudio: a raw audio/* body is read
+    straight off the socket, a multipart upload from its 'audio' file.
+    Returns None when there is no audio.
+    """
+    if request.content_length is not None and request.content_length > audio_ingest.max_bytes:
+        raise AudioTooLarge(f"Audio upload is larger than {audio_ingest.max_bytes} bytes")
+    if request.mimetype.startswith('audio/') or request.mimetype == 'application/octet-stream':
+        return audio_ingest.open(request.stream)
+    if 'audio' not in request.files:
+        return None
+    return audio_ingest.open(request.files['audio'].stream)
+
+
+def _voice_upload_error(e):
+    if isinstance(e, AudioTooLarge):
+        return jsonify({'error': str(e), 'success': False}), 413
+    return jsonify({'error': str(e), 'success': False}), 415
+
+
+def _recognition_config(upload):
+    """Speech-to-Text config for what upload.chunks() yields."""
+    from google.cloud import speech_v1p1beta1 as speech
+    config_args = {
+        'encoding': speech.RecognitionConfig.AudioEncoding[upload.encoding],
+        'language_code': SPEECH_LANGUAGE_CODE,
+    }
+    if upload.sample_rate:
+        config_args['sample_rate_hertz'] = upload.sample_rate
+    if upload.channels and upload.channels > 1:
+        config_args['audio_channel_count'] = upload.channels
+    return speech.RecognitionConfig(**config_args)
+
+
+def _record_ingest(route, upload):
+    log.info('voice.ingest', route=route, format=upload.format.describe(), encoding=upload.encoding,
+             bytes_in=upload.bytes_in, bytes_out=upload.bytes_out, seconds_in=upload.seconds_in,
+             seconds_out=upload.seconds_out, speech=upload.speech_detected)
+
+
+def transcribe_audio_gcs(audio_content, upload):
     """Transcribes voice input to text using Google Speech-to-Text."""
+    from google.cloud import speech_v1p1beta1 as speech
     try:
         audio = speech.RecognitionAudio(content=audio_content)
-        config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-            language_code="en-US"
-        )
-        response = speech_client.recognize(config=config, audio=audio)
+        response = run_blocking('speech', get_speech_client().recognize,
+                                config=_recognition_config(upload), audio=audio)
         if not response.results:
             return None
         return response.results[0].alternatives[0].transcript
     except Exception as e:
-        print(f"Speech recognition error: {e}")
+        log.error('voice.stt_failed', error=str(e))
         return None
 
 
-def synthesize_speech_gcs(text):
-    """Converts AI text reply to speech using Google Text-to-Speech."""
+def transcribe_audio_stream(upload):
+    """
+    Transcribes an upload chunk by chunk with streaming recognition.
+    Returns '' without calling Speech when the upload holds no speech.
+    """
+    from google.cloud import speech_v1p1beta1 as speech
+    chunks = upload.chunks()
+    # Reads up to the first speech here, so silent uploads never reach Speech
+    first = next(chunks, None)
+    if first is None:
+        return ''
+    streaming_config = speech.StreamingRecognitionConfig(config=_recognition_config(upload))
+
+    def _requests():
+        yield speech.StreamingRecognizeRequest(audio_content=first)
+        for chunk in chunks:
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+    def _recognize():
+        parts = []
+        for response in get_speech_client().streaming_recognize(streaming_config, _requests()):
+            for result in response.results:
+                if result.is_final and result.alternatives:
+                    parts.append(result.alternatives[0].transcript.strip())
+        return ' '.join(p for p in parts if p)
+
     try:
-        synthesis_input = texttospeech.SynthesisInput(text=text)
-        voice = texttospeech.VoiceSelectionParams(
-            language_code="en-US",
-            name="en-US-Standard-C"
-        )
-        audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
-        response = tts_client.synthesize_speech(
-            input=synthesis_input,
-            voice=voice,
-            audio_config=audio_config
-        )
-        return response.audio_content
+        return run_blocking('speech', _recognize) or None
+    except AudioTooLarge:
+        raise
+    except Exception as e:
+        log.error('voice.stt_failed', streaming=True, error=str(e))
+        return None
+
+
+def _tts_request(text):
+    from google.cloud import texttospeech_v1 as texttospeech
+
+    synthesis_input = texttospeech.SynthesisInput(text=text)
+    voice = texttospeech.VoiceSelectionParams(
+        language_code=TTS_LANGUAGE_CODE,
+        name=TTS_VOICE_NAME
+    )
+    audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding[TTS_ENCODING])
+    response = get_tts_client().synthesize_speech(
+        input=synthesis_input,
+        voice=voice,
+        audio_config=audio_config
+    )
+    return response.audio_content
+
+
+def _tts_key(text):
+    return (text, TTS_VOICE_NAME, TTS_LANGUAGE_CODE, TTS_ENCODING)
+
+
+def _synthesize_clip(text):
+    audio = run_blocking('tts', _tts_request, text)
+    if not audio:
+        return None
+    return tts_cache.store(text, TTS_VOICE_NAME, TTS_LANGUAGE_CODE, TTS_ENCODING, audio)
+
+
+def get_speech_audio(text):
+    """Returns a CachedAudio clip for text, synthesizing it (once for concurrent callers) on a cache miss."""
+    cached = tts_cache.lookup(text, TTS_VOICE_NAME, TTS_LANGUAGE_CODE, TTS_ENCODING)
+    if cached is not None:
+        return cached
+    try:
+        return tts_flights.do(('clip',) + _tts_key(text), _synthesize_clip, text)
     except Exception as e:
-        print(f"TTS synthesis error: {e}")
+        log.error('voice.tts_failed', error=str(e))
         return None
 
 
+def synthesize_speech_gcs(text):
+    """Converts AI text reply to speech using Google Text-to-Speech."""
+    clip = get_speech_audio(text)
+    return bytes(clip.data) if clip is not None else None
+
+
+def _submit_tts(text):
+    """Starts synthesis of one sentence, answering straight from the cache on a hit."""
+    cached = tts_cache.lookup(text, TTS_VOICE_NAME, TTS_LANGUAGE_CODE, TTS_ENCODING)
+    if cached is not None:
+        return CompletedCall(bytes(cached.data))
+
+    def _synthesize_and_store():
+        audio = _tts_request(text)
+        tts_cache.store(text, TTS_VOICE_NAME, TTS_LANGUAGE_CODE, TTS_ENCODING, audio)
+        return audio
+
+    return tts_flights.submit(('audio',) + _tts_key(text), lambda: submit_blocking('tts', _synthesize_and_store))
+
+
+def _audio_response(clip, download_name):
+    """Serves a cached clip, straight from its file when it is on disk."""
+    if clip.path:
+        return send_file(clip.path, mimetype='audio/mpeg', as_attachment=False,
+                         download_name=download_name, conditional=True)
+    return send_file(io.BytesIO(clip.data), mimetype='audio/mpeg', as_attachment=False,
+                     download_name=download_name)
+
+
+def warm_tts_cache(phrases=None):
+    """Pre-synthesizes common phrases and pending reminder texts into the TTS cache."""
+    if get_tts_client() is None:
+        log.warning('tts_cache.warmup_skipped', reason='TTS client not configured')
+        return 0
+    phrases = list(phrases if phrases is not None else TTS_WARMUP_PHRASES)
+    db = get_db()
+    if db is not None:
+        try:
+            upcoming = db.reminders.distinct('medicine_name', {'reminder_time': {'$gte': datetime.now()}})
+            phrases.extend(_reminder_text(name) for name in upcoming if name)
+        except Exception as e:
+            log.error('tts_cache.warmup_reminders_failed', error=str(e))
+
+    warmed = 0
+    for phrase in phrases:
+        if get_speech_audio(phrase) is not None:
+            warmed += 1
+    log.info('tts_cache.warmed', warmed=warmed, phrases=len(phrases))
+    return warmed
+
+
+@app.cli.command('warm-tts')
+def warm_tts_command():
+    """Pre-synthesizes common phrases into the TTS cache."""
+    warm_tts_cache()
+
+
 def get_chat_session(session_id):
     """Gets or creates a Gemini chat session."""
-    if session_id not in chat_sessions:
-        chat_sessions[session_id] = model.start_chat(history=[])
-    return chat_sessions[session_id]
+    return chat_sessions.get_or_create(session_id)
+
+
+def _voice_caller_id() -> str:
+    """The caller's voice session id (form field or X-Session-Id header); a new one if absent."""
+    caller = (request.form.get('session_id') or request.headers.get('X-Session-Id') or '').strip()
+    return caller[:128] or uuid.uuid4().hex
 
 
 @app.route('/api/voice-chat', methods=['POST'])
+@admission_controlled('voice', 'speech', 'gemini')
 def voice_chat():
     """
     Full voice chat:
@@ -361,47 +1597,205 @@ def voice_chat():
     - Synthesizes AI response to speech
     """
     try:
-        if 'audio' not in request.files:
+        timer = StageTimer()
+        upload = open_voice_upload()
+        if upload is None:
             return jsonify({'error': 'No audio file provided', 'success': False}), 400
-
-        audio_file = request.files['audio']
-        audio_content = audio_file.read()
+        caller = _voice_caller_id()
+        audio_content = upload.read()
+        timer.mark('ingest')
+        _record_ingest('voice_chat', upload)
+        if not audio_content:
+            return jsonify({'error': 'No speech detected', 'success': False}), 422
 
         # Step 1: Transcribe audio
-        transcript = transcribe_audio_gcs(audio_content)
+        transcript = transcribe_audio_gcs(audio_content, upload)
+        timer.mark('stt')
         if not transcript:
             return jsonify({'error': 'Speech recognition failed', 'success': False}), 500
 
-        print(f"🎤 User said: {transcript}")
-
         # Step 2: Send to Gemini
-        chat = get_chat_session('voice')
-        response = chat.send_message(transcript)
-        ai_reply = response.text.strip()
-
-        print(f"🤖 AI replied: {ai_reply}")
+        ai_reply = send_chat_message(f'voice:{caller}', transcript).strip()
+        timer.mark('llm_done')
 
         # Step 3: Synthesize speech
-        speech_bytes = synthesize_speech_gcs(ai_reply)
-        if not speech_bytes:
+        clip = get_speech_audio(ai_reply)
+        timer.mark('tts_done')
+        if clip is None:
             return jsonify({'error': 'TTS synthesis failed', 'success': False}), 500
 
         # Step 4: Return audio + text
-        return send_file(
-            io.BytesIO(speech_bytes),
-            mimetype='audio/mpeg',
-            as_attachment=False,
-            download_name='ai_reply.mp3'
-        )
+        _record_voice_timings('voice_chat', timer, transcript_chars=len(transcript), reply_chars=len(ai_reply))
+        response = _audio_response(clip, 'ai_reply.mp3')
+        response.headers['Server-Timing'] = timer.server_timing()
+        response.headers['X-Session-Id'] = caller
+        return response
+
+    except (AudioTooLarge, UnsupportedAudio) as e:
+        return _voice_upload_error(e)
+    except BackendBusy as e:
+        return jsonify({'error': str(e), 'success': False}), 503
+    except BackendTimeout as e:
+        return jsonify({'error': str(e), 'success': False}), 504
+    except Exception as e:
+        log.exception('voice.failed')
+        return jsonify({'error': str(e), 'success': False}), 500
+
+
+def _ndjson(data: dict) -> str:
+    return json.dumps(data) + "\n"
+
+
+@app.route('/api/voice-chat/stream', methods=['POST'])
+@admission_controlled('voice', 'speech', 'gemini')
+def voice_chat_stream():
+    """
+    Pipelined voice chat, streamed back as newline-delimited JSON:
+    - Transcribes the upload with streaming recognition
+    - Streams the Gemini reply and splits it at sentence boundaries
+    - Synthesizes each sentence while the next one is generated
+    - Sends {"type": "audio"} lines (base64 MP3) as soon as each is ready,
+      then {"type": "done"} with per-stage timings
+    """
+    try:
+        if get_model() is None:
+            return jsonify({'error': 'Gemini API not configured', 'success': False}), 500
+
+        timer = StageTimer()
+        upload = open_voice_upload()
+        if upload is None:
+            return jsonify({'error': 'No audio file provided', 'success': False}), 400
+        caller = _voice_caller_id()
+
+        transcript = transcribe_audio_stream(upload)
+        timer.mark('stt')
+        _record_ingest('voice_chat_stream', upload)
+        if transcript == '':
+            return jsonify({'error': 'No speech detected', 'success': False}), 422
+        if not transcript:
+            return jsonify({'error': 'Speech recognition failed', 'success': False}), 500
 
+    except (AudioTooLarge, UnsupportedAudio) as e:
+        return _voice_upload_error(e)
     except Exception as e:
-        print(f"Voice Chat Error: {e}")
+        log.exception('voice.failed', streaming=True)
         return jsonify({'error': str(e), 'success': False}), 500
+
+    def generate():
+        yield _ndjson({'type': 'transcript', 'text': transcript, 'session_id': caller})
+        reply = []
+
+        def reply_chunks():
+            for text in stream_chat_reply(f'voice:{caller}', transcript):
+                timer.mark('llm_first_token')
+                reply.append(text)
+                yield text
+
+        try:
+            sentences = split_sentences(reply_chunks())
+            for sentence, audio in synthesize_pipelined(sentences, _submit_tts, timer):
+                yield _ndjson({
+                    'type': 'audio',
+                    'text': sentence,
+                    'audio': base64.b64encode(audio).decode('ascii'),
+                })
+            timer.mark('total')
+            _record_voice_timings('voice_chat_stream', timer, transcript_chars=len(transcript),
+                                  reply_chars=len(''.join(reply)))
+            yield _ndjson({'type': 'done', 'reply': ''.join(reply).strip(), 'timings': timer.timings, 'success': True})
+        except Exception as e:
+            log.exception('voice.failed', streaming=True)
+            yield _ndjson({'type': 'error', 'error': str(e), 'success': False})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'X-Session-Id': caller}
+    )
+
+
+def _record_voice_timings(route, timer: StageTimer, **fields):
+    for stage, ms in timer.timings.items():
+        VOICE_STAGE_SECONDS.observe(ms / 1000, route=route, stage=stage)
+    log.info('voice.completed', route=route, timings_ms=timer.timings, **fields)
+
+
 @app.route('/voice')
 def voice_assistant_page():
     return render_template('voice.html')
 
 
+# ==========================================
+# HEALTH CHECKS
+# ==========================================
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is serving; per-backend state is informational."""
+    return jsonify({'status': 'ok', 'backends': clients.status(), 'success': True})
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: 503 until every backend in REQUIRED_BACKENDS that is configured is up."""
+    ready = clients.ready()
+    body = {'status': 'ready' if ready else 'starting', 'backends': clients.status(check=False), 'success': ready}
+    return jsonify(body), 200 if ready else 503
+
+
+# Gauges and counters mirrored from state kept by other modules, read at scrape time
+metrics.callback('healthmate_chat_sessions', 'Chat sessions held in memory.',
+                 lambda: chat_sessions.stats()['sessions'])
+metrics.callback('healthmate_notification_queue_depth', 'Notifications waiting to be sent.',
+                 lambda: {ch: s['queued'] for ch, s in notifier.stats().items()}, ('channel',))
+metrics.callback('healthmate_notifications_sent_total', 'Notifications delivered.',
+                 lambda: {ch: s['sent'] for ch, s in notifier.stats().items()}, ('channel',), kind='counter')
+metrics.callback('healthmate_notifications_failed_total', 'Notifications given up on after retries.',
+                 lambda: {ch: s['failed'] for ch, s in notifier.stats().items()}, ('channel',), kind='counter')
+metrics.callback('healthmate_backend_in_flight', 'Calls running against each backend.',
+                 lambda: {name: s['in_flight'] for name, s in backend_stats().items()}, ('backend',))
+metrics.callback('healthmate_backend_rejected_total', 'Calls rejected because a backend was at its concurrency limit.',
+                 lambda: {name: s['rejected'] for name, s in backend_stats().items()}, ('backend',), kind='counter')
+metrics.callback('healthmate_backend_timeouts_total', 'Calls that timed out waiting for a backend.',
+                 lambda: {name: s['timeouts'] for name, s in backend_stats().items()}, ('backend',), kind='counter')
+metrics.callback('healthmate_admission_in_flight', 'Requests holding a slot on each backend gate.',
+                 lambda: {name: s['in_flight'] for name, s in admission.stats()['gates'].items()}, ('gate',))
+metrics.callback('healthmate_admission_queued', 'Requests waiting for a slot on each backend gate.',
+                 lambda: {name: s['queued'] for name, s in admission.stats()['gates'].items()}, ('gate',))
+metrics.callback('healthmate_admission_shed_total', 'Requests shed by a backend gate, by reason.',
+                 lambda: {(name, reason): n for name, s in admission.stats()['gates'].items()
+                          for reason, n in s['shed'].items()}, ('gate', 'reason'), kind='counter')
+metrics.callback('healthmate_rate_limited_total', 'Requests rejected by a per-client rate limit.',
+                 lambda: {name: s['limited'] for name, s in admission.stats()['rate_limits'].items()},
+                 ('limit',), kind='counter')
+metrics.callback('healthmate_reminder_timers', 'Reminder occurrences scheduled in this process.',
+                 lambda: reminder_scheduler.stats()['scheduled'] if reminder_scheduler is not None else None)
+metrics.callback('healthmate_tts_cache_entries', 'Synthesized clips held by the TTS cache.',
+                 lambda: {tier: tts_cache.stats()[f'{tier}_entries'] for tier in ('memory', 'disk')}, ('tier',))
+metrics.callback('healthmate_reminder_outbox_pending', 'Accepted reminders not yet written to MongoDB.',
+                 lambda: reminder_outbox.stats()['pending'] if reminder_outbox is not None else None)
+metrics.callback('healthmate_reminder_outbox_oldest_seconds', 'Age of the oldest reminder waiting in the outbox.',
+                 lambda: reminder_outbox.stats()['oldest_age'] if reminder_outbox is not None else None)
+metrics.callback('healthmate_reminder_audio_pending', 'Spoken reminder texts waiting to be rendered.',
+                 lambda: reminder_audio.stats()['pending'] if reminder_audio is not None else None)
+metrics.callback('healthmate_single_flight_shared_total',
+                 'Calls answered by joining an identical call already in flight.',
+                 lambda: {name: s['shared'] for name, s in single_flight_stats().items()}, ('flight',), kind='counter')
+metrics.callback('healthmate_backend_ready', '1 when a backend client has been created.',
+                 lambda: {name: int(s['state'] == 'ready') for name, s in clients.status(check=False).items()},
+                 ('backend',))
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+# Create every configured client in parallel in the background;
+# CLIENT_WARMUP=false leaves each one to be created on first use
+if os.environ.get("CLIENT_WARMUP", "true").lower() in ("1", "true", "yes"):
+    clients.warm()
+
 # ==========================================
 # START FLASK APP
 # ==========================================
@@ -414,15 +1808,22 @@ if __name__ == '__main__':
     print(f"{'✓' if GOOGLE_PLACES_API_KEY else '✗'} Google Places API Key: {'Found' if GOOGLE_PLACES_API_KEY else 'NOT FOUND'}")
     print(f"{'✓' if os.environ.get('GOOGLE_MAPS_API_KEY') else '✗'} Google Maps API Key: {'Found' if os.environ.get('GOOGLE_MAPS_API_KEY') else 'NOT FOUND'}")
     print(f"✗ Google Cloud Voice Assistant: Removed") # Updated status
-    print(f"✓ MongoDB: {'Connected' if db is not None else 'Not Connected'}") # Fixed truth value testing
+    print(f"{'✓' if MONGO_URI else '✗'} MongoDB: {'Configured' if MONGO_URI else 'NOT CONFIGURED'}")
+    print(f"✓ Backends starting in the background; see /readyz")
     print("="*50 + "\n")
 
     # Start scheduler safely
     if not scheduler.running:
         try:
             scheduler.start()
-            print("✓ Background Scheduler started")
+            log.info('scheduler.started')
+            # Otherwise started by _on_mongo_ready once MongoDB connects
+            start_reminder_engine()
         except Exception as e:
-            print(f"✗ Failed to start scheduler: {e}")
+            log.exception('scheduler.start_failed')
+
+    if os.environ.get("TTS_WARMUP", "true").lower() in ("1", "true", "yes"):
+        threading.Thread(target=warm_tts_cache, name="tts-warmup", daemon=True).start()
 
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+    # The reloader/debugger only works with the threading model
+    socketio.run(app, debug=(ASYNC_MODE == "threading"), host='0.0.0.0', port=5000)
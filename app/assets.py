@@ -0,0 +1,353 @@
+"""
+Static asset pipeline: minified, fingerprinted, pre-compressed files.
+
+build() reads every file under static/, minifies CSS and JavaScript, names
+each output after its content hash (script.js -> script.3f9c0a1b2d4e.js)
+and writes it with .gz and, when the optional `brotli` package is
+installed, .br siblings next to a manifest.json. Pages link assets through
+url(), so a changed file gets a new URL and every URL can be cached
+forever; the /assets route serves the smallest encoding the client
+accepts (choose()) with an immutable Cache-Control and an ETag.
+
+Vendored third-party files (VENDOR) live in static/vendor/ and are
+fetched once by `flask --app app build-assets --fetch-vendor`; until then
+url() points at their CDN copy.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+
+from logs import get_logger
+
+log = get_logger('assets')
+
+try:
+    import brotli  # optional dependency, only needed for .br variants
+except ImportError:
+    brotli = None
+
+# Logical name -> upstream copy, used until the file is vendored
+VENDOR = {
+    'vendor/socket.io.min.js': 'https://cdn.socket.io/4.0.0/socket.io.min.js',
+}
+
+COMPRESSIBLE = ('.js', '.css', '.svg', '.json', '.txt', '.html')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+MIN_COMPRESS_BYTES = 256
+_HASH_LEN = 12
+
+
+# ==========================================
+# MINIFIERS
+# ==========================================
+_IDENT = re.compile(r'[A-Za-z0-9_$]')
+# A '/' after one of these (or at the start) opens a regex literal, not a division
+_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw')
+
+
+def _is_ident(ch) -> bool:
+    return bool(ch) and _IDENT.match(ch) is not None
+
+
+def _drops_space(prev, nxt) -> bool:
+    """Whether the space between prev and nxt can go without joining two tokens."""
+    if _is_ident(prev) and _is_ident(nxt):
+        return False
+    if prev in '+-/' and nxt in '+-/':
+        return False  # a + +b, a - -b, a / /re/
+    if prev.isdigit() and nxt == '.':
+        return False  # 1 .toString()
+    return True
+
+
+def minify_js(source: str) -> str:
+    """
+    Drops comments, indentation, blank lines and spaces that do not
+    separate tokens. Line breaks are kept, so automatic semicolon
+    insertion behaves exactly as before; strings, template literals and
+    regex literals are copied verbatim.
+    """
+    out = []
+    i, n = 0, len(source)
+    pending_space = False
+    braces = []  # for each open '{': whether it is a template literal's ${
+
+    def last():
+        return out[-1][-1] if out and out[-1] else ''
+
+    def emit(text):
+        nonlocal pending_space
+        if pending_space and last() not in ('', '\n') and not _drops_space(last(), text[0]):
+            out.append(' ')
+        pending_space = False
+        out.append(text)
+
+    def newline():
+        nonlocal pending_space
+        pending_space = False
+        if out and last() != '\n':
+            out.append('\n')
+
+    def read_template(start):
+        """Copies a template literal from its opening backtick up to `${` or the closing backtick."""
+        j = start
+        while j < n:
+            if source[j] == '\\':
+                j += 2
+                continue
+            if source[j] == '`':
+                return j + 1, False
+            if source.startswith('${', j):
+                return j + 2, True
+            j += 1
+        return n, False
+
+    while i < n:
+        ch = source[i]
+        if ch in ' \t\r':
+            pending_space = True
+            i += 1
+        elif ch == '\n':
+            newline()
+            i += 1
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end < 0 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            pending_space = True
+        elif ch in '"\'':
+            j = i + 1
+            while j < n and source[j] != ch and source[j] != '\n':
+                j += 2 if source[j] == '\\' else 1
+            emit(source[i:j + 1])
+            i = j + 1
+        elif ch == '`':
+            end, opened = read_template(i + 1)
+            emit(source[i:end])
+            if opened:
+                braces.append(True)
+            i = end
+        elif ch == '{':
+            braces.append(False)
+            emit(ch)
+            i += 1
+        elif ch == '}':
+            if braces and braces.pop():
+                # Back inside the template literal that opened this ${
+                end, opened = read_template(i + 1)
+                pending_space = False
+                out.append(source[i:end])
+                if opened:
+                    braces.append(True)
+                i = end
+            else:
+                emit(ch)
+                i += 1
+        elif ch == '/' and _regex_allowed(''.join(out[-8:])):
+            j, in_class = i + 1, False
+            while j < n and source[j] != '\n':
+                c = source[j]
+                if c == '\\':
+                    j += 2
+                    continue
+                if c == '[':
+                    in_class = True
+                elif c == ']':
+                    in_class = False
+                elif c == '/' and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < n and _is_ident(source[j]):
+                j += 1  # flags
+            emit(source[i:j])
+            i = j
+        else:
+            j = i + 1
+            if _is_ident(ch):
+                while j < n and _is_ident(source[j]):
+                    j += 1
+            emit(source[i:j])
+            i = j
+    return ''.join(out).strip() + '\n'
+
+
+def _regex_allowed(tail: str) -> bool:
+    tail = tail.rstrip(' ')
+    if not tail or tail[-1] == '\n' or tail[-1] in _REGEX_AFTER:
+        return True
+    word = re.search(r'[A-Za-z_$][A-Za-z0-9_$]*$', tail)
+    return word is not None and word.group() in _REGEX_KEYWORDS
+
+
+def minify_css(source: str) -> str:
+    """Drops comments and whitespace around punctuation; strings are copied verbatim."""
+    out = []
+    for part in re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', source):
+        if part[:1] in ('"', "'"):
+            out.append(part)
+            continue
+        part = re.sub(r'/\*.*?\*/', '', part, flags=re.S)
+        part = re.sub(r'\s+', ' ', part)
+        part = re.sub(r'\s*([{};,>])\s*', r'\1', part)
+        part = re.sub(r':\s+', ':', part)  # not before ':', where it separates a descendant pseudo-class
+        part = part.replace(';}', '}')
+        out.append(part)
+    return ''.join(out).strip() + '\n'
+
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css}
+
+
+# ==========================================
+# BUILD AND SERVE
+# ==========================================
+class Asset:
+    __slots__ = ('name', 'url_name', 'mimetype', 'digest', 'size', 'source_size', 'encodings')
+
+    def __init__(self, name, url_name, mimetype, digest, size, source_size, encodings):
+        self.name = name
+        self.url_name = url_name
+        self.mimetype = mimetype
+        self.digest = digest
+        self.size = size
+        self.source_size = source_size
+        self.encodings = encodings  # encoding ('br', 'gzip') -> compressed size
+
+    def to_dict(self) -> dict:
+        return {'file': self.url_name, 'mimetype': self.mimetype, 'digest': self.digest,
+                'size': self.size, 'source_size': self.source_size, 'encodings': self.encodings}
+
+
+class AssetPipeline:
+    def __init__(self, static_dir: str, build_dir: str, url_prefix: str = '/assets',
+                 static_url: str = '/static', enabled: bool = True):
+        self.static_dir = static_dir
+        self.build_dir = build_dir
+        self.url_prefix = url_prefix.rstrip('/')
+        self.static_url = static_url.rstrip('/')
+        self.enabled = enabled
+        self.assets = {}   # logical name -> Asset
+        self._by_url = {}  # fingerprinted file name -> Asset
+
+    def build(self) -> dict:
+        """Builds every static file; outputs are content-addressed, so unchanged ones are not rewritten."""
+        os.makedirs(self.build_dir, exist_ok=True)
+        assets = {}
+        for root, dirs, files in os.walk(self.static_dir):
+            if os.path.abspath(root).startswith(os.path.abspath(self.build_dir)):
+                continue
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.startswith('.'):
+                    continue
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.static_dir).replace(os.sep, '/')
+                try:
+                    assets[name] = self._build_one(name, path)
+                except Exception as e:
+                    log.error('assets.build_failed', asset=name, error=str(e))
+        self.assets = assets
+        self._by_url = {asset.url_name: asset for asset in assets.values()}
+        manifest = {name: asset.to_dict() for name, asset in sorted(assets.items())}
+        self._write(os.path.join(self.build_dir, 'manifest.json'), json.dumps(manifest, indent=2).encode())
+        log.info('assets.built', count=len(assets), brotli=brotli is not None)
+        return manifest
+
+    def _build_one(self, name, path) -> Asset:
+        with open(path, 'rb') as f:
+            source = f.read()
+        stem, ext = os.path.splitext(name)
+        data = source
+        minify = MINIFIERS.get(ext)
+        if minify is not None and not stem.endswith('.min'):
+            data = minify(source.decode('utf-8')).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:_HASH_LEN]
+        url_name = f"{stem}.{digest}{ext}"
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if mimetype.startswith('text/') or mimetype == 'application/javascript':
+            mimetype += '; charset=utf-8'
+
+        out = os.path.join(self.build_dir, url_name)
+        self._write(out, data)
+        encodings = {}
+        if ext in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES:
+            variants = [('gzip', '.gz', lambda d: gzip.compress(d, 9, mtime=0))]
+            if brotli is not None:
+                variants.insert(0, ('br', '.br', lambda d: brotli.compress(d, quality=11)))
+            for encoding, suffix, compress in variants:
+                if not os.path.exists(out + suffix):
+                    self._write(out + suffix, compress(data))
+                size = os.path.getsize(out + suffix)
+                if size < len(data):
+                    encodings[encoding] = size
+        return Asset(name, url_name, mimetype, digest, len(data), len(source), encodings)
+
+    @staticmethod
+    def _write(path, data: bytes):
+        if os.path.exists(path) and not path.endswith('manifest.json'):
+            return  # content-addressed: same name, same bytes
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a replica building at the same time never serves a partial file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def url(self, name: str) -> str:
+        """The URL a page should use for static/<name>."""
+        asset = self.assets.get(name) if self.enabled else None
+        if asset is not None:
+            return f"{self.url_prefix}/{asset.url_name}"
+        if name in VENDOR and not os.path.exists(os.path.join(self.static_dir, name)):
+            return VENDOR[name]
+        return f"{self.static_url}/{name}"
+
+    def lookup(self, url_name: str):
+        return self._by_url.get(url_name)
+
+    def choose(self, asset: Asset, accept_encodings) -> tuple:
+        """(path, content encoding or None) for the smallest variant the client accepts."""
+        path = os.path.join(self.build_dir, asset.url_name)
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if encoding in asset.encodings and accept_encodings.quality(encoding) > 0:
+                return path + suffix, encoding
+        return path, None
+
+    def stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'brotli': brotli is not None,
+            'assets': {name: asset.to_dict() for name, asset in sorted(self.assets.items())},
+        }
+
+
+def fetch_vendor(static_dir: str, timeout: float = 30.0) -> list:
+    """Downloads every VENDOR file that is not in static/ yet; returns the names fetched."""
+    import requests
+
+    fetched = []
+    for name, url in VENDOR.items():
+        path = os.path.join(static_dir, name)
+        if os.path.exists(path):
+            continue
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+        AssetPipeline._write(path, response.content)
+        fetched.append(name)
+    return fetched
+
+
+def asset_pipeline_from_env(static_dir: str) -> AssetPipeline:
+    """ASSET_PIPELINE=false serves plain /static URLs; ASSET_BUILD_DIR defaults to static/dist."""
+    enabled = os.environ.get("ASSET_PIPELINE", "true").lower() in ("1", "true", "yes")
+    build_dir = os.environ.get("ASSET_BUILD_DIR") or os.path.join(static_dir, 'dist')
+    return AssetPipeline(static_dir, build_dir, enabled=enabled)
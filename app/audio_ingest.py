@@ -0,0 +1,382 @@
+"""
+Audio ingestion for voice uploads.
+
+Reads an upload in chunks up to a size cap, detects the container and
+codec from its first bytes, and yields what Speech-to-Text should get:
+
+- WebM/Opus, Ogg/Opus and FLAC are passed through untouched; Speech
+  decodes them natively, so there is nothing to gain from doing it here.
+- WAV (PCM or float) is decoded with NumPy, downmixed to mono, resampled
+  down to 16 kHz when it is recorded higher, and trimmed with an energy
+  based VAD: leading and trailing silence is dropped and long pauses are
+  shortened, which cuts both upload size and billed audio.
+
+The PCM path keeps state between chunks (partial frames, resampler phase,
+VAD frames), so memory stays bounded by the chunk size.
+"""
+
+import os
+import struct
+from collections import deque
+
+import numpy as np
+
+# Speech-to-Text RecognitionConfig.AudioEncoding names
+WEBM_OPUS = 'WEBM_OPUS'
+OGG_OPUS = 'OGG_OPUS'
+FLAC = 'FLAC'
+LINEAR16 = 'LINEAR16'
+
+# WAV format tags
+_WAVE_PCM = 1
+_WAVE_FLOAT = 3
+_WAVE_EXTENSIBLE = 0xFFFE
+
+_PROBE_BYTES = 4096  # read before detection; WebM/Ogg codec ids sit in the first few hundred bytes
+_HEAD_LIMIT = 64 * 1024  # bytes read at most to find a WAV data chunk
+
+
+class AudioTooLarge(Exception):
+    """Raised when an upload is bigger than the ingestion cap."""
+
+
+class UnsupportedAudio(Exception):
+    """Raised when an upload is not in a container/codec we can send to Speech."""
+
+
+class _NeedMore(Exception):
+    """The header continues past the bytes read so far."""
+
+
+class AudioFormat:
+    __slots__ = ('container', 'codec', 'encoding', 'sample_rate', 'channels', 'sample_width',
+                 'float_samples', 'data_offset', 'block_align')
+
+    def __init__(self, container, codec, encoding, sample_rate=None, channels=None, sample_width=None,
+                 float_samples=False, data_offset=0):
+        self.container = container
+        self.codec = codec
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.float_samples = float_samples
+        self.data_offset = data_offset
+        self.block_align = (channels or 1) * (sample_width or 0)
+
+    def describe(self) -> str:
+        extra = f" {self.sample_rate}Hz x{self.channels}" if self.sample_rate else ''
+        return f"{self.container}/{self.codec}{extra}"
+
+
+# ==========================================
+# FORMAT DETECTION
+# ==========================================
+def _opus_head(head: bytes):
+    """(channels, input sample rate) from an OpusHead packet, or None."""
+    at = head.find(b'OpusHead')
+    if at < 0 or len(head) < at + 16:
+        return None
+    channels = head[at + 9]
+    rate = struct.unpack_from('<I', head, at + 12)[0]
+    return channels, rate
+
+
+def _parse_wav(head: bytes) -> AudioFormat:
+    if len(head) < 12:
+        raise UnsupportedAudio("Truncated WAV header")
+    pos = 12
+    fmt = None
+    while pos + 8 <= len(head):
+        chunk_id, size = head[pos:pos + 4], struct.unpack_from('<I', head, pos + 4)[0]
+        body = pos + 8
+        if chunk_id == b'fmt ':
+            if len(head) < body + 16:
+                break
+            tag, channels, rate, _, block_align, bits = struct.unpack_from('<HHIIHH', head, body)
+            if tag == _WAVE_EXTENSIBLE and size >= 40 and len(head) >= body + 26:
+                tag = struct.unpack_from('<H', head, body + 24)[0]
+            fmt = (tag, channels, rate, bits)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise UnsupportedAudio("WAV data before its fmt chunk")
+            tag, channels, rate, bits = fmt
+            if tag == _WAVE_PCM and bits in (8, 16, 24, 32):
+                is_float = False
+            elif tag == _WAVE_FLOAT and bits in (32, 64):
+                is_float = True
+            else:
+                raise UnsupportedAudio(f"Unsupported WAV encoding (format {tag}, {bits} bits)")
+            if not channels or not rate:
+                raise UnsupportedAudio("WAV header has no channels or sample rate")
+            return AudioFormat('wav', 'float' if is_float else 'pcm', LINEAR16, rate, channels, bits // 8,
+                               is_float, data_offset=body)
+        pos = body + size + (size & 1)
+    if len(head) >= _HEAD_LIMIT:
+        raise UnsupportedAudio("WAV data chunk not found in the first 64 KB")
+    raise _NeedMore()
+
+
+def detect_format(head: bytes) -> AudioFormat:
+    """Identifies an upload from its first bytes; raises UnsupportedAudio."""
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        if b'A_OPUS' in head:
+            opus = _opus_head(head)
+            return AudioFormat('webm', 'opus', WEBM_OPUS, 48000, opus[0] if opus else None)
+        raise UnsupportedAudio("WebM audio must be Opus")
+    if head[:4] == b'OggS':
+        if b'OpusHead' in head:
+            opus = _opus_head(head)
+            return AudioFormat('ogg', 'opus', OGG_OPUS, 48000, opus[0] if opus else None)
+        raise UnsupportedAudio("Ogg audio must be Opus")
+    if head[:4] == b'fLaC':
+        if len(head) >= 26:
+            # STREAMINFO: 20-bit sample rate, 3-bit channels - 1
+            packed = int.from_bytes(head[18:21], 'big')
+            return AudioFormat('flac', 'flac', FLAC, packed >> 4, ((packed >> 1) & 0x7) + 1)
+        return AudioFormat('flac', 'flac', FLAC)
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return _parse_wav(head)
+    raise UnsupportedAudio("Unrecognized audio format; send WebM/Opus, Ogg/Opus, FLAC or WAV")
+
+
+# ==========================================
+# PCM PROCESSING
+# ==========================================
+def decode_pcm(data: bytes, fmt: AudioFormat) -> np.ndarray:
+    """Interleaved samples as float32 in [-1, 1], shape (frames, channels)."""
+    width = fmt.sample_width
+    if fmt.float_samples:
+        samples = np.frombuffer(data, dtype='<f4' if width == 4 else '<f8').astype(np.float32)
+    elif width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+    elif width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    else:
+        samples = np.frombuffer(data, dtype='<i4').astype(np.float32) / 2147483648.0
+    return samples.reshape(-1, fmt.channels)
+
+
+class Resampler:
+    """
+    Streaming linear-interpolation resampler for downsampling, with a
+    moving-average prefilter against aliasing. Keeps its phase across
+    blocks, so chunk boundaries do not click.
+    """
+
+    def __init__(self, source_rate: int, target_rate: int):
+        self.step = source_rate / target_rate
+        self.width = max(1, int(round(self.step)))
+        self._filter_tail = np.zeros(self.width - 1, dtype=np.float32)
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._pos = 0.0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        if self.width > 1:
+            padded = np.concatenate([self._filter_tail, block])
+            sums = np.cumsum(padded, dtype=np.float64)
+            block = ((sums[self.width - 1:] - np.concatenate([[0.0], sums[:-self.width]])) / self.width)
+            block = block.astype(np.float32)
+            self._filter_tail = padded[len(padded) - (self.width - 1):]
+        x = np.concatenate([self._tail, block])
+        last = len(x) - 1
+        if last < self._pos:
+            self._tail = x
+            return np.zeros(0, dtype=np.float32)
+        count = int((last - self._pos) // self.step) + 1
+        positions = self._pos + self.step * np.arange(count)
+        out = np.interp(positions, np.arange(len(x)), x).astype(np.float32)
+        self._pos = positions[-1] + self.step - last
+        self._tail = x[-1:]
+        return out
+
+
+class EnergyVAD:
+    """
+    Drops silence by frame energy: leading and trailing silence beyond
+    `padding` seconds, and pauses longer than `max_pause` seconds inside
+    the speech.
+    """
+
+    def __init__(self, rate: int, threshold_db: float = -40.0, frame_ms: int = 20,
+                 padding: float = 0.2, max_pause: float = 0.6):
+        self.frame = max(1, rate * frame_ms // 1000)
+        self.threshold = 10 ** (threshold_db / 20)
+        self.padding = max(0, int(padding * 1000 / frame_ms))
+        self.max_pause = max(self.padding, int(max_pause * 1000 / frame_ms))
+        self._rest = np.zeros(0, dtype=np.float32)
+        self._pending = deque(maxlen=max(1, self.max_pause))
+        self.speech_seen = False
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        samples = np.concatenate([self._rest, samples])
+        count = len(samples) // self.frame
+        self._rest = samples[count * self.frame:]
+        if not count:
+            return np.zeros(0, dtype=np.float32)
+        frames = samples[:count * self.frame].reshape(count, self.frame)
+        loud = np.sqrt(np.mean(frames * frames, axis=1)) >= self.threshold
+        out = []
+        for frame, is_speech in zip(frames, loud):
+            if not is_speech:
+                self._pending.append(frame)
+                continue
+            keep = self.max_pause if self.speech_seen else self.padding
+            if keep and self._pending:
+                out.extend(list(self._pending)[-keep:])
+            self._pending.clear()
+            self.speech_seen = True
+            out.append(frame)
+        return np.concatenate(out) if out else np.zeros(0, dtype=np.float32)
+
+    def flush(self) -> np.ndarray:
+        if not self.speech_seen or not self.padding:
+            return np.zeros(0, dtype=np.float32)
+        tail = list(self._pending)[:self.padding]
+        return np.concatenate(tail) if tail else np.zeros(0, dtype=np.float32)
+
+
+def _to_linear16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype('<i2').tobytes()
+
+
+# ==========================================
+# INGESTION
+# ==========================================
+class IngestedAudio:
+    """An upload being read: its format, and chunks() to send to Speech."""
+
+    def __init__(self, fmt: AudioFormat, head: bytes, rest, ingest: 'AudioIngest'):
+        self.format = fmt
+        self._head = head
+        self._rest = rest
+        self._ingest = ingest
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds_in = None
+        self.seconds_out = None
+        self.speech_detected = True
+        # Speech config for what chunks() yields
+        self.encoding = fmt.encoding
+        self.sample_rate = fmt.sample_rate
+        self.channels = fmt.channels
+        self._pcm = fmt.container == 'wav'
+        if self._pcm:
+            self.sample_rate = min(fmt.sample_rate, ingest.target_rate)
+            self.channels = 1
+
+    def _source(self):
+        self.bytes_in = len(self._head)
+        yield self._head
+        for chunk in self._rest:
+            self.bytes_in += len(chunk)
+            yield chunk
+
+    def chunks(self):
+        """Yields the audio for Speech chunk by chunk; raises AudioTooLarge past the cap."""
+        source = self._process_pcm() if self._pcm else self._source()
+        for chunk in source:
+            if chunk:
+                self.bytes_out += len(chunk)
+                yield chunk
+
+    def read(self) -> bytes:
+        return b''.join(self.chunks())
+
+    def _process_pcm(self):
+        fmt, ingest = self.format, self._ingest
+        resampler = Resampler(fmt.sample_rate, self.sample_rate) if fmt.sample_rate > self.sample_rate else None
+        vad = EnergyVAD(self.sample_rate, ingest.vad_threshold_db, padding=ingest.vad_padding,
+                        max_pause=ingest.vad_max_pause) if ingest.vad else None
+        frames_in = samples_out = 0
+        leftover = b''
+        first = True
+        for chunk in self._source():
+            if first:
+                chunk, first = chunk[fmt.data_offset:], False
+            data = leftover + chunk
+            usable = len(data) - len(data) % fmt.block_align
+            data, leftover = data[:usable], data[usable:]
+            if not data:
+                continue
+            frames = decode_pcm(data, fmt)
+            frames_in += len(frames)
+            samples = frames[:, 0] if fmt.channels == 1 else frames.mean(axis=1)
+            if resampler is not None:
+                samples = resampler.process(samples)
+            if vad is not None:
+                samples = vad.process(samples)
+            samples_out += len(samples)
+            yield _to_linear16(samples)
+        if vad is not None:
+            tail = vad.flush()
+            samples_out += len(tail)
+            self.speech_detected = vad.speech_seen
+            yield _to_linear16(tail)
+        self.seconds_in = frames_in / fmt.sample_rate
+        self.seconds_out = samples_out / self.sample_rate
+
+
+class AudioIngest:
+    def __init__(self, max_bytes: int = 10 * 1024 * 1024, chunk_size: int = 32 * 1024,
+                 target_rate: int = 16000, vad: bool = True, vad_threshold_db: float = -40.0,
+                 vad_padding: float = 0.2, vad_max_pause: float = 0.6):
+        """
+        max_bytes: largest upload accepted (AudioTooLarge past it).
+        target_rate: PCM recorded above this is resampled down to it.
+        vad_*: silence below vad_threshold_db (dBFS) is trimmed, keeping
+        vad_padding seconds around speech and at most vad_max_pause of a pause.
+        """
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.target_rate = target_rate
+        self.vad = vad
+        self.vad_threshold_db = vad_threshold_db
+        self.vad_padding = vad_padding
+        self.vad_max_pause = vad_max_pause
+
+    def _read(self, stream):
+        total = 0
+        while True:
+            chunk = stream.read(self.chunk_size)
+            if not chunk:
+                return
+            total += len(chunk)
+            if total > self.max_bytes:
+                raise AudioTooLarge(f"Audio upload is larger than {self.max_bytes} bytes")
+            yield chunk
+
+    def open(self, stream) -> IngestedAudio:
+        """Reads enough of stream to detect its format; the rest is read by chunks()."""
+        reader = self._read(stream)
+        head = b''
+        for chunk in reader:
+            head += chunk
+            if len(head) < _PROBE_BYTES:
+                continue
+            try:
+                return IngestedAudio(detect_format(head), head, reader, self)
+            except _NeedMore:
+                continue
+        if not head:
+            raise UnsupportedAudio("Empty audio upload")
+        try:
+            return IngestedAudio(detect_format(head), head, reader, self)
+        except _NeedMore:
+            raise UnsupportedAudio("Truncated WAV header") from None
+
+
+def audio_ingest_from_env() -> AudioIngest:
+    """Builds the upload ingester from VOICE_* environment variables."""
+    return AudioIngest(
+        max_bytes=int(os.environ.get("VOICE_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024))),
+        target_rate=int(os.environ.get("VOICE_SAMPLE_RATE", "16000")),
+        vad=os.environ.get("VOICE_VAD", "true").lower() in ("1", "true", "yes"),
+        vad_threshold_db=float(os.environ.get("VOICE_VAD_THRESHOLD_DB", "-40")),
+        vad_max_pause=float(os.environ.get("VOICE_VAD_MAX_PAUSE", "0.6")),
+    )
@@ -0,0 +1,288 @@
+"""
+Bounded executors for blocking backend calls (Gemini, Speech, TTS).
+
+Each backend gets its own small worker pool with a concurrency limit, a wait
+timeout for a free slot and a call timeout, so a slow upstream cannot tie up
+every request thread. Works with the default threading model as well as
+gevent/eventlet (ASYNC_MODE), where the calls run on real OS threads so
+blocking SDKs do not stall the event loop.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from metrics import DEPENDENCY_SECONDS
+
+ASYNC_MODE = os.environ.get("ASYNC_MODE", "threading").lower()
+
+# name -> (max concurrency, call timeout in seconds)
+DEFAULT_LIMITS = {
+    'gemini': (16, 60.0),
+    'speech': (8, 30.0),
+    'tts': (8, 30.0),
+    'places': (8, 15.0),
+}
+
+
+_END = object()  # marks the end of a streamed call
+
+
+class BackendBusy(Exception):
+    """Raised when no slot frees up for a backend within the queue timeout."""
+
+
+class BackendTimeout(Exception):
+    """Raised when a backend call does not finish within its timeout."""
+
+
+class BackendExecutor:
+    """Runs blocking calls for one backend with bounded concurrency."""
+
+    def __init__(self, name: str, max_concurrency: int = 8, timeout: float = 30.0,
+                 queue_timeout: float = 5.0, async_mode: str = ASYNC_MODE):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.async_mode = async_mode
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.errors = 0
+
+        if async_mode == 'gevent':
+            from gevent.threadpool import ThreadPool
+            self._pool = ThreadPool(max_concurrency)
+        elif async_mode == 'eventlet':
+            self._pool = None  # eventlet.tpool is a process-wide native pool
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix=f"{name}-backend")
+
+    def call(self, fn, *args, timeout: float = None, **kwargs):
+        """Runs fn(*args, **kwargs) on the backend pool and waits for its result."""
+        return self.submit(fn, *args, **kwargs).result(timeout)
+
+    def submit(self, fn, *args, **kwargs) -> 'PendingCall':
+        """Starts fn(*args, **kwargs) on the backend pool without waiting for it."""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise BackendBusy(f"{self.name} backend is at capacity ({self.max_concurrency} in flight)")
+
+        with self._lock:
+            self.in_flight += 1
+            self.calls += 1
+
+        try:
+            pending = self._submit(self._timed(fn), args, kwargs)
+        except Exception:
+            self._release()
+            raise
+        return PendingCall(self, pending)
+
+    def stream(self, fn, *args, timeout: float = None, **kwargs):
+        """
+        Yields the items of the iterable fn(*args, **kwargs) returns, e.g. a
+        streamed reply. The call and every step of the iteration run on the
+        backend pool, and the slot is held until the iteration ends or the
+        generator is closed. Each item must arrive within timeout.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise BackendBusy(f"{self.name} backend is at capacity ({self.max_concurrency} in flight)")
+        with self._lock:
+            self.in_flight += 1
+            self.calls += 1
+
+        operation = getattr(fn, '__name__', 'call').lstrip('_')
+        started = time.perf_counter()
+        outcome = 'error'
+        pending = None
+        try:
+            pending = self._start(lambda: iter(fn(*args, **kwargs)))
+            iterator = self._wait_counted(pending, timeout)
+            while True:
+                pending = self._start(next, iterator, _END)
+                item = self._wait_counted(pending, timeout)
+                if item is _END:
+                    break
+                yield item
+            outcome = 'ok'
+        finally:
+            DEPENDENCY_SECONDS.observe(time.perf_counter() - started,
+                                       dependency=self.name, operation=operation, outcome=outcome)
+            if pending is None:
+                self._release()
+            else:
+                # Freed when the step in progress finishes, even one that timed out
+                self._link(pending, self._release)
+
+    def _timed(self, fn):
+        """Wraps fn to record how long the upstream call itself takes."""
+        operation = getattr(fn, '__name__', 'call').lstrip('_')
+
+        def run(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = fn(*args, **kwargs)
+                outcome = 'ok'
+                return result
+            finally:
+                DEPENDENCY_SECONDS.observe(time.perf_counter() - started,
+                                           dependency=self.name, operation=operation, outcome=outcome)
+        return run
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self.in_flight,
+                'calls': self.calls,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+            }
+
+    def _release(self, *_):
+        # The slot is only freed once the upstream call actually finishes,
+        # so timed-out calls still count against the concurrency limit.
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _submit(self, fn, args, kwargs):
+        pending = self._start(fn, *args, **kwargs)
+        self._link(pending, self._release)
+        return pending
+
+    def _start(self, fn, *args, **kwargs):
+        """Runs fn on the pool without touching the slots."""
+        if self.async_mode == 'gevent':
+            return self._pool.spawn(fn, *args, **kwargs)
+        if self.async_mode == 'eventlet':
+            import eventlet
+            from eventlet import tpool
+            return eventlet.spawn(tpool.execute, fn, *args, **kwargs)
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def _link(self, pending, callback):
+        """Calls callback once pending has finished (right away if it has)."""
+        if self.async_mode == 'gevent':
+            pending.rawlink(callback)
+        elif self.async_mode == 'eventlet':
+            pending.link(callback)
+        else:
+            pending.add_done_callback(callback)
+
+    def _wait_counted(self, pending, timeout: float):
+        try:
+            return self._wait(pending, timeout)
+        except BackendTimeout:
+            with self._lock:
+                self.timeouts += 1
+            raise
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+
+    def _wait(self, pending, timeout: float):
+        if self.async_mode == 'gevent':
+            import gevent
+            try:
+                return pending.get(timeout=timeout)
+            except gevent.Timeout as exc:
+                raise BackendTimeout(f"{self.name} call timed out after {timeout}s") from exc
+        if self.async_mode == 'eventlet':
+            import eventlet
+            try:
+                with eventlet.Timeout(timeout):
+                    return pending.wait()
+            except eventlet.Timeout as exc:
+                raise BackendTimeout(f"{self.name} call timed out after {timeout}s") from exc
+        try:
+            return pending.result(timeout=timeout)
+        except FutureTimeout as exc:
+            raise BackendTimeout(f"{self.name} call timed out after {timeout}s") from exc
+
+
+class PendingCall:
+    """Handle to a submitted backend call."""
+
+    def __init__(self, executor: BackendExecutor, pending):
+        self._executor = executor
+        self._pending = pending
+
+    def done(self) -> bool:
+        if self._executor.async_mode == 'gevent':
+            return self._pending.ready()
+        if self._executor.async_mode == 'eventlet':
+            return self._pending.dead
+        return self._pending.done()
+
+    def result(self, timeout: float = None):
+        executor = self._executor
+        timeout = executor.timeout if timeout is None else timeout
+        return executor._wait_counted(self._pending, timeout)
+
+    def add_done_callback(self, fn):
+        """Calls fn(outcome) once the call finishes; outcome() returns its result or raises its exception."""
+        self._executor._link(self._pending, lambda *_: fn(lambda: self._executor._wait(self._pending, 0)))
+
+
+class CompletedCall:
+    """A PendingCall stand-in for results that are already available."""
+
+    def __init__(self, value):
+        self._value = value
+
+    def done(self) -> bool:
+        return True
+
+    def result(self, timeout: float = None):
+        return self._value
+
+    def add_done_callback(self, fn):
+        fn(lambda: self._value)
+
+
+def _executor_from_env(name: str, concurrency: int, timeout: float) -> BackendExecutor:
+    prefix = f"BACKEND_{name.upper()}_"
+    return BackendExecutor(
+        name,
+        max_concurrency=int(os.environ.get(prefix + "CONCURRENCY", str(concurrency))),
+        timeout=float(os.environ.get(prefix + "TIMEOUT", str(timeout))),
+        queue_timeout=float(os.environ.get("BACKEND_QUEUE_TIMEOUT", "5")),
+    )
+
+
+executors = {name: _executor_from_env(name, *limits) for name, limits in DEFAULT_LIMITS.items()}
+
+
+def run_blocking(backend: str, fn, *args, **kwargs):
+    """Runs a blocking SDK call on the named backend's bounded executor."""
+    return executors[backend].call(fn, *args, **kwargs)
+
+
+def submit_blocking(backend: str, fn, *args, **kwargs) -> PendingCall:
+    """Starts a blocking SDK call on the named backend's executor; call .result() to wait."""
+    return executors[backend].submit(fn, *args, **kwargs)
+
+
+def stream_blocking(backend: str, fn, *args, **kwargs):
+    """Iterates a streaming SDK call on the named backend's executor, holding its slot until the end."""
+    return executors[backend].stream(fn, *args, **kwargs)
+
+
+def backend_stats() -> dict:
+    return {name: ex.stats() for name, ex in executors.items()}
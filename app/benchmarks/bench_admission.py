@@ -0,0 +1,146 @@
+"""
+/chat latency under overload, with and without admission control.
+
+Runs the app in this process with a fake Gemini taking --latency seconds
+per reply, then sends an open-loop stream of requests at --overload times
+the rate the Gemini backend can serve (its concurrency / latency) for
+--duration seconds. Requests come from --users well-behaved sessions plus
+one noisy session sending --noisy-share of the traffic, keyed by session
+(RATE_LIMIT_BY=session) since every request comes from 127.0.0.1.
+
+- off: ADMISSION_CONTROL=false; requests pile up on the backend executor
+  until BACKEND_QUEUE_TIMEOUT turns them away
+- on:  per-session token buckets and the Gemini gate with its bounded,
+  deadline-aware queue
+
+The report shows goodput, how requests were answered, and latency of the
+well-behaved users' successful replies and of every response.
+
+    python benchmarks/bench_admission.py --overload 2 --duration 10
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fakes import QUESTIONS, FakeModel
+from suite import fire, percentiles
+
+
+def start_app(args):
+    os.environ.update({
+        'CLIENT_WARMUP': 'false',
+        'TTS_WARMUP': 'false',
+        'LOG_LEVEL': 'WARNING',
+        'RESPONSE_CACHE': 'false',
+        'CHAT_STREAMING': 'false',
+        'RATE_LIMIT_BY': 'session',
+    })
+    import app as healthmate
+    import logging
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    healthmate.clients.set('gemini', FakeModel(first_token=args.latency, token_delay=0))
+    server = make_server('127.0.0.1', args.port, healthmate.app, threaded=True)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return healthmate, server, f'http://127.0.0.1:{args.port}'
+
+
+def reset_admission(healthmate):
+    """Fresh buckets and gate counters, so each mode starts from the same state."""
+    from admission import admission_from_env
+    backends = {name: s['max_concurrency'] for name, s in healthmate.backend_stats().items()
+                if name in ('gemini', 'speech')}
+    enabled = healthmate.admission.enabled
+    healthmate.admission = admission_from_env(backends)
+    healthmate.admission.enabled = enabled
+
+
+def overload(url, args, rate):
+    """Open loop: one request every 1/rate seconds, whatever the app is doing."""
+    users = [uuid.uuid4().hex for _ in range(args.users)]
+    noisy = 'noisy-' + uuid.uuid4().hex
+    results = []
+    lock = threading.Lock()
+
+    def send(i, session):
+        body = json.dumps({'message': QUESTIONS[i % len(QUESTIONS)], 'session_id': session}).encode()
+        req = urllib.request.Request(url + '/chat', data=body, headers={
+            'Content-Type': 'application/json', 'X-Session-Id': session})
+        status, seconds, _ = fire(req, args.timeout)
+        with lock:
+            results.append((session == noisy, status, seconds))
+
+    total = int(rate * args.duration)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.max_clients) as pool:
+        for i in range(total):
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            noisy_turn = (i * args.noisy_share) % 1 + args.noisy_share >= 1
+            pool.submit(send, i, noisy if noisy_turn else users[i % len(users)])
+    return results, time.perf_counter() - started
+
+
+def summarize(results, elapsed):
+    statuses = {}
+    for _, status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    good = [s for noisy, status, s in results if status == 200 and not noisy]
+    return {
+        'goodput': sum(1 for _, status, _ in results if status == 200) / elapsed,
+        'statuses': statuses,
+        'users_ok': percentiles(good) or {},
+        'all': percentiles([s for _, _, s in results]) or {},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.2, help='fake Gemini seconds per reply')
+    parser.add_argument('--overload', type=float, default=2.0, help='offered load / Gemini capacity')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--noisy-share', type=float, default=0.3, help='share of requests from one session')
+    parser.add_argument('--max-clients', type=int, default=1024, help='requests in flight at most (client side)')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--port', type=int, default=5081)
+    args = parser.parse_args()
+
+    healthmate, server, url = start_app(args)
+    capacity = healthmate.backend_stats()['gemini']['max_concurrency'] / args.latency
+    rate = capacity * args.overload
+    print(f"Gemini capacity {capacity:.0f} req/s, offering {rate:.0f} req/s for {args.duration:.0f}s "
+          f"({args.noisy_share:.0%} from one session)\n")
+    print(f"{'mode':<5} {'goodput':>9} {'200':>6} {'429':>6} {'503':>6} {'other':>6}   "
+          f"{'users p50':>10} {'users p99':>10}   {'all p99':>8}")
+    try:
+        for mode in ('off', 'on'):
+            healthmate.admission.enabled = mode == 'on'
+            reset_admission(healthmate)
+            results, elapsed = overload(url, args, rate)
+            row = summarize(results, elapsed)
+            st = row['statuses']
+            other = sum(n for code, n in st.items() if code not in (200, 429, 503))
+            print(f"{mode:<5} {row['goodput']:>7.1f}/s {st.get(200, 0):>6} {st.get(429, 0):>6} {st.get(503, 0):>6} "
+                  f"{other:>6}   {row['users_ok'].get('p50', 0):>8.0f}ms {row['users_ok'].get('p99', 0):>8.0f}ms   "
+                  f"{row['all'].get('p99', 0):>6.0f}ms")
+            time.sleep(args.latency * 5)  # let stragglers drain before the next mode
+    finally:
+        server.shutdown()
+    print("\nusers: successful replies to the well-behaved sessions; all: every response, errors included")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Page weight and modelled time to interactive, with and without the asset pipeline.
+
+Loads each page through the app's test client the way a browser would.
+First it fetches the HTML, then every same-origin <script>, stylesheet
+and <audio> it references, in parallel. Each page gets a first visit with
+an empty cache and a repeat visit that reuses what the first one cached:
+- before: ASSET_PIPELINE=false, plain /static URLs, which Flask serves
+  with no-cache, so every repeat visit revalidates each file (a 304 round
+  trip)
+- after: minified, fingerprinted and pre-compressed /assets URLs with an
+  immutable Cache-Control, so repeat visits request nothing but the HTML
+
+Bytes are what crosses the wire, headers included. Time to interactive is
+modelled for a --rtt / --bandwidth link:
+    one RTT and transfer for the HTML
+    + one RTT and transfer for the subresources, if any are requested
+    + the server time measured here
+Scripts from other origins (the Socket.IO CDN until it is vendored with
+`flask --app app build-assets --fetch-vendor`) are listed but not measured.
+
+    python benchmarks/bench_assets.py --rtt 0.15 --bandwidth 1.6
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from html.parser import HTMLParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+PAGES = ('/', '/chatbot', '/reminders', '/hospitals', '/voice')
+ACCEPT_ENCODING = 'br, gzip'
+
+
+class SubresourceParser(HTMLParser):
+    """Collects the URLs a page loads before it is interactive."""
+
+    def __init__(self):
+        super().__init__()
+        self.urls = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'script' and attrs.get('src'):
+            self.urls.append(attrs['src'])
+        elif tag == 'link' and attrs.get('rel') == 'stylesheet' and attrs.get('href'):
+            self.urls.append(attrs['href'])
+        elif tag == 'audio' and attrs.get('src') and attrs.get('preload') != 'none':
+            self.urls.append(attrs['src'])
+
+
+def wire_size(response) -> int:
+    headers = sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+    return len(response.get_data()) + headers + len('HTTP/1.1 200 OK\r\n\r\n')
+
+
+class Browser:
+    """A private HTTP cache that honours Cache-Control and revalidates with If-None-Match."""
+
+    def __init__(self, client):
+        self.client = client
+        self.cache = {}  # url -> (etag, fresh)
+
+    def get(self, url):
+        """Returns (bytes on the wire, requested, server seconds)."""
+        headers = {'Accept-Encoding': ACCEPT_ENCODING}
+        cached = self.cache.get(url)
+        if cached is not None:
+            etag, fresh = cached
+            if fresh:
+                return 0, False, 0.0
+            if etag:
+                headers['If-None-Match'] = etag
+        started = time.perf_counter()
+        response = self.client.get(url, headers=headers)
+        size = wire_size(response)
+        elapsed = time.perf_counter() - started
+        cache_control = response.headers.get('Cache-Control', '')
+        if response.status_code == 200 and 'no-store' not in cache_control:
+            fresh = 'immutable' in cache_control or (
+                re.search(r'max-age=(\d+)', cache_control) is not None and 'no-cache' not in cache_control)
+            self.cache[url] = (response.headers.get('ETag'), fresh)
+        response.close()
+        return size, True, elapsed
+
+
+def load(browser, page, args):
+    html_bytes, _, server = browser.get(page)
+    parser = SubresourceParser()
+    parser.feed(browser.client.get(page).get_data(as_text=True))
+    local = [u for u in parser.urls if u.startswith('/')]
+    external = len(parser.urls) - len(local)
+
+    sub_bytes, requests, sub_server = 0, 0, 0.0
+    for url in local:
+        size, requested, elapsed = browser.get(url)
+        sub_bytes += size
+        requests += requested
+        sub_server = max(sub_server, elapsed)  # fetched in parallel
+
+    bandwidth = args.bandwidth * 1e6 / 8
+    tti = args.rtt + html_bytes / bandwidth + server
+    if requests:
+        tti += args.rtt + sub_bytes / bandwidth + sub_server
+    return {'bytes': html_bytes + sub_bytes, 'sub_bytes': sub_bytes, 'requests': 1 + requests,
+            'external': external, 'tti': tti}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rtt', type=float, default=0.15, help='round trip seconds')
+    parser.add_argument('--bandwidth', type=float, default=1.6, help='downlink Mbit/s')
+    args = parser.parse_args()
+
+    os.environ.update({'CLIENT_WARMUP': 'false', 'TTS_WARMUP': 'false', 'LOG_LEVEL': 'WARNING'})
+    import app as healthmate
+
+    client = healthmate.app.test_client()
+    print(f"Link: {args.rtt * 1000:.0f} ms RTT, {args.bandwidth} Mbit/s; Accept-Encoding: {ACCEPT_ENCODING}\n")
+    print(f"{'page':<11} {'mode':<7} {'visit':<7} {'bytes':>8} {'assets':>8} {'requests':>9} {'external':>9} {'TTI ms':>8}")
+    totals = {}
+    for page in PAGES:
+        for mode in ('before', 'after'):
+            healthmate.assets.enabled = mode == 'after'
+            browser = Browser(client)
+            for visit in ('first', 'repeat'):
+                row = load(browser, page, args)
+                total = totals.setdefault((mode, visit), {'bytes': 0, 'requests': 0, 'tti': 0.0})
+                for key in total:
+                    total[key] += row[key]
+                print(f"{page:<11} {mode:<7} {visit:<7} {row['bytes']:>8} {row['sub_bytes']:>8} "
+                      f"{row['requests']:>9} {row['external']:>9} {row['tti'] * 1000:>8.0f}")
+    print(f"\n{'all pages':<11} {'mode':<7} {'visit':<7} {'bytes':>8} {'requests':>9} {'TTI ms':>8}")
+    for (mode, visit), total in sorted(totals.items(), key=lambda kv: (kv[0][1], kv[0][0] != 'before')):
+        print(f"{'':<11} {mode:<7} {visit:<7} {total['bytes']:>8} {total['requests']:>9} {total['tti'] * 1000:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Voice upload ingestion: bytes and seconds of audio sent to Speech.
+
+Builds --clips synthetic WAV recordings the way a browser or phone might
+send them (--rate Hz, --channels, 16-bit): short bursts of speech-like
+tone separated by pauses, with silence before and after. Each clip goes
+through AudioIngest:
+- upload:   the file as recorded, what used to be sent to Speech
+- resample: downmixed and resampled to 16 kHz (VOICE_VAD=false)
+- ingest:   downmixed, resampled and trimmed of silence (the default)
+
+The report shows ingest throughput, and the bytes and seconds of audio
+sent to Speech. Speech bills and (roughly) takes time per second of audio,
+so --stt-rtf (recognition seconds per audio second) and --uplink
+(bytes/s to Speech) turn that into modeled latency saved per request.
+
+    python benchmarks/bench_audio.py --clips 50 --rate 48000 --channels 2
+"""
+
+import argparse
+import io
+import os
+import statistics
+import struct
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from audio_ingest import AudioIngest
+
+
+def make_clip(rng, rate, channels, lead=1.0, bursts=3, burst=1.2, pause=1.5, tail=1.0):
+    """A 16-bit WAV: silence, `bursts` voiced segments split by pauses, silence."""
+    parts = [rng.normal(0, 0.002, int(lead * rate))]
+    for i in range(bursts):
+        t = np.arange(int(burst * rate)) / rate
+        pitch = rng.uniform(110, 220)
+        voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        voiced *= 0.25 * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))  # syllable-rate envelope
+        parts.append(voiced + rng.normal(0, 0.002, len(t)))
+        if i < bursts - 1:
+            parts.append(rng.normal(0, 0.002, int(pause * rate)))
+    parts.append(rng.normal(0, 0.002, int(tail * rate)))
+    mono = np.concatenate(parts)
+    frames = np.repeat(mono[:, None], channels, axis=1)
+    data = (np.clip(frames, -1, 1) * 32767).astype('<i2').tobytes()
+    fmt = struct.pack('<HHIIHH', 1, channels, rate, rate * channels * 2, channels * 2, 16)
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + b'data' + struct.pack('<I', len(data)) + data
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def run(ingest, clips):
+    """Returns (bytes in, bytes out, seconds in, seconds out, wall seconds) summed over clips."""
+    totals = [0, 0, 0.0, 0.0, 0.0]
+    for clip in clips:
+        started = time.perf_counter()
+        upload = ingest.open(io.BytesIO(clip))
+        upload.read()
+        totals[4] += time.perf_counter() - started
+        totals[0] += upload.bytes_in
+        totals[1] += upload.bytes_out
+        totals[2] += upload.seconds_in
+        totals[3] += upload.seconds_out
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clips', type=int, default=50)
+    parser.add_argument('--rate', type=int, default=48000, help='recording sample rate')
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--threshold-db', type=float, default=-40.0, help='VOICE_VAD_THRESHOLD_DB')
+    parser.add_argument('--stt-rtf', type=float, default=0.3, help='Speech seconds per second of audio')
+    parser.add_argument('--uplink', type=float, default=1_000_000, help='bytes/s from the app to Speech')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    clips = [make_clip(rng, args.rate, args.channels, bursts=int(rng.integers(1, 5))) for _ in range(args.clips)]
+    modes = {
+        'resample': AudioIngest(max_bytes=1 << 40, vad=False),
+        'ingest': AudioIngest(max_bytes=1 << 40, vad_threshold_db=args.threshold_db),
+    }
+    print(f"{len(clips)} clips, {args.rate} Hz x{args.channels}, "
+          f"{statistics.mean(len(c) for c in clips) / 1e6:.2f} MB each on average\n")
+    print(f"{'mode':<12} {'MB/s':>8} {'MB sent':>9} {'audio s':>9} {'STT s/req':>10} {'upload s/req':>13}")
+    results = {}
+
+    def report(mode, throughput, bytes_out, seconds_out):
+        stt = args.stt_rtf * seconds_out / len(clips)
+        upload = bytes_out / args.uplink / len(clips)
+        results[mode] = (bytes_out, seconds_out, stt + upload)
+        print(f"{mode:<12} {throughput:>8} {bytes_out / 1e6:>9.2f} {seconds_out:>9.1f} {stt:>10.3f} {upload:>13.3f}")
+
+    for mode, ingest in modes.items():
+        bytes_in, bytes_out, seconds_in, seconds_out, wall = run(ingest, clips)
+        if not results:
+            report('upload', '-', bytes_in, seconds_in)
+        report(mode, f"{bytes_in / wall / 1e6:.1f}", bytes_out, seconds_out)
+    before, after = results['upload'], results['ingest']
+    print(f"\nsent to Speech: {after[0] / before[0]:.1%} of the bytes, {after[1] / before[1]:.1%} of the audio; "
+          f"modeled {1000 * (before[2] - after[2]):.0f} ms saved per request")
+
+
+if __name__ == '__main__':
+    main()
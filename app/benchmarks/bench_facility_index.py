@@ -0,0 +1,121 @@
+"""
+Benchmark of the offline facility index (facility_index.py).
+
+Generates --facilities synthetic facilities clustered around cities,
+builds and saves the index, then reports:
+- build time and size on disk
+- load time with memory mapping vs reading the arrays into memory
+- k-nearest query p50/p99, unfiltered and with the emergency/24h
+  filters, against a brute-force NumPy scan of every facility
+
+    python benchmarks/bench_facility_index.py --facilities 1000000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from facility_index import EMERGENCY, OPEN_24H, FacilityIndex, _haversine_m
+
+
+def make_records(count, cities=2000, seed=1):
+    rng = np.random.default_rng(seed)
+    city_lat = rng.uniform(-50, 65, cities)
+    city_lng = rng.uniform(-180, 180, cities)
+    which = rng.integers(0, cities, count)
+    lats = np.clip(city_lat[which] + rng.normal(0, 0.15, count), -90, 90)
+    lngs = (city_lng[which] + rng.normal(0, 0.15, count) + 180) % 360 - 180
+    emergency = rng.random(count) < 0.3
+    open_24h = rng.random(count) < 0.2
+    return [{
+        'name': f'Facility {i}', 'address': f'{i} Example Road', 'phone': '',
+        'lat': float(lats[i]), 'lng': float(lngs[i]),
+        'emergency': bool(emergency[i]), 'open_24h': bool(open_24h[i]),
+    } for i in range(count)], (city_lat, city_lng)
+
+
+def disk_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return (ordered[len(ordered) // 2] * 1000,
+            ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000)
+
+
+def brute_force(index, lat, lng, k, radius, require):
+    d = _haversine_m(lat, lng, index.coords[:, 0], index.coords[:, 1])
+    if require:
+        d[(index.flags & require) != require] = np.inf
+    d[d > radius] = np.inf
+    pos = np.argpartition(d, k)[:k]
+    pos = pos[np.argsort(d[pos], kind='stable')]
+    return pos[np.isfinite(d[pos])], d[pos][np.isfinite(d[pos])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--facilities', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--radius', type=int, default=50000)
+    parser.add_argument('--cell-deg', type=float, default=0.1)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    records, (city_lat, city_lng) = make_records(args.facilities)
+    print(f"generated {args.facilities} facilities in {time.perf_counter() - started:.1f}s")
+
+    path = tempfile.mkdtemp(prefix='facility-index-')
+    try:
+        started = time.perf_counter()
+        FacilityIndex.build(records, args.cell_deg).save(path)
+        print(f"built and saved in {time.perf_counter() - started:.1f}s, {disk_size(path) / 1e6:.1f} MB on disk")
+        del records
+
+        for mmap in (True, False):
+            started = time.perf_counter()
+            FacilityIndex.load(path, mmap=mmap)
+            print(f"load ({'mmap' if mmap else 'read'}): {(time.perf_counter() - started) * 1000:.2f}ms")
+        index = FacilityIndex.load(path)
+
+        rng = np.random.default_rng(2)
+        which = rng.integers(0, len(city_lat), args.queries)
+        queries = list(zip(city_lat[which] + rng.normal(0, 0.2, args.queries),
+                           (city_lng[which] + rng.normal(0, 0.2, args.queries) + 180) % 360 - 180))
+
+        print(f"\n{'query':<22} {'index p50':>10} {'p99':>8} {'scan p50':>10} {'p99':>8} {'same':>6}")
+        for label, require in (('k-nearest', 0), ('emergency', EMERGENCY),
+                               ('emergency + 24h', EMERGENCY | OPEN_24H)):
+            fast, slow, same = [], [], 0
+            for i, (lat, lng) in enumerate(queries):
+                started = time.perf_counter()
+                pos, d = index.nearest(lat, lng, args.k, args.radius, require)
+                fast.append(time.perf_counter() - started)
+                if i < 200:
+                    started = time.perf_counter()
+                    _, ref = brute_force(index, lat, lng, args.k, args.radius, require)
+                    slow.append(time.perf_counter() - started)
+                    same += len(ref) == len(d) and np.allclose(ref, d)
+            p50, p99 = percentiles(fast)
+            s50, s99 = percentiles(slow)
+            print(f"{label:<22} {p50:>8.3f}ms {p99:>6.3f}ms {s50:>8.2f}ms {s99:>6.2f}ms {same / len(slow):>6.0%}")
+
+        started = time.perf_counter()
+        for lat, lng in queries:
+            index.find(lat, lng, 5000, limit=args.k)
+        print(f"\nfind() with records, 5km: {(time.perf_counter() - started) / len(queries) * 1000:.3f}ms per query")
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
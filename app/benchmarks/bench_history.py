@@ -0,0 +1,104 @@
+"""
+Per-turn prompt size and latency over a long conversation.
+
+Plays one --turns long conversation through the SessionStore three ways:
+- unbounded:  every turn resends the whole history
+- window:     the old CHAT_SESSION_MAX_HISTORY cut-off (drops old turns)
+- compaction: HistoryCompactor, older turns rolled into a summary in the
+              background once the session is over its token budget
+
+The fake Gemini takes --base-latency plus --per-token seconds for every
+prompt token, so latency follows prompt size as it does upstream. The
+report shows prompt tokens and latency at checkpoints through the
+conversation; with compaction both stay flat.
+
+    python benchmarks/bench_history.py --turns 500 --budget 4000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chat_history import HistoryCompactor, estimate_tokens, history_tokens
+from fakes import ANSWERS, QUESTIONS, FakeModel
+from session_store import SessionStore
+
+
+class PromptCostModel(FakeModel):
+    """A fake Gemini whose latency grows with the prompt: history plus message."""
+
+    def __init__(self, base_latency, per_token):
+        super().__init__(first_token=base_latency, token_delay=0)
+        self.per_token = per_token
+        self.summaries = 0
+
+    def start_chat(self, history=None):
+        model = self
+
+        class Chat:
+            def __init__(self):
+                self.history = list(history or [])
+
+            def send_message(self, message, stream=False):
+                prompt = history_tokens(self.history) + estimate_tokens(message)
+                time.sleep(model.first_token + model.per_token * prompt)
+                text = ' '.join(ANSWERS)
+                self.history += [{'role': 'user', 'parts': [message]}, {'role': 'model', 'parts': [text]}]
+                return SimpleNamespace(text=text)
+
+        return Chat()
+
+    def generate_content(self, prompt, summary_words=100):
+        self.summaries += 1
+        time.sleep(self.per_token * estimate_tokens(prompt))
+        return super().generate_content(prompt, summary_words)
+
+
+def converse(store, turns):
+    """Returns [(prompt_tokens, seconds)] per turn."""
+    rows = []
+    for turn in range(turns):
+        message = f"{QUESTIONS[turn % len(QUESTIONS)]} (turn {turn})"
+        chat = store.get_or_create('voice:caller')
+        prompt = history_tokens(chat.history) + estimate_tokens(message)
+        started = time.perf_counter()
+        chat.send_message(message)
+        rows.append((prompt, time.perf_counter() - started))
+        store.save('voice:caller')
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=500)
+    parser.add_argument('--budget', type=int, default=4000, help='CHAT_SESSION_TOKEN_BUDGET')
+    parser.add_argument('--max-history', type=int, default=40, help='CHAT_SESSION_MAX_HISTORY')
+    parser.add_argument('--base-latency', type=float, default=0.002)
+    parser.add_argument('--per-token', type=float, default=1e-6, help='seconds per prompt token')
+    args = parser.parse_args()
+
+    checkpoints = sorted(t for t in {1, 10, 50, 100, args.turns // 2, args.turns} if 1 <= t <= args.turns)
+    print(f"{'mode':<12} " + ' '.join(f"{f'turn {t}':>14}" for t in checkpoints) +
+          f" {'mean ms':>9} {'summaries':>10}")
+    for mode in ('unbounded', 'window', 'compaction'):
+        model = PromptCostModel(args.base_latency, args.per_token)
+        compactor = None
+        if mode == 'compaction':
+            compactor = HistoryCompactor(lambda prompt: model.generate_content(prompt).text,
+                                         token_budget=args.budget, max_messages=args.max_history)
+        store = SessionStore(model.start_chat, max_history=0 if mode == 'unbounded' else args.max_history,
+                             compactor=compactor)
+        rows = converse(store, args.turns)
+        cells = [f"{rows[t - 1][0]:>6}t {rows[t - 1][1] * 1000:>5.1f}ms" for t in checkpoints]
+        mean_ms = statistics.mean(seconds for _, seconds in rows) * 1000
+        print(f"{mode:<12} " + ' '.join(f"{c:>14}" for c in cells) + f" {mean_ms:>9.1f} {model.summaries:>10}")
+    print("\ncells: prompt tokens and Gemini latency of that turn")
+
+
+if __name__ == '__main__':
+    main()
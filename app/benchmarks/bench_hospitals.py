@@ -0,0 +1,176 @@
+"""
+Benchmark of /api/find_hospitals lookups against a fake Places server.
+
+Starts a local stand-in for the Places Nearby Search endpoint that serves
+--hospitals generated places around a city and answers after --latency
+seconds. Then it runs --queries lookups from users scattered around the
+city, with and without the geohash cache, and reports the hit ratio and
+p50/p99 latency.
+
+    python benchmarks/bench_hospitals.py --queries 2000 --latency 0.08
+
+The fake server can also be left running for manual testing, pointing the
+app at it with GOOGLE_PLACES_BASE_URL:
+
+    python benchmarks/bench_hospitals.py serve --port 5099
+    GOOGLE_PLACES_API_KEY=fake GOOGLE_PLACES_BASE_URL=http://127.0.0.1:5099 python app.py
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from hospital_lookup import HospitalLookup, PlacesClient, haversine_m
+
+CITY = (13.0827, 80.2707)  # Chennai
+
+
+# ==========================================
+# FAKE PLACES SERVER
+# ==========================================
+def make_places(count, spread=0.25, seed=1):
+    rng = random.Random(seed)
+    return [{
+        'name': f'Hospital {i}',
+        'vicinity': f'{i} Example Road',
+        'rating': round(rng.uniform(3.0, 5.0), 1),
+        'place_id': f'fake-place-{i}',
+        'geometry': {'location': {'lat': CITY[0] + rng.uniform(-spread, spread),
+                                  'lng': CITY[1] + rng.uniform(-spread, spread)}},
+    } for i in range(count)]
+
+
+class FakePlacesServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, places, latency):
+        super().__init__(address, _FakePlacesHandler)
+        self.places = places
+        self.latency = latency
+        self.requests = 0
+
+
+class _FakePlacesHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/maps/api/place/nearbysearch/json':
+            self.send_error(404)
+            return
+        query = parse_qs(url.query)
+        lat, lng = (float(x) for x in query['location'][0].split(','))
+        # rankby=distance has no radius; Places stops at 50km
+        radius = float(query['radius'][0]) if 'radius' in query else 50000
+        time.sleep(self.server.latency)
+        self.server.requests += 1
+
+        found = []
+        for place in self.server.places:
+            loc = place['geometry']['location']
+            distance = haversine_m(lat, lng, loc['lat'], loc['lng'])
+            if distance <= radius:
+                found.append((distance, place))
+        # Real Places orders radius searches by prominence; nearest-first
+        # keeps the uncached and cached answers comparable
+        found.sort(key=lambda pair: pair[0])
+        body = json.dumps({
+            'status': 'OK' if found else 'ZERO_RESULTS',
+            'results': [place for _, place in found[:20]],
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_places(port, hospitals, latency):
+    server = FakePlacesServer(('127.0.0.1', port), make_places(hospitals), latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ==========================================
+# BENCHMARK
+# ==========================================
+def make_queries(count, seed=2):
+    """Users cluster around a few neighbourhoods, like real traffic."""
+    rng = random.Random(seed)
+    centers = [(CITY[0] + rng.uniform(-0.15, 0.15), CITY[1] + rng.uniform(-0.15, 0.15)) for _ in range(40)]
+    queries = []
+    for _ in range(count):
+        lat, lng = rng.choice(centers)
+        queries.append((lat + rng.gauss(0, 0.01), lng + rng.gauss(0, 0.01)))
+    return queries
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000
+
+
+def bench(args):
+    server = start_fake_places(args.port, args.hospitals, args.latency)
+    base_url = f'http://127.0.0.1:{args.port}'
+    queries = make_queries(args.queries)
+
+    client = PlacesClient('fake-key', base_url=base_url)
+    direct_results = []
+    latencies = []
+    for lat, lng in queries:
+        started = time.perf_counter()
+        direct_results.append(client.nearby_hospitals(lat, lng, args.radius)[:args.limit])
+        latencies.append(time.perf_counter() - started)
+    print(f"{'uncached':<10} {len(queries):>6} lookups  upstream calls {server.requests:>6}  "
+          f"p50 {percentile(latencies, 50):>7.1f}ms  p99 {percentile(latencies, 99):>7.1f}ms")
+
+    server.requests = 0
+    lookup = HospitalLookup(PlacesClient('fake-key', base_url=base_url), precision=args.precision)
+    latencies = []
+    agree = 0
+    for (lat, lng), direct in zip(queries, direct_results):
+        started = time.perf_counter()
+        hospitals, _ = lookup.find(lat, lng, args.radius, limit=args.limit)
+        latencies.append(time.perf_counter() - started)
+        agree += [h['place_id'] for h in hospitals] == [h['place_id'] for h in direct]
+    stats = lookup.stats()
+    print(f"{'cached':<10} {len(queries):>6} lookups  upstream calls {server.requests:>6}  "
+          f"p50 {percentile(latencies, 50):>7.1f}ms  p99 {percentile(latencies, 99):>7.1f}ms  "
+          f"hit ratio {stats['hit_ratio']:.2%}  same results {agree / len(queries):.2%}")
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', nargs='?', choices=['bench', 'serve'], default='bench')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--hospitals', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.08)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--radius', type=int, default=5000)
+    parser.add_argument('--precision', type=int, default=6)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.mode == 'serve':
+        print(f"Fake Places server on http://127.0.0.1:{args.port} ({args.hospitals} hospitals)")
+        FakePlacesServer(('127.0.0.1', args.port), make_places(args.hospitals), args.latency).serve_forever()
+    else:
+        bench(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark of reminder onboarding: one POST /api/reminders per row vs a
+single streamed POST /api/reminders/import, plus the streaming export
+(the full-collection export that `flask export-reminders` runs).
+
+Runs the Flask app in-process through its test client. Uses a local mongod
+when MONGO_URI is set, otherwise mongomock (absolute numbers are only
+meaningful against mongod):
+
+    python benchmarks/bench_import.py --rows 2000,20000
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_import.py --rows 20000,200000
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def get_database():
+    uri = os.environ.get("MONGO_URI")
+    if uri:
+        from pymongo import MongoClient
+        return MongoClient(uri).healthmate_bench, 'mongod'
+    import mongomock
+    return mongomock.MongoClient().healthmate_bench, 'mongomock'
+
+
+def make_rows(count):
+    # Spread over 30 days so most rows fall outside the scheduler window
+    start = datetime.now() + timedelta(minutes=5)
+    for i in range(count):
+        yield {
+            'medicine_name': f'Medicine {i % 500}',
+            'reminder_time': (start + timedelta(seconds=i * 2592000 // max(count, 1))).isoformat(timespec='seconds'),
+            'phone': f'+1555{i % 10000000:07d}',
+            'email': None,
+            'owner': f'patient-{i % 1000}',
+        }
+
+
+def as_jsonl(rows):
+    return ''.join(json.dumps(row) + '\n' for row in rows).encode()
+
+
+def as_csv(rows):
+    lines = ['medicine_name,reminder_time,phone,email,owner']
+    lines += [f"{r['medicine_name']},{r['reminder_time']},{r['phone']},,{r['owner']}" for r in rows]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def reset(healthmate, database):
+    database.reminders.drop()
+    healthmate.clients.set('mongo', database)
+    healthmate.scheduler.remove_all_jobs()
+    healthmate.init_reminder_scheduler()
+    healthmate.reminder_scheduler.refill()
+
+
+def report(label, rows, elapsed):
+    print(f"{label:<28} {rows:>8} rows {elapsed:>8.2f}s {rows / elapsed:>10.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default='2000,20000', help='comma-separated row counts')
+    parser.add_argument('--single-limit', type=int, default=5000,
+                        help='skip the one-request-per-row run above this many rows')
+    args = parser.parse_args()
+
+    # Read MONGO_URI before the app loads .env
+    database, backend = get_database()
+    import app as healthmate
+    from reminder_bulk import export_rows, find_reminders_for_export
+    client = healthmate.app.test_client()
+    print(f"Backend: {backend}\n")
+
+    for count in [int(x) for x in args.rows.split(',')]:
+        rows = list(make_rows(count))
+
+        if count <= args.single_limit:
+            reset(healthmate, database)
+            started = time.perf_counter()
+            for row in rows:
+                response = client.post('/api/reminders', json=row)
+                assert response.status_code == 201, response.data
+            report('POST per row', count, time.perf_counter() - started)
+
+        for fmt, payload, content_type in (('jsonl', as_jsonl(rows), 'application/x-ndjson'),
+                                           ('csv', as_csv(rows), 'text/csv')):
+            reset(healthmate, database)
+            started = time.perf_counter()
+            response = client.post('/api/reminders/import', data=io.BytesIO(payload), content_type=content_type)
+            elapsed = time.perf_counter() - started
+            assert response.json['inserted'] == count, response.json
+            report(f'bulk import ({fmt})', count, elapsed)
+
+        for fmt in ('jsonl', 'csv'):
+            # The whole collection, as `flask export-reminders` streams it (the HTTP route is per owner)
+            started = time.perf_counter()
+            size = sum(len(chunk) for chunk in export_rows(find_reminders_for_export(database.reminders), fmt))
+            report(f'export ({fmt}, {size // 1024} KiB)', count, time.perf_counter() - started)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Offline throughput benchmark for reminder notifications.
+
+Starts an aiosmtpd sink and a fake Twilio HTTP server on localhost, then
+sends N emails and N SMS two ways: the old one-connection-per-message
+path and the NotificationDispatcher with pooled connections.
+
+    pip install aiosmtpd
+    python benchmarks/bench_notifications.py --messages 2000
+"""
+
+import argparse
+import json
+import os
+import smtplib
+import sys
+import threading
+import time
+from email.mime.text import MIMEText
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from notifications import NotificationDispatcher, SMTPConnectionPool, make_twilio_client
+
+ACCOUNT_SID = 'AC' + '0' * 32
+
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    received = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        FakeTwilioHandler.received += 1
+        body = json.dumps({'sid': 'SM' + '0' * 32, 'status': 'queued', 'account_sid': ACCOUNT_SID}).encode()
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SinkHandler:
+    received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        SinkHandler.received += len(envelope.rcpt_tos)
+        return '250 OK'
+
+
+def start_fakes(smtp_port, twilio_port):
+    from aiosmtpd.controller import Controller
+
+    controller = Controller(SinkHandler(), hostname='127.0.0.1', port=smtp_port)
+    controller.start()
+    httpd = ThreadingHTTPServer(('127.0.0.1', twilio_port), FakeTwilioHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return controller, httpd
+
+
+def old_email(n, port):
+    for i in range(n):
+        msg = MIMEText("⏰ Medicine Reminder: Take Paracetamol")
+        msg['Subject'] = "Medicine Reminder"
+        msg['From'] = 'reminders@example.com'
+        msg['To'] = f'patient{i}@example.com'
+        with smtplib.SMTP('127.0.0.1', port, timeout=15) as server:
+            server.send_message(msg)
+
+
+def old_sms(n, base_url):
+    for i in range(n):
+        client = make_twilio_client(ACCOUNT_SID, 'token', base_url=base_url)
+        client.messages.create(to=f'+1555000{i:04d}', from_='+15550000000', body='Take Paracetamol')
+
+
+def dispatcher_run(n, smtp_port, base_url, channel):
+    dispatcher = NotificationDispatcher(
+        twilio_client=make_twilio_client(ACCOUNT_SID, 'token', base_url=base_url) if channel == 'sms' else None,
+        twilio_from='+15550000000',
+        smtp_pool=SMTPConnectionPool('127.0.0.1', smtp_port, starttls=False) if channel == 'email' else None,
+        smtp_from='reminders@example.com',
+        sms_rate=0, email_rate=0, email_batch_window=0.05,
+    )
+    dispatcher.start()
+    for i in range(n):
+        if channel == 'sms':
+            dispatcher.send_sms(f'+1555000{i:04d}', 'Take Paracetamol')
+        else:
+            dispatcher.send_email(f'patient{i}@example.com', 'Medicine Reminder',
+                                  f"⏰ Medicine Reminder: Take Medicine {i % 20}")
+    dispatcher.join()
+    return dispatcher
+
+
+def timed(label, n, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    if isinstance(result, NotificationDispatcher):
+        result.stop()  # worker shutdown is not part of the measured send time
+    print(f"{label:<24} {n:>6} msgs {elapsed:>8.2f}s {n / elapsed:>9.1f} msg/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--smtp-port', type=int, default=8025)
+    parser.add_argument('--twilio-port', type=int, default=8026)
+    args = parser.parse_args()
+
+    import builtins
+    quiet_print = builtins.print
+    controller, httpd = start_fakes(args.smtp_port, args.twilio_port)
+    base_url = f'http://127.0.0.1:{args.twilio_port}'
+    n = args.messages
+    try:
+        builtins.print = lambda *a, **k: None if str(a[0]).startswith('✓') else quiet_print(*a, **k)
+        timed('email: connect per msg', n, lambda: old_email(n, args.smtp_port))
+        timed('email: dispatcher', n, lambda: dispatcher_run(n, args.smtp_port, base_url, 'email'))
+        timed('sms: client per msg', n, lambda: old_sms(n, base_url))
+        timed('sms: dispatcher', n, lambda: dispatcher_run(n, args.smtp_port, base_url, 'sms'))
+    finally:
+        builtins.print = quiet_print
+        controller.stop()
+        httpd.shutdown()
+    print(f"sink received {SinkHandler.received} emails, fake Twilio received {FakeTwilioHandler.received} SMS")
+
+
+if __name__ == '__main__':
+    main()
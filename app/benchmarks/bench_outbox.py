@@ -0,0 +1,162 @@
+"""
+POST /api/reminders with synchronous inserts vs the write-behind outbox.
+
+Runs the app in this process behind a local HTTP server. MongoDB is
+mongomock behind a proxy that adds --rtt seconds to every round trip,
+standing in for a cloud cluster reached over TLS. For each of --clients,
+that many threads post --requests reminders as fast as they are answered:
+- sync:  insert_one per request (REMINDER_OUTBOX unset)
+- outbox: appended to a local SQLite outbox and acknowledged, then
+  written by the flusher in bulk_write batches
+
+The report shows request latency, requests/s, and MongoDB writes per
+second: reminders in MongoDB divided by the time until the last one got
+there. With --outage N, MongoDB refuses every call for the first N
+seconds of each run.
+
+    python benchmarks/bench_outbox.py --requests 2000 --clients 1,8,32 --rtt 0.04
+    python benchmarks/bench_outbox.py --outage 2
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from suite import fire, percentiles
+
+
+class SlowCollection:
+    """A collection whose every call costs one round trip, and fails while the outage lasts."""
+
+    def __init__(self, collection, rtt, lock, down_until):
+        self._collection = collection
+        self._rtt = rtt
+        self._lock = lock
+        self._down_until = down_until
+        self.round_trips = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            from pymongo.errors import AutoReconnect
+
+            time.sleep(self._rtt)
+            if time.monotonic() < self._down_until[0]:
+                raise AutoReconnect('connection refused (simulated outage)')
+            with self._lock:  # mongomock is not thread-safe
+                self.round_trips += 1
+                return attr(*args, **kwargs)
+
+        return call
+
+
+class SlowDatabase:
+    def __init__(self, database, rtt):
+        self._database = database
+        self._lock = threading.Lock()
+        self.down_until = [0.0]
+        self.reminders = SlowCollection(database.reminders, rtt, self._lock, self.down_until)
+
+    def __getattr__(self, name):
+        return getattr(self._database, name)
+
+
+def post_reminders(url, args, clients, tag):
+    start = datetime.now() + timedelta(days=1)
+    results = []
+    lock = threading.Lock()
+
+    def send(i):
+        body = json.dumps({'medicine_name': f'{tag} medicine {i % 50}', 'owner': f'patient-{i % 100}',
+                           'reminder_time': (start + timedelta(minutes=i)).isoformat(timespec='seconds')})
+        req = urllib.request.Request(url + '/api/reminders', data=body.encode(),
+                                     headers={'Content-Type': 'application/json'})
+        status, seconds, _ = fire(req, 60)
+        with lock:
+            results.append((status, seconds))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(send, range(args.requests)))
+    return results, time.perf_counter() - started, started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--clients', default='1,8,32', help='comma-separated client counts')
+    parser.add_argument('--rtt', type=float, default=0.04, help='seconds per MongoDB round trip')
+    parser.add_argument('--outage', type=float, default=0.0, help='seconds MongoDB is down at the start of a run')
+    parser.add_argument('--port', type=int, default=5093)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='healthmate-outbox-')
+    os.environ.update({
+        'CLIENT_WARMUP': 'false',
+        'TTS_WARMUP': 'false',
+        'LOG_LEVEL': 'ERROR',
+        'REMINDER_AUDIO': 'false',
+        'ADMISSION_CONTROL': 'false',
+    })
+    import logging
+    import mongomock
+    from werkzeug.serving import make_server
+    import app as healthmate
+    from reminder_outbox import ReminderOutbox
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    database = SlowDatabase(mongomock.MongoClient().healthmate_bench, args.rtt)
+    healthmate.clients.set('mongo', database)
+    healthmate.init_reminder_scheduler()
+    server = make_server('127.0.0.1', args.port, healthmate.app, threaded=True)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{args.port}'
+
+    print(f"{args.requests} reminders per run, MongoDB round trip {args.rtt * 1000:.0f} ms"
+          f"{f', down for the first {args.outage:.1f}s' if args.outage else ''}\n")
+    print(f"{'clients':>7} {'mode':<7} {'201':>6} {'errors':>7} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8} "
+          f"{'in MongoDB':>11} {'writes/s':>9} {'round trips':>12}")
+    outbox = ReminderOutbox(os.path.join(tmp, 'outbox.db'), healthmate._reminders_collection,
+                            on_flushed=healthmate._schedule_flushed, retry_max=0.5)
+    try:
+        for clients in [int(c) for c in args.clients.split(',')]:
+            for mode in ('sync', 'outbox'):
+                healthmate.reminder_outbox = outbox if mode == 'outbox' else None
+                collection = database.reminders
+                collection.round_trips = 0
+                before = database._database.reminders.count_documents({})
+                database.down_until[0] = time.monotonic() + args.outage
+
+                results, elapsed, started = post_reminders(url, args, clients, f'{mode}{clients}')
+                if mode == 'outbox':
+                    outbox.drain(120)
+                landed = time.perf_counter() - started
+                written = database._database.reminders.count_documents({}) - before
+
+                ok = [s for status, s in results if status == 201]
+                pct = percentiles(ok) or {}
+                print(f"{clients:>7} {mode:<7} {len(ok):>6} {len(results) - len(ok):>7} {pct.get('p50', 0):>8.1f} "
+                      f"{pct.get('p99', 0):>8.1f} {len(ok) / elapsed:>8.0f} {written:>11} {written / landed:>9.0f} "
+                      f"{collection.round_trips:>12}")
+    finally:
+        outbox.stop()
+        server.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Background rendering of spoken reminder clips, in clips per second.
+
+Runs the app in this process with a fake TTS taking --tts-latency seconds
+per clip and mongomock. For each worker count, a bulk import of --rows
+reminders over --medicines distinct medicine names is posted, and the run
+ends when every distinct reminder text has been rendered into the TTS cache.
+Each distinct text should cost exactly one TTS call however many reminders
+use it.
+
+The last table compares the firing path: delivering a reminder whose clip
+was rendered in advance (the event carries audio_url) against rendering
+the clip when the reminder fires.
+
+    python benchmarks/bench_reminder_audio.py --rows 5000 --medicines 200 --workers 1,2,4,8
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fakes import FakeTTSClient
+from suite import percentiles
+
+
+class CountingTTS(FakeTTSClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def synthesize_speech(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+        return super().synthesize_speech(**kwargs)
+
+
+def make_rows(count, medicines, tag):
+    start = datetime.now() + timedelta(days=1)
+    for i in range(count):
+        yield {
+            'medicine_name': f'{tag} medicine {i % medicines}',
+            'reminder_time': (start + timedelta(minutes=i)).isoformat(timespec='seconds'),
+            'owner': f'patient-{i % 1000}',
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--medicines', type=int, default=200, help='distinct medicine names')
+    parser.add_argument('--workers', default='1,2,4,8', help='comma-separated renderer worker counts')
+    parser.add_argument('--tts-latency', type=float, default=0.05)
+    parser.add_argument('--fires', type=int, default=50, help='reminders fired per firing-path mode')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='healthmate-reminder-audio-')
+    os.environ.update({
+        'CLIENT_WARMUP': 'false',
+        'TTS_WARMUP': 'false',
+        'TTS_CACHE_DIR': os.path.join(tmp, 'tts'),
+        'LOG_LEVEL': 'WARNING',
+        'BACKEND_QUEUE_TIMEOUT': '600',
+    })
+    import mongomock
+    import app as healthmate
+    from reminder_audio import ReminderAudioRenderer
+
+    database = mongomock.MongoClient().healthmate_bench
+    healthmate.clients.set('mongo', database)
+    tts = CountingTTS(latency=args.tts_latency)
+    healthmate.clients.set('tts', tts)
+    healthmate.init_reminder_scheduler()
+    client = healthmate.app.test_client()
+
+    tts_slots = healthmate.backend_stats()['tts']['max_concurrency']
+    print(f"{args.rows} reminders over {args.medicines} medicines, TTS {args.tts_latency * 1000:.0f} ms/clip, "
+          f"TTS backend concurrency {tts_slots}\n")
+    print(f"{'workers':>7} {'import s':>9} {'render s':>9} {'clips':>6} {'TTS calls':>10} {'clips/s':>9}")
+    try:
+        for workers in [int(w) for w in args.workers.split(',')]:
+            healthmate.reminder_audio.stop()
+            healthmate.reminder_audio = ReminderAudioRenderer(
+                healthmate._render_reminder_clip, healthmate._reminder_text, healthmate._reminder_audio_key,
+                healthmate.tts_cache.contains, workers=workers)
+            payload = ''.join(json.dumps(row) + '\n' for row in make_rows(args.rows, args.medicines, f'w{workers}'))
+            calls = tts.calls
+            started = time.perf_counter()
+            response = client.post('/api/reminders/import', data=io.BytesIO(payload.encode()),
+                                   content_type='application/x-ndjson')
+            imported = time.perf_counter() - started
+            assert response.json['inserted'] == args.rows, response.json
+            healthmate.reminder_audio.join()
+            elapsed = time.perf_counter() - started
+            stats = healthmate.reminder_audio.stats()
+            print(f"{workers:>7} {imported:>9.2f} {elapsed:>9.2f} {stats['rendered']:>6} "
+                  f"{tts.calls - calls:>10} {stats['rendered'] / elapsed:>9.1f}")
+
+        print(f"\n{'firing path':<22} {'p50 ms':>8} {'p99 ms':>8} {'with audio_url':>15}")
+        reminders = list(database.reminders.find({'medicine_name': {'$regex': '^w'}}).limit(args.fires))
+        for mode in ('pre-rendered', 'render at fire time'):
+            latencies, with_audio = [], 0
+            for i, reminder in enumerate(reminders):
+                if mode == 'render at fire time':
+                    reminder = dict(reminder, medicine_name=f'cold medicine {i}', audio_key=None)
+                started = time.perf_counter()
+                if mode == 'render at fire time':
+                    healthmate.synthesize_speech_gcs(healthmate._reminder_text(reminder['medicine_name']))
+                healthmate.deliver_reminder(reminder, f'bench-{mode}-{i}')
+                latencies.append(time.perf_counter() - started)
+                key = reminder.get('audio_key') or healthmate._reminder_audio_key(
+                    healthmate._reminder_text(reminder['medicine_name']))
+                with_audio += healthmate.tts_cache.contains(key)
+            pct = percentiles(latencies) or {}
+            print(f"{mode:<22} {pct.get('p50', 0):>8.1f} {pct.get('p99', 0):>8.1f} {with_audio:>11}/{len(reminders)}")
+    finally:
+        healthmate.reminder_audio.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
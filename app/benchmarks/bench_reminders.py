@@ -0,0 +1,115 @@
+"""
+Benchmark of GET /api/reminders: full-collection listing vs owner-scoped keyset pages.
+
+Uses a local mongod when MONGO_URI is set, otherwise mongomock (which has no
+real indexes, so absolute numbers are only meaningful against mongod):
+
+    python benchmarks/bench_reminders.py --sizes 10000,100000
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_reminders.py --sizes 10000,100000,1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from reminder_store import ensure_reminder_indexes, find_reminders_page, serialize_reminder, encode_cursor
+
+
+def get_collection():
+    uri = os.environ.get("MONGO_URI")
+    if uri:
+        from pymongo import MongoClient
+        return MongoClient(uri).healthmate_bench.reminders, 'mongod'
+    import mongomock
+    return mongomock.MongoClient().healthmate_bench.reminders, 'mongomock'
+
+
+def seed(collection, size, owners, batch=10000):
+    collection.drop()
+    ensure_reminder_indexes(collection)
+    start = datetime(2025, 1, 1)
+    docs = []
+    for i in range(size):
+        docs.append({
+            'medicine_name': f'Medicine {i % 500}',
+            'reminder_time': start + timedelta(minutes=i),
+            'phone': None,
+            'email': None,
+            'owner': f'owner-{i % owners}',
+            'created_at': start,
+        })
+        if len(docs) == batch:
+            collection.insert_many(docs)
+            docs = []
+    if docs:
+        collection.insert_many(docs)
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, count
+
+
+def list_all(collection):
+    # The previous implementation: load everything, stringify in Python
+    reminders = list(collection.find({}, {"_id": 1, "medicine_name": 1, "reminder_time": 1, "phone": 1, "email": 1}))
+    for r in reminders:
+        r['_id'] = str(r['_id'])
+        r['reminder_time'] = str(r['reminder_time'])
+    return len(reminders)
+
+
+def walk_pages(collection, owner, pages, limit):
+    after = None
+    count = 0
+    for _ in range(pages):
+        last = None
+        rows = 0
+        for reminder in find_reminders_page(collection, owner=owner, after=after, limit=limit):
+            if rows == limit:
+                break
+            serialize_reminder(reminder)
+            last = reminder
+            rows += 1
+        count += rows
+        if last is None or rows < limit:
+            break
+        after = (last['reminder_time'], last['_id'])
+        encode_cursor(*after)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000')
+    parser.add_argument('--owners', type=int, default=1000)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    collection, kind = get_collection()
+    print(f"backend: {kind}")
+    print(f"{'reminders':>10} {'mode':<14} {'seconds':>9} {'peak MB':>8} {'rows':>8}")
+    for size in [int(x) for x in args.sizes.split(',')]:
+        seed(collection, size, args.owners)
+        for mode, fn in (
+            ('list-all', lambda: list_all(collection)),
+            ('owner-pages', lambda: walk_pages(collection, 'owner-7', args.pages, args.limit)),
+            ('global-pages', lambda: walk_pages(collection, None, args.pages, args.limit)),
+        ):
+            elapsed, peak, count = measure(fn)
+            print(f"{size:>10} {mode:<14} {elapsed:>9.4f} {peak / 1e6:>8.2f} {count:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark of reminder rehydration at startup.
+
+Seeds N pending reminders spread over the next --days days and measures how
+long ReminderScheduler.start() takes (horizon window only) versus
+registering an APScheduler job for every pending reminder. Uses a local
+mongod when MONGO_URI is set, otherwise mongomock:
+
+    python benchmarks/bench_scheduler.py --pending 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.date import DateTrigger
+
+from reminder_scheduler import ReminderScheduler, STATUS_PENDING
+
+
+def get_collection():
+    uri = os.environ.get("MONGO_URI")
+    if uri:
+        from pymongo import MongoClient
+        return MongoClient(uri).healthmate_bench.reminders, 'mongod'
+    import mongomock
+    return mongomock.MongoClient().healthmate_bench.reminders, 'mongomock'
+
+
+def seed(collection, pending, days, batch=10000):
+    collection.drop()
+    now = datetime.now()
+    step = timedelta(days=days) / pending
+    docs = []
+    for i in range(pending):
+        docs.append({
+            'medicine_name': f'Medicine {i % 500}',
+            'reminder_time': now + step * (i + 1),
+            'status': STATUS_PENDING,
+        })
+        if len(docs) == batch:
+            collection.insert_many(docs)
+            docs = []
+    if docs:
+        collection.insert_many(docs)
+
+
+def noop(reminder_id):
+    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pending', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--horizon', type=float, default=3600)
+    args = parser.parse_args()
+
+    collection, kind = get_collection()
+    seed(collection, args.pending, args.days)
+    print(f"backend: {kind}, pending reminders: {args.pending} over {args.days} days")
+
+    scheduler = BackgroundScheduler()
+    engine = ReminderScheduler(scheduler, collection, noop, horizon=args.horizon)
+    engine.ensure_indexes()
+    started = time.perf_counter()
+    loaded = engine.start()
+    elapsed = time.perf_counter() - started
+    print(f"windowed rehydrate: {elapsed:.3f}s, {loaded} timers")
+
+    scheduler = BackgroundScheduler()
+    started = time.perf_counter()
+    count = 0
+    for reminder in collection.find({'status': STATUS_PENDING}, {'_id': 1, 'reminder_time': 1}):
+        scheduler.add_job(noop, trigger=DateTrigger(run_date=reminder['reminder_time']),
+                          args=[str(reminder['_id'])], id=f"reminder-{reminder['_id']}")
+        count += 1
+    elapsed = time.perf_counter() - started
+    print(f"full rehydrate:     {elapsed:.3f}s, {count} jobs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Upstream calls for --concurrency identical requests arriving together.
+
+Runs app.py in this process against fake Gemini, TTS and Places backends
+that count their calls. Each workload releases --concurrency threads at
+once on the same input, with the caches cold, once with single-flight off
+(SINGLE_FLIGHT=false) and once on:
+
+- tts:         get_speech_audio(text), as /api/voice-chat does
+- tts_stream:  _submit_tts(sentence).result(), as the streaming voice route does
+- chat:        first turns on new sessions asking the same question
+- chat_stream: the same, streamed
+- places:      hospital lookups from points within the same geohash cell
+
+    python benchmarks/bench_single_flight.py --concurrency 100
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_hospitals import start_fake_places
+from fakes import QUESTIONS, FakeChat, FakeModel, FakeTTSClient
+from suite import percentiles
+
+
+class CountingModel(FakeModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def start_chat(self, history=None):
+        model = self
+
+        class Chat(FakeChat):
+            def send_message(self, message, stream=False):
+                with model._lock:
+                    model.calls += 1
+                return super().send_message(message, stream)
+
+        return Chat(self, history)
+
+
+class CountingTTS(FakeTTSClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def synthesize_speech(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+        return super().synthesize_speech(**kwargs)
+
+
+def burst(concurrency, fn):
+    """Runs fn(i) on `concurrency` threads released together; returns (latencies, errors)."""
+    barrier = threading.Barrier(concurrency)
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def run(i):
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            fn(i)
+        except Exception as e:
+            with lock:
+                errors.append(e)
+            return
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--gemini-latency', type=float, default=0.5)
+    parser.add_argument('--tts-latency', type=float, default=0.2)
+    parser.add_argument('--places-latency', type=float, default=0.1)
+    parser.add_argument('--port', type=int, default=5091, help='fake Places server')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='healthmate-flight-')
+    places = start_fake_places(args.port, 500, args.places_latency)
+    os.environ.update({
+        'CLIENT_WARMUP': 'false',
+        'TTS_WARMUP': 'false',
+        'TTS_CACHE_DIR': os.path.join(tmp, 'tts'),
+        'RESPONSE_CACHE': 'false',
+        'LOG_LEVEL': 'WARNING',
+        'GOOGLE_PLACES_API_KEY': 'fake',
+        'GOOGLE_PLACES_BASE_URL': f'http://127.0.0.1:{args.port}',
+        'BACKEND_QUEUE_TIMEOUT': '60',
+    })
+    import app as healthmate
+
+    model = CountingModel(first_token=args.gemini_latency, token_delay=0)
+    tts = CountingTTS(latency=args.tts_latency)
+    healthmate.clients.set('gemini', model)
+    healthmate.clients.set('tts', tts)
+    flights = [healthmate.chat_flights, healthmate.tts_flights, healthmate.hospital_lookup.flights]
+
+    def places_calls():
+        return places.requests
+
+    rounds = iter(range(1_000_000))
+
+    def workload(name):
+        """Returns (fn(i), upstream call counter) on fresh, uncached input."""
+        n = next(rounds)
+        if name == 'tts':
+            text = f"Take one tablet of medicine {n} with water."
+            return lambda i: healthmate.get_speech_audio(text), lambda: tts.calls
+        if name == 'tts_stream':
+            text = f"Rest and drink plenty of fluids, note {n}."
+            return lambda i: healthmate._submit_tts(text).result(), lambda: tts.calls
+        if name == 'chat':
+            question = f"{QUESTIONS[n % len(QUESTIONS)]} ({n})"
+            return lambda i: healthmate.send_chat_message(uuid.uuid4().hex, question), lambda: model.calls
+        if name == 'chat_stream':
+            question = f"{QUESTIONS[n % len(QUESTIONS)]} ({n})"
+            return lambda i: ''.join(healthmate.stream_chat_reply(uuid.uuid4().hex, question)), lambda: model.calls
+        # Points up to ~50 m apart in a city that has not been looked up yet
+        lat, lng = 40.0 + n * 0.5, -74.0
+        return (lambda i: healthmate.hospital_lookup.find(lat + (i % 10) * 1e-4, lng + (i // 10) * 1e-4),
+                places_calls)
+
+    print(f"{args.concurrency} identical requests at once, caches cold\n")
+    print(f"{'workload':<12} {'mode':<4} {'upstream calls':>15} {'errors':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    try:
+        for name in ('tts', 'tts_stream', 'chat', 'chat_stream', 'places'):
+            for mode in ('off', 'on'):
+                for flight in flights:
+                    flight.enabled = mode == 'on'
+                fn, counter = workload(name)
+                before = counter()
+                latencies, errors = burst(args.concurrency, fn)
+                pct = percentiles(latencies) or {}
+                print(f"{name:<12} {mode:<4} {counter() - before:>15} {len(errors):>7} "
+                      f"{pct.get('p50', 0):>8.0f} {pct.get('p99', 0):>8.0f}")
+    finally:
+        places.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+    print("\n" + ', '.join(f"{name}: {s['shared']} shared" for name, s in healthmate.single_flight_stats().items()))
+
+
+if __name__ == '__main__':
+    main()
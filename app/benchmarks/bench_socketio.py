@@ -0,0 +1,97 @@
+"""
+Benchmark of reminder_due fan-out with many connected Socket.IO clients.
+
+Connects --clients in-process test clients, each in its own owner room
+(the app's connect handler), then compares:
+- the old behaviour, a broadcast of the full reminder to every client
+- the new behaviour, deliver_reminder() emitting to the owner's room only
+
+It reports emit latency, server CPU time per emit and how many packets
+and bytes the server queued. Test clients skip the network, so these
+numbers are the server-side cost of the fan-out:
+
+    python benchmarks/bench_socketio.py --clients 10000 --emits 50
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def drain(clients):
+    packets = size = 0
+    for client in clients:
+        for packet in client.get_received():
+            packets += 1
+            size += len(json.dumps(packet['args']))
+    return packets, size
+
+
+def run(label, clients, emit, emits):
+    latencies = []
+    cpu = 0.0
+    packets = size = 0
+    for i in range(emits):
+        cpu_start = time.process_time()
+        started = time.perf_counter()
+        emit(i)
+        latencies.append(time.perf_counter() - started)
+        cpu += time.process_time() - cpu_start
+        sent, nbytes = drain(clients)
+        packets += sent
+        size += nbytes
+    latencies.sort()
+    return (f"{label:<22} p50 {statistics.median(latencies) * 1000:>8.2f}ms "
+            f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:>8.2f}ms "
+            f"cpu/emit {cpu / emits * 1000:>8.2f}ms "
+            f"packets/emit {packets / emits:>8.0f} bytes/emit {size / emits:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=10000)
+    parser.add_argument('--emits', type=int, default=50)
+    args = parser.parse_args()
+
+    import app as healthmate
+
+    started = time.perf_counter()
+    clients = [healthmate.socketio.test_client(healthmate.app, auth={'owner': f'patient-{i}'})
+               for i in range(args.clients)]
+    print(f"{args.clients} clients connected in {time.perf_counter() - started:.1f}s\n")
+
+    def reminder(i):
+        return {
+            '_id': f'reminder-{i}',
+            'medicine_name': 'Metformin 500mg',
+            'reminder_time': datetime.now(),
+            'phone': '+15555550100',
+            'email': 'patient@example.com',
+            'owner': f'patient-{i % args.clients}',
+            'recurrence': 'FREQ=DAILY;BYHOUR=8,20;BYMINUTE=0',
+        }
+
+    def broadcast(i):
+        rem = healthmate.serialize_reminder(reminder(i))
+        with healthmate.app.app_context():
+            healthmate.socketio.emit('reminder_due', {'reminder': rem})
+
+    def targeted(i):
+        healthmate.deliver_reminder(reminder(i), f'reminder-{i}:0')
+
+    for label, emit in (('broadcast (before)', broadcast), ('owner room (after)', targeted)):
+        # deliver_reminder prints a line per reminder
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            line = run(label, clients, emit, args.emits)
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Import-time and startup benchmark for app.py.
+
+Runs each measurement in a fresh interpreter:
+- `python -X importtime -c "import app"`, reporting the total and the
+  slowest top-level imports
+- the same import after eagerly importing the backend SDKs, which is
+  what app.py did before clients were created lazily
+- time until /healthz answers, and until every configured backend is
+  warm (with CLIENT_WARMUP=true)
+
+It also fails if any of the backend SDKs gets imported by `import app`
+again, or if the import takes longer than --budget-ms, so it can run in
+CI to catch regressions:
+
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 1500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Imported only when a backend is first used
+LAZY_MODULES = ('google.generativeai', 'google.cloud.speech_v1p1beta1', 'google.cloud.texttospeech_v1',
+                'google.oauth2.service_account', 'twilio.rest', 'certifi', 'numpy', 'pymongo')
+
+_STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.app.test_client().get('/healthz')
+serving = time.perf_counter()
+for future in app.clients.warm():
+    future.result()
+warm = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'healthz_ms': (serving - started) * 1000,
+    'warm_ms': (warm - started) * 1000,
+    'backends': {k: v['state'] for k, v in app.clients.status(check=False).items()},
+}))
+"""
+
+
+def run_python(code, env, importtime=False):
+    cmd = [sys.executable, '-W', 'ignore']
+    if importtime:
+        cmd.append('-X')
+        cmd.append('importtime')
+    cmd += ['-c', code]
+    return subprocess.run(cmd, cwd=APP_DIR, env=env, capture_output=True, text=True, check=True)
+
+
+def parse_importtime(stderr, depth=0):
+    """Returns [(cumulative_us, module)] for the imports at one nesting depth, slowest first."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if (len(name) - len(name.lstrip())) // 2 == depth:
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)
+
+
+def import_app(env, preload=()):
+    """Returns (ms spent in preload + `import app`, SDKs `import app` pulled in, importtime output)."""
+    code = ''.join(f'import {m}\n' for m in preload)
+    code += 'import sys\nbefore = set(sys.modules)\nimport app\n'
+    code += f'print(sorted(m for m in {LAZY_MODULES!r} if m in sys.modules and m not in before))'
+    result = run_python(code, env, importtime=True)
+    top = dict((name, us) for us, name in parse_importtime(result.stderr))
+    total_us = sum(top.get(name, 0) for name in list(preload) + ['app'])
+    return total_us / 1000, result.stdout.strip().splitlines()[-1], result.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=8)
+    parser.add_argument('--budget-ms', type=float, default=None, help='fail if `import app` takes longer')
+    args = parser.parse_args()
+
+    env = dict(os.environ, CLIENT_WARMUP='false', TTS_WARMUP='false')
+
+    lazy, eager = [], []
+    for _ in range(args.runs):
+        app_ms, loaded, stderr = import_app(env)
+        lazy.append(app_ms)
+        eager.append(import_app(env, preload=LAZY_MODULES)[0])
+    lazy_ms, eager_ms = statistics.median(lazy), statistics.median(eager)
+    print(f"import app (lazy clients):         {lazy_ms:>8.0f}ms")
+    print(f"import app + SDKs (eager, before): {eager_ms:>8.0f}ms")
+    print("\nslowest imports under `import app` (last run):")
+    for us, name in parse_importtime(stderr, depth=1)[:args.top]:
+        print(f"  {us / 1000:>8.1f}ms  {name}")
+
+    startup = json.loads(run_python(_STARTUP_SCRIPT, env).stdout.strip().splitlines()[-1])
+    print(f"\n/healthz answering after {startup['healthz_ms']:.0f}ms; "
+          f"all backends warm after {startup['warm_ms']:.0f}ms")
+    print(f"backends: {startup['backends']}")
+
+    failures = []
+    if loaded != '[]':
+        failures.append(f"`import app` loaded backend SDKs eagerly: {loaded}")
+    if args.budget_ms is not None and lazy_ms > args.budget_ms:
+        failures.append(f"`import app` took {lazy_ms:.0f}ms, over the {args.budget_ms:.0f}ms budget")
+    for failure in failures:
+        print(f"✗ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark of the reminder timer core at scale.
+
+Schedules N reminders (one next occurrence each) in the TimerQueue and in
+APScheduler's in-memory job store, and reports memory per scheduled
+reminder, scheduling cost, cancel cost and how fast due timers are
+dispatched. Also times Recurrence.next_after(), which runs once per fired
+occurrence. Timings include tracemalloc's overhead, so compare them with
+each other rather than reading them as absolute costs:
+
+    python benchmarks/bench_timers.py --reminders 1000000 --apscheduler 100000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bson.objectid import ObjectId
+
+from recurrence import Recurrence
+from timer_queue import TimerQueue
+
+
+def noop(*args):
+    pass
+
+
+def make_keys(count):
+    return [str(ObjectId()) for _ in range(count)]
+
+
+def measure(label, count, fn):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} {count:>9} {elapsed:>8.2f}s {elapsed / count * 1e6:>8.2f} us/op "
+          f"{current / count:>8.0f} B/reminder")
+    return result
+
+
+def bench_timer_queue(keys, spread):
+    now = time.time()
+    queue = TimerQueue(noop)
+    measure('TimerQueue.schedule_many', len(keys),
+            lambda: queue.schedule_many((key, now + 60 + i * spread) for i, key in enumerate(keys)))
+
+    single = TimerQueue(noop)
+    sample = keys[:100000]
+    measure('TimerQueue.schedule (one at a time)', len(sample),
+            lambda: [single.schedule(key, now + 60 + i * spread) for i, key in enumerate(sample)])
+    measure('TimerQueue.cancel', len(sample), lambda: [single.cancel(key) for key in sample])
+
+    # Everything due at once: how fast the timer thread drains the heap
+    fired = []
+    done = threading.Event()
+    target = len(sample)
+
+    def on_due(key):
+        fired.append(key)
+        if len(fired) == target:
+            done.set()
+
+    draining = TimerQueue(on_due)
+    draining.schedule_many((key, now - 1) for key in sample)
+    started = time.perf_counter()
+    draining.start()
+    done.wait(60)
+    elapsed = time.perf_counter() - started
+    draining.stop()
+    print(f"{'TimerQueue dispatch':<34} {len(fired):>9} {elapsed:>8.2f}s {elapsed / max(len(fired), 1) * 1e6:>8.2f} us/op")
+    return queue
+
+
+def bench_apscheduler(keys, spread):
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.date import DateTrigger
+
+    scheduler = BackgroundScheduler()
+    scheduler.start(paused=True)
+    start = datetime.now() + timedelta(minutes=1)
+
+    def add_all():
+        for i, key in enumerate(keys):
+            scheduler.add_job(noop, trigger=DateTrigger(run_date=start + timedelta(seconds=i * spread)),
+                              args=[key], id=f"reminder-{key}")
+
+    measure('APScheduler add_job', len(keys), add_all)
+    scheduler.shutdown(wait=False)
+
+
+def bench_recurrence(count):
+    rule = Recurrence('FREQ=DAILY;BYHOUR=8,20;BYMINUTE=0;COUNT=28', datetime(2026, 1, 1, 7, 0))
+    weekly = Recurrence('FREQ=WEEKLY;BYDAY=MO,WE,FR;BYHOUR=9;INTERVAL=2', datetime(2026, 1, 1, 7, 0))
+    for label, recurrence in (('Recurrence.next_after (daily)', rule), ('Recurrence.next_after (weekly)', weekly)):
+        when = recurrence.first()
+        started = time.perf_counter()
+        for _ in range(count):
+            when = recurrence.next_after(when)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<34} {count:>9} {elapsed:>8.2f}s {elapsed / count * 1e6:>8.2f} us/op")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reminders', type=int, default=1000000)
+    parser.add_argument('--apscheduler', type=int, default=100000,
+                        help='reminders to add to APScheduler for comparison (0 to skip)')
+    parser.add_argument('--days', type=int, default=30, help='spread of next-fire times')
+    args = parser.parse_args()
+
+    spread = args.days * 86400 / args.reminders
+    keys = make_keys(args.reminders)
+    print(f"{'':<34} {'reminders':>9} {'total':>9} {'per op':>11} {'memory':>17}")
+    queue = bench_timer_queue(keys, spread)
+    if args.apscheduler:
+        bench_apscheduler(keys[:args.apscheduler], spread)
+    bench_recurrence(100000)
+    print(f"\n{len(queue)} reminders held in the TimerQueue")
+
+
+if __name__ == '__main__':
+    main()
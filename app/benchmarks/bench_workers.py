@@ -0,0 +1,126 @@
+"""
+Scaling benchmark for REMINDER_FIRING=lease.
+
+Seeds --reminders due reminders, then starts N worker processes, each
+owning 1/N of the shards, and measures reminders fired per second until
+all of them are sent. Delivery is simulated with a --deliver-ms sleep
+standing in for the notification enqueue. Also checks that every
+reminder was delivered exactly once.
+
+Needs a real mongod, since worker processes cannot share mongomock:
+
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_workers.py --workers 1,2,4,8
+
+Without MONGO_URI, workers run as threads over mongomock, which only
+checks correctness; the numbers do not mean anything.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from reminder_scheduler import STATUS_PENDING, STATUS_SENT
+from reminder_workers import ReminderLeaseWorker, assign_shard
+
+DB_NAME = 'healthmate_bench'
+_MOCK_CLIENT = None
+
+
+def get_database(uri):
+    if uri:
+        from pymongo import MongoClient
+        return MongoClient(uri)[DB_NAME]
+    return _MOCK_CLIENT[DB_NAME]
+
+
+def seed(database, count, batch=10000):
+    database.reminders.drop()
+    database.reminder_deliveries.drop()
+    database.scheduler_leases.drop()
+    ReminderLeaseWorker(database.reminders, database.reminder_deliveries, database.scheduler_leases,
+                        None).ensure_indexes()
+    due = datetime.now() - timedelta(seconds=10)
+    docs = []
+    for i in range(count):
+        docs.append(assign_shard({
+            'medicine_name': f'Medicine {i % 500}',
+            'reminder_time': due,
+            'status': STATUS_PENDING,
+        }))
+        if len(docs) == batch:
+            database.reminders.insert_many(docs)
+            docs = []
+    if docs:
+        database.reminders.insert_many(docs)
+
+
+def run_worker(uri, index, count, deliver_ms, batch_size):
+    database = get_database(uri)
+
+    def deliver(reminder, delivery_id):
+        time.sleep(deliver_ms / 1000)
+
+    worker = ReminderLeaseWorker(
+        database.reminders, database.reminder_deliveries, database.scheduler_leases, deliver,
+        worker_id=f'bench-{index}', worker_index=index, worker_count=count,
+        batch_size=batch_size, poll_interval=0.05, sweep_interval=3600,
+    )
+    while database.reminders.count_documents({'status': STATUS_PENDING}, limit=1):
+        if not worker.poll_once():
+            time.sleep(0.05)
+
+
+def run_level(uri, database, workers, reminders, deliver_ms, batch_size):
+    seed(database, reminders)
+    if uri:
+        procs = [multiprocessing.Process(target=run_worker, args=(uri, i, workers, deliver_ms, batch_size))
+                 for i in range(workers)]
+    else:
+        procs = [threading.Thread(target=run_worker, args=(uri, i, workers, deliver_ms, batch_size))
+                 for i in range(workers)]
+    started = time.perf_counter()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    sent = database.reminders.count_documents({'status': STATUS_SENT})
+    delivered = database.reminder_deliveries.count_documents({})
+    return elapsed, sent, delivered
+
+
+def main():
+    global _MOCK_CLIENT
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--reminders', type=int, default=20000)
+    parser.add_argument('--deliver-ms', type=float, default=2.0)
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    uri = os.environ.get("MONGO_URI")
+    if not uri:
+        import mongomock
+        _MOCK_CLIENT = mongomock.MongoClient()
+        print("MONGO_URI not set: running threads over mongomock (correctness only)\n")
+    database = get_database(uri)
+
+    baseline = None
+    print(f"{'workers':>7} {'reminders':>9} {'seconds':>8} {'fired/s':>9} {'speedup':>8} {'exactly once':>13}")
+    for workers in [int(x) for x in args.workers.split(',')]:
+        elapsed, sent, delivered = run_level(uri, database, workers, args.reminders, args.deliver_ms, args.batch_size)
+        rate = sent / elapsed
+        baseline = baseline or rate
+        exact = 'yes' if sent == delivered == args.reminders else f'no ({sent} sent, {delivered} delivered)'
+        print(f"{workers:>7} {args.reminders:>9} {elapsed:>8.2f} {rate:>9.0f} {rate / baseline:>7.2f}x {exact:>13}")
+
+
+if __name__ == '__main__':
+    main()
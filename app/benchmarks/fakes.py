@@ -0,0 +1,205 @@
+"""
+Local stand-ins for the services app.py talks to, for benchmarks.
+
+- FakeModel: Gemini chat sessions (and one-shot generate_content) with a
+  configurable time to first token and per-token delay, streaming or not
+- FakeSpeechClient / FakeTTSClient: Speech-to-Text and Text-to-Speech
+- FakeTwilioServer: the Messages endpoint, recording when each SMS arrived
+- start_fake_smtp: an SMTP sink accepting any login (needs aiosmtpd)
+- bench_hospitals.start_fake_places: the Places Nearby Search endpoint
+
+Gemini, Speech and TTS are plugged in with app.clients.set(); Twilio,
+SMTP and Places are reached over HTTP/SMTP through TWILIO_API_BASE,
+SMTP_HOST/SMTP_PORT and GOOGLE_PLACES_BASE_URL.
+"""
+
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+ANSWERS = [
+    "Drink plenty of fluids and rest.",
+    "Paracetamol can bring the fever down; follow the dose on the label.",
+    "See a doctor if the fever lasts more than three days or goes above 39 degrees.",
+    "Watch for a stiff neck, a rash or trouble breathing, and get help right away if they appear.",
+]
+
+QUESTIONS = [
+    "What should I do for a fever?",
+    "How much paracetamol can I take in a day?",
+    "Is a headache after a fall serious?",
+    "What are the signs of dehydration?",
+    "Can I take ibuprofen with my blood pressure medicine?",
+    "How do I treat a minor burn?",
+    "When should I go to the emergency room for chest pain?",
+    "What helps with a sore throat?",
+]
+
+
+def answer_for(message: str) -> str:
+    """A reply of 2-4 sentences that depends only on the message."""
+    seed = sum(message.encode())
+    sentences = [ANSWERS[(seed + i) % len(ANSWERS)] for i in range(2 + seed % 3)]
+    return f"About \"{message[:60]}\": " + ' '.join(sentences)
+
+
+# ==========================================
+# GEMINI
+# ==========================================
+class FakeChat:
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, message, stream=False):
+        text = answer_for(message)
+        self.history += [{'role': 'user', 'parts': [message]}, {'role': 'model', 'parts': [text]}]
+        tokens = [word + ' ' for word in text.split()]
+        if stream:
+            return self._stream(tokens)
+        time.sleep(self.model.first_token + self.model.token_delay * len(tokens))
+        return SimpleNamespace(text=text)
+
+    def _stream(self, tokens):
+        time.sleep(self.model.first_token)
+        for i in range(0, len(tokens), self.model.tokens_per_chunk):
+            chunk = tokens[i:i + self.model.tokens_per_chunk]
+            time.sleep(self.model.token_delay * len(chunk))
+            yield SimpleNamespace(text=''.join(chunk))
+
+
+class FakeModel:
+    def __init__(self, first_token: float = 0.5, token_delay: float = 0.01, tokens_per_chunk: int = 4):
+        """first_token: seconds before any text; token_delay: seconds per generated word."""
+        self.first_token = first_token
+        self.token_delay = token_delay
+        self.tokens_per_chunk = tokens_per_chunk
+
+    def start_chat(self, history=None):
+        return FakeChat(self, history)
+
+    def generate_content(self, prompt, summary_words: int = 100):
+        """One-shot generation (history summaries): a fixed-length note."""
+        words = ' '.join(ANSWERS).split()
+        text = ' '.join(words[i % len(words)] for i in range(summary_words))
+        time.sleep(self.first_token + self.token_delay * summary_words)
+        return SimpleNamespace(text=text)
+
+
+# ==========================================
+# SPEECH / TTS
+# ==========================================
+class FakeSpeechClient:
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self._counter = itertools.count()
+
+    def _transcript(self):
+        n = next(self._counter)
+        # Distinct transcripts give distinct replies, so TTS is not a cache hit
+        return f"{QUESTIONS[n % len(QUESTIONS)]} ({n})"
+
+    def recognize(self, config=None, audio=None):
+        time.sleep(self.latency)
+        alt = SimpleNamespace(transcript=self._transcript())
+        return SimpleNamespace(results=[SimpleNamespace(alternatives=[alt])])
+
+    def streaming_recognize(self, config, requests):
+        for _ in requests:
+            pass
+        time.sleep(self.latency)
+        alt = SimpleNamespace(transcript=self._transcript())
+        return [SimpleNamespace(results=[SimpleNamespace(is_final=True, alternatives=[alt])])]
+
+
+class FakeTTSClient:
+    def __init__(self, latency: float = 0.2, bytes_per_char: int = 200):
+        self.latency = latency
+        self.bytes_per_char = bytes_per_char
+
+    def synthesize_speech(self, input=None, voice=None, audio_config=None):
+        time.sleep(self.latency)
+        return SimpleNamespace(audio_content=b'\xff\xfb' + b'\x00' * (len(input.text) * self.bytes_per_char))
+
+
+# ==========================================
+# TWILIO
+# ==========================================
+class FakeTwilioServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0):
+        super().__init__(address, _FakeTwilioHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.received = {}  # To number -> time.time() of the first message
+
+    def reset(self):
+        with self.lock:
+            self.received.clear()
+
+
+class _FakeTwilioHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode())
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.received.setdefault(form.get('To', [''])[0], time.time())
+        body = json.dumps({'sid': 'SM' + '0' * 32, 'status': 'queued', 'account_sid': 'AC' + '0' * 32}).encode()
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_twilio(port, latency=0.0):
+    server = FakeTwilioServer(('127.0.0.1', port), latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ==========================================
+# SMTP
+# ==========================================
+class SMTPSink:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.received = {}  # recipient -> time.time() of the first message
+
+    async def handle_DATA(self, server, session, envelope):
+        now = time.time()
+        with self.lock:
+            for rcpt in envelope.rcpt_tos:
+                self.received.setdefault(rcpt, now)
+        return '250 OK'
+
+    def reset(self):
+        with self.lock:
+            self.received.clear()
+
+
+def start_fake_smtp(port):
+    """Returns (controller, sink), or None when aiosmtpd is not installed."""
+    try:
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.smtp import AuthResult
+    except ImportError:
+        return None
+    import logging
+    logging.getLogger('mail.log').setLevel(logging.ERROR)  # a deprecation warning per login
+    sink = SMTPSink()
+    controller = Controller(sink, hostname='127.0.0.1', port=port, auth_require_tls=False,
+                            authenticator=lambda *args: AuthResult(success=True))
+    controller.start()
+    return controller, sink
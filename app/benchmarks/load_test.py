@@ -0,0 +1,163 @@
+"""
+Load-test harness for /chat and /api/voice-chat.
+
+Start the app with fake backends that sleep like the real ones:
+
+    ASYNC_MODE=threading python benchmarks/load_test.py serve --latency 1.5
+    ASYNC_MODE=gevent    python benchmarks/load_test.py serve --latency 1.5
+
+Then drive it with increasing concurrency from another shell:
+
+    python benchmarks/load_test.py run --url http://127.0.0.1:5000 --levels 8,32,128,256
+
+The report shows throughput and latency per level and the highest level
+the process sustained without errors and within the p99 target.
+"""
+
+import argparse
+import array
+import json
+import math
+import os
+import sys
+import time
+import uuid
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fakes import FakeModel, FakeSpeechClient, FakeTTSClient
+
+
+# ==========================================
+# SERVER WITH FAKE BACKENDS (serve mode)
+# ==========================================
+def serve(args):
+    import app as healthmate
+
+    healthmate.clients.set('gemini', FakeModel(first_token=args.latency, token_delay=0))
+    healthmate.clients.set('speech', FakeSpeechClient(args.latency / 3))
+    healthmate.clients.set('tts', FakeTTSClient(args.latency / 3))
+    print(f"Serving with fake backends (latency={args.latency}s, ASYNC_MODE={healthmate.ASYNC_MODE})")
+    healthmate.socketio.run(healthmate.app, host='127.0.0.1', port=args.port,
+                            allow_unsafe_werkzeug=True)
+
+
+# ==========================================
+# LOAD GENERATOR (run mode)
+# ==========================================
+def _speech_wav(seconds=1.0, rate=16000) -> bytes:
+    """A 16 kHz mono WAV of a steady tone, loud enough to pass the upload VAD."""
+    frames = int(seconds * rate)
+    samples = array.array('h', (int(8000 * math.sin(2 * math.pi * 220 * i / rate)) for i in range(frames)))
+    if sys.byteorder != 'little':
+        samples.byteswap()
+    data = samples.tobytes()
+    header = (b'RIFF' + (36 + len(data)).to_bytes(4, 'little') + b'WAVEfmt '
+              + (16).to_bytes(4, 'little') + (1).to_bytes(2, 'little') + (1).to_bytes(2, 'little')
+              + rate.to_bytes(4, 'little') + (rate * 2).to_bytes(4, 'little')
+              + (2).to_bytes(2, 'little') + (16).to_bytes(2, 'little')
+              + b'data' + len(data).to_bytes(4, 'little'))
+    return header + data
+
+
+def _chat_request(url):
+    body = json.dumps({'message': 'What should I do for a fever?', 'session_id': uuid.uuid4().hex})
+    return urllib.request.Request(url + '/chat', data=body.encode(),
+                                  headers={'Content-Type': 'application/json'})
+
+
+def _voice_request(url, wav=_speech_wav()):
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="audio"; filename="speech.wav"\r\n'
+            f'Content-Type: audio/wav\r\n\r\n').encode() + wav + f'\r\n--{boundary}--\r\n'.encode()
+    return urllib.request.Request(url + '/api/voice-chat', data=body,
+                                  headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+
+
+def _fire(build, url, timeout):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(build(url), timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def run_level(build, url, concurrency, requests_per_client, timeout):
+    total = concurrency * requests_per_client
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: _fire(build, url, timeout), range(total)))
+    elapsed = time.perf_counter() - start
+    ok = [lat for status, lat in results if status == 200]
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'ok': len(ok),
+        'errors': total - len(ok),
+        'throughput_rps': len(ok) / elapsed if elapsed else 0.0,
+        'p50_s': _percentile(ok, 50),
+        'p99_s': _percentile(ok, 99),
+    }
+
+
+def run(args):
+    endpoints = {'chat': _chat_request, 'voice': _voice_request}
+    report = {}
+    for name in args.endpoints.split(','):
+        rows = []
+        sustained = 0
+        print(f"\n{name}: {'conc':>6} {'ok':>6} {'err':>6} {'rps':>8} {'p50':>7} {'p99':>7}")
+        for level in [int(x) for x in args.levels.split(',')]:
+            row = run_level(endpoints[name], args.url, level, args.requests_per_client, args.timeout)
+            rows.append(row)
+            print(f"{'':{len(name) + 1}} {row['concurrency']:>6} {row['ok']:>6} {row['errors']:>6} "
+                  f"{row['throughput_rps']:>8.1f} {row['p50_s']:>7.2f} {row['p99_s']:>7.2f}")
+            if row['errors'] == 0 and row['p99_s'] <= args.p99_target:
+                sustained = level
+        print(f"{'':{len(name) + 1}} sustained concurrency: {sustained}")
+        report[name] = {'levels': rows, 'sustained_concurrency': sustained}
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_serve = sub.add_parser('serve', help='run the app with fake backends')
+    p_serve.add_argument('--latency', type=float, default=1.5, help='fake Gemini latency in seconds')
+    p_serve.add_argument('--port', type=int, default=5000)
+
+    p_run = sub.add_parser('run', help='drive a running server')
+    p_run.add_argument('--url', default='http://127.0.0.1:5000')
+    p_run.add_argument('--endpoints', default='chat,voice')
+    p_run.add_argument('--levels', default='8,32,128')
+    p_run.add_argument('--requests-per-client', type=int, default=3)
+    p_run.add_argument('--timeout', type=float, default=60.0)
+    p_run.add_argument('--p99-target', type=float, default=10.0, help='p99 latency target in seconds')
+    p_run.add_argument('--json', help='write the report to this file')
+
+    args = parser.parse_args()
+    serve(args) if args.command == 'serve' else run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,481 @@
+"""
+Benchmark suite: app.py against local stand-ins for every backend.
+
+Runs the app in this process on a local port, with fakes for Gemini
+(time to first token and per-token delay), Speech, TTS, Twilio, SMTP and
+Places (see fakes.py), and MongoDB through mongomock or a local mongod
+(--mongo-uri). Then it drives scripted workloads over HTTP:
+
+- chat:        /chat bursts, one new session per request
+- chat_stream: /chat with stream=true, reporting time to first event
+- voice:       /api/voice-chat uploads (STT -> Gemini -> TTS)
+- reminders:   a storm of reminders due at the same moment, reporting
+               how long after reminder_time each SMS and email arrived
+- hospitals:   /api/find_hospitals from users clustered around a city
+
+Each workload reports throughput, p50/p95/p99 latency and process RSS.
+Results are written as JSON with the commit they were measured on, so
+runs on the same machine can be compared:
+
+    python benchmarks/suite.py run
+    python benchmarks/suite.py run --workloads chat,voice --scale 0.25
+    python benchmarks/suite.py compare results/OLD.json results/NEW.json --threshold 10
+
+`run --baseline FILE` compares against FILE when it finishes. Both exit
+with status 1 if a metric regressed by more than --threshold percent.
+Lease-mode firing (REMINDER_FIRING=lease) needs --mongo-uri.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+from fakes import FakeModel, FakeSpeechClient, FakeTTSClient, QUESTIONS, start_fake_smtp, start_fake_twilio
+from bench_hospitals import make_queries, start_fake_places
+from load_test import _speech_wav
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+# name -> (concurrency, requests at --scale 1)
+WORKLOADS = {
+    'chat': (32, 256),
+    'chat_stream': (32, 256),
+    'voice': (16, 96),
+    'reminders': (16, 500),
+    'hospitals': (16, 1000),
+}
+
+# Higher is better for throughput; lower for everything else
+COMPARED = [
+    ('throughput_rps', None, True),
+    ('latency_ms', 'p50', False),
+    ('latency_ms', 'p95', False),
+    ('latency_ms', 'p99', False),
+    ('ttfb_ms', 'p95', False),
+    ('delivery_lag_ms', 'p95', False),
+    ('rss_mb', 'peak', False),
+]
+
+
+# ==========================================
+# MEASUREMENT
+# ==========================================
+def percentiles(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def at(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 2)
+
+    return {'p50': at(50), 'p95': at(95), 'p99': at(99), 'max': round(ordered[-1] * 1000, 2),
+            'mean': round(sum(ordered) / len(ordered) * 1000, 2)}
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3  # peak, in KB on Linux
+
+
+class RSSSampler:
+    """Samples the process RSS in the background while a workload runs."""
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.before = self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def result(self):
+        after = rss_mb()
+        return {'before': round(self.before, 1), 'peak': round(max(self.peak, after), 1), 'after': round(after, 1)}
+
+
+def fire(req, timeout, first_byte=False):
+    """Returns (status, seconds, seconds to the first body byte or None)."""
+    started = time.perf_counter()
+    ttfb = None
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            if first_byte:
+                resp.read(1)
+                ttfb = time.perf_counter() - started
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return status, time.perf_counter() - started, ttfb
+
+
+def drive(build, concurrency, total, timeout, first_byte=False):
+    """Sends build(i) for i in range(total) from `concurrency` threads."""
+    started = time.perf_counter()
+    with RSSSampler() as memory, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: fire(build(i), timeout, first_byte), range(total)))
+    elapsed = time.perf_counter() - started
+    ok = [r for r in results if 200 <= r[0] < 300]
+    statuses = {}
+    for status, _, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    row = {
+        'concurrency': concurrency,
+        'requests': total,
+        'ok': len(ok),
+        'errors': total - len(ok),
+        'statuses': statuses,
+        'duration_s': round(elapsed, 3),
+        'throughput_rps': round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': percentiles([r[1] for r in ok]),
+        'rss_mb': memory.result(),
+    }
+    if first_byte:
+        row['ttfb_ms'] = percentiles([r[2] for r in ok])
+    return row
+
+
+def json_request(url, path, body):
+    return urllib.request.Request(url + path, data=json.dumps(body).encode(),
+                                  headers={'Content-Type': 'application/json'})
+
+
+# ==========================================
+# WORKLOADS
+# ==========================================
+def run_chat(env, concurrency, total, args):
+    return drive(lambda i: json_request(env.url, '/chat', {
+        'message': QUESTIONS[i % len(QUESTIONS)], 'session_id': uuid.uuid4().hex,
+    }), concurrency, total, args.timeout)
+
+
+def run_chat_stream(env, concurrency, total, args):
+    return drive(lambda i: json_request(env.url, '/chat', {
+        'message': QUESTIONS[i % len(QUESTIONS)], 'session_id': uuid.uuid4().hex, 'stream': True,
+    }), concurrency, total, args.timeout, first_byte=True)
+
+
+def run_voice(env, concurrency, total, args, wav=_speech_wav()):
+    def build(i):
+        boundary = uuid.uuid4().hex
+        body = (f'--{boundary}\r\nContent-Disposition: form-data; name="audio"; filename="speech.wav"\r\n'
+                f'Content-Type: audio/wav\r\n\r\n').encode() + wav + f'\r\n--{boundary}--\r\n'.encode()
+        return urllib.request.Request(env.url + '/api/voice-chat', data=body,
+                                      headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+
+    return drive(build, concurrency, total, args.timeout)
+
+
+def run_reminders(env, concurrency, total, args):
+    """Creates `total` reminders due together, then waits for every SMS and email."""
+    env.twilio.reset()
+    if env.smtp is not None:
+        env.smtp[1].reset()
+    run_id = uuid.uuid4().hex[:8]
+    due = (datetime.now() + timedelta(seconds=args.reminder_lead)).replace(microsecond=0)
+    phone = lambda i: f'+1555{i:07d}'
+    email = lambda i: f'patient{i}.{run_id}@example.com'
+
+    row = drive(lambda i: json_request(env.url, '/api/reminders', {
+        'medicine_name': f'Medicine {i % 20}',
+        'reminder_time': due.isoformat(),
+        'phone': phone(i),
+        'email': email(i) if env.smtp is not None else '',
+        'owner': f'bench-{run_id}',
+    }), concurrency, total, args.timeout)
+
+    # Delivery is measured from reminder_time, so the wait starts there
+    sinks = [(env.twilio, phone)] + ([(env.smtp[1], email)] if env.smtp is not None else [])
+    expected = row['ok'] * len(sinks)
+    deadline = due.timestamp() + args.timeout
+    with RSSSampler() as memory:
+        while time.time() < deadline and sum(len(sink.received) for sink, _ in sinks) < expected:
+            time.sleep(0.05)
+    lags = [sink.received[key(i)] - due.timestamp()
+            for sink, key in sinks for i in range(total) if key(i) in sink.received]
+    row['delivered'] = len(lags)
+    row['expected_deliveries'] = expected
+    row['delivery_lag_ms'] = percentiles([max(0.0, lag) for lag in lags])
+    row['rss_mb']['peak'] = max(row['rss_mb']['peak'], memory.result()['peak'])
+    return row
+
+
+def run_hospitals(env, concurrency, total, args):
+    queries = make_queries(total)
+    return drive(lambda i: json_request(env.url, '/api/find_hospitals', {
+        'latitude': queries[i][0], 'longitude': queries[i][1],
+    }), concurrency, total, args.timeout)
+
+
+RUNNERS = {
+    'chat': run_chat,
+    'chat_stream': run_chat_stream,
+    'voice': run_voice,
+    'reminders': run_reminders,
+    'hospitals': run_hospitals,
+}
+
+
+# ==========================================
+# ENVIRONMENT
+# ==========================================
+# Knobs the suite defaults but leaves overridable; recorded with the results
+TUNABLES = {
+    'ASYNC_MODE': 'threading',
+    'CHAT_STREAMING': 'true',
+    'SMS_RATE_LIMIT': '0',
+    'EMAIL_RATE_LIMIT': '0',
+    'RATE_LIMIT_CHAT_PER_MINUTE': '0',  # every simulated user shares one IP
+    'RATE_LIMIT_VOICE_PER_MINUTE': '0',
+    'RESPONSE_CACHE': 'false',
+    'REMINDER_FIRING': 'local',
+    'LOG_LEVEL': 'WARNING',
+}
+
+
+class Environment:
+    """The app on a local port with every backend replaced by a fake."""
+
+    def __init__(self, args):
+        self.tmp = tempfile.mkdtemp(prefix='healthmate-bench-')
+        self.twilio = start_fake_twilio(args.port + 1, args.twilio_latency)
+        self.smtp = start_fake_smtp(args.port + 2)
+        self.places = start_fake_places(args.port + 3, args.hospitals, args.places_latency)
+        if self.smtp is None:
+            print("aiosmtpd not installed; reminders are sent by SMS only")
+
+        for key, value in TUNABLES.items():
+            os.environ.setdefault(key, value)
+        os.environ.update({
+            'CLIENT_WARMUP': 'false',
+            'TTS_WARMUP': 'false',
+            'TTS_CACHE_DIR': os.path.join(self.tmp, 'tts'),
+            'TWILIO_ACCOUNT_SID': 'AC' + '0' * 32,
+            'TWILIO_AUTH_TOKEN': 'token',
+            'TWILIO_FROM_NUMBER': '+15550000000',
+            'TWILIO_API_BASE': f'http://127.0.0.1:{args.port + 1}',
+            'SMTP_HOST': '127.0.0.1',
+            'SMTP_PORT': str(args.port + 2),
+            'SMTP_USER': 'bench',
+            'SMTP_PASSWORD': 'bench',
+            'SMTP_FROM_EMAIL': 'reminders@example.com',
+            'SMTP_STARTTLS': 'false',
+            'GOOGLE_PLACES_API_KEY': 'fake',
+            'GOOGLE_PLACES_BASE_URL': f'http://127.0.0.1:{args.port + 3}',
+            'MONGO_URI': args.mongo_uri or '',
+        })
+        for key in ('SOCKETIO_MESSAGE_QUEUE', 'CHAT_SESSION_BACKEND', 'FACILITY_INDEX_PATH'):
+            os.environ.pop(key, None)
+
+        import app as healthmate
+        import logging
+        from werkzeug.serving import make_server
+
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no access log per request
+
+        self.app = healthmate
+        healthmate.clients.set('gemini', FakeModel(args.first_token, args.token_delay))
+        healthmate.clients.set('speech', FakeSpeechClient(args.stt_latency))
+        healthmate.clients.set('tts', FakeTTSClient(args.tts_latency))
+        healthmate.scheduler.start()
+        if args.mongo_uri:
+            healthmate.get_db()  # connects, then starts the reminder engine
+        else:
+            import mongomock
+            healthmate.clients.set('mongo', mongomock.MongoClient().healthmate)
+            healthmate.init_reminder_scheduler()
+            healthmate.start_reminder_engine()
+
+        self.server = make_server('127.0.0.1', args.port, healthmate.app, threaded=True)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{args.port}'
+
+    def close(self):
+        self.server.shutdown()
+        self.twilio.shutdown()
+        self.places.shutdown()
+        if self.smtp is not None:
+            self.smtp[0].stop()
+        self.app.notifier.stop()
+        self.app.scheduler.shutdown(wait=False)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def git_commit():
+    def git(*cmd):
+        return subprocess.run(['git', *cmd], cwd=BENCH_DIR, capture_output=True, text=True).stdout.strip()
+    try:
+        return {'commit': git('rev-parse', '--short', 'HEAD') or None, 'dirty': bool(git('status', '--porcelain'))}
+    except OSError:
+        return {'commit': None, 'dirty': None}
+
+
+# ==========================================
+# REPORTING
+# ==========================================
+def print_row(name, row):
+    lat = row['latency_ms'] or {}
+    line = (f"{name:<12} {row['ok']:>6}/{row['requests']:<6} {row['throughput_rps']:>8.1f}/s "
+            f"p50 {lat.get('p50', 0):>8.1f}  p95 {lat.get('p95', 0):>8.1f}  p99 {lat.get('p99', 0):>8.1f}ms  "
+            f"rss {row['rss_mb']['peak']:>6.0f}MB")
+    if row.get('ttfb_ms'):
+        line += f"  first event p95 {row['ttfb_ms']['p95']:.1f}ms"
+    if 'delivered' in row:
+        lag = row['delivery_lag_ms'] or {}
+        line += (f"  delivered {row['delivered']}/{row['expected_deliveries']}"
+                 f" lag p50 {lag.get('p50', 0):.0f} p95 {lag.get('p95', 0):.0f}ms")
+    print(line)
+
+
+def metric(row, key, sub):
+    value = row.get(key)
+    if sub is not None:
+        value = (value or {}).get(sub)
+    return value
+
+
+def compare(old, new, threshold):
+    """Prints old vs new per workload and metric; returns the regressions."""
+    print(f"{'':<12} {'metric':<22} {old.get('commit') or '?':>10} {new.get('commit') or '?':>10} {'change':>8}")
+    regressions = []
+    for name, new_row in new['workloads'].items():
+        old_row = old['workloads'].get(name)
+        if old_row is None:
+            continue
+        for key, sub, higher_is_better in COMPARED:
+            a, b = metric(old_row, key, sub), metric(new_row, key, sub)
+            if a is None or b is None:
+                continue
+            change = (b - a) / a * 100 if a else 0.0
+            worse = -change if higher_is_better else change
+            flag = ''
+            if worse > threshold:
+                flag = '  REGRESSED'
+                regressions.append((name, f"{key}.{sub}" if sub else key, change))
+            label = f"{key}.{sub}" if sub else key
+            print(f"{name:<12} {label:<22} {a:>10.1f} {b:>10.1f} {change:>+7.1f}%{flag}")
+    return regressions
+
+
+def load_result(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def run(args):
+    names = args.workloads.split(',')
+    unknown = [n for n in names if n not in RUNNERS]
+    if unknown:
+        sys.exit(f"unknown workloads: {', '.join(unknown)} (choose from {', '.join(RUNNERS)})")
+
+    random.seed(args.seed)
+    env = Environment(args)
+    result = {
+        **git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'scale': args.scale, 'seed': args.seed, 'mongo': 'mongod' if args.mongo_uri else 'mongomock',
+            'first_token': args.first_token, 'token_delay': args.token_delay,
+            'stt_latency': args.stt_latency, 'tts_latency': args.tts_latency,
+            'places_latency': args.places_latency, 'twilio_latency': args.twilio_latency,
+            'env': {key: os.environ.get(key) for key in TUNABLES},
+        },
+        'workloads': {},
+    }
+    try:
+        for name in names:
+            concurrency, total = WORKLOADS[name]
+            row = RUNNERS[name](env, concurrency, max(1, int(total * args.scale)), args)
+            result['workloads'][name] = row
+            print_row(name, row)
+    finally:
+        env.close()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{result['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nresults written to {output}")
+
+    if args.baseline:
+        print()
+        return compare(load_result(args.baseline), result, args.threshold)
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_run = sub.add_parser('run', help='start the app with fakes and run the workloads')
+    p_run.add_argument('--workloads', default=','.join(WORKLOADS))
+    p_run.add_argument('--scale', type=float, default=1.0, help='multiplies the requests per workload')
+    p_run.add_argument('--seed', type=int, default=1)
+    p_run.add_argument('--port', type=int, default=5200, help='the app; fakes use the next three ports')
+    p_run.add_argument('--mongo-uri', help='a local mongod instead of mongomock')
+    p_run.add_argument('--first-token', type=float, default=0.5, help='fake Gemini seconds to first token')
+    p_run.add_argument('--token-delay', type=float, default=0.01, help='fake Gemini seconds per word')
+    p_run.add_argument('--stt-latency', type=float, default=0.2)
+    p_run.add_argument('--tts-latency', type=float, default=0.2)
+    p_run.add_argument('--places-latency', type=float, default=0.08)
+    p_run.add_argument('--twilio-latency', type=float, default=0.02)
+    p_run.add_argument('--hospitals', type=int, default=2000, help='places served by the fake Places API')
+    p_run.add_argument('--reminder-lead', type=float, default=5.0, help='seconds until the reminders are due')
+    p_run.add_argument('--timeout', type=float, default=60.0)
+    p_run.add_argument('--output', help=f'result file (default: {os.path.relpath(RESULTS_DIR)}/TIME-COMMIT.json)')
+    p_run.add_argument('--baseline', help='a previous result file to compare against')
+    p_run.add_argument('--threshold', type=float, default=10.0, help='percent change that counts as a regression')
+
+    p_cmp = sub.add_parser('compare', help='compare two result files')
+    p_cmp.add_argument('old')
+    p_cmp.add_argument('new')
+    p_cmp.add_argument('--threshold', type=float, default=10.0)
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        regressions = run(args)
+    else:
+        regressions = compare(load_result(args.old), load_result(args.new), args.threshold)
+    for name, label, change in regressions:
+        print(f"✗ {name} {label} regressed {change:+.1f}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Rolling compaction of chat histories.
+
+Gemini is sent a session's whole history on every turn, so the history
+size sets each turn's prompt cost and latency. Once a history is over its
+token budget or message window, HistoryCompactor folds the older turns
+into a short summary, kept as the first exchange of the history, and
+keeps the newest turns verbatim. The previous summary is rolled into each
+new one, so a session's prompt stays bounded however long it runs.
+"""
+
+import os
+
+from session_store import history_to_dicts
+
+SUMMARY_PREFIX = "Summary of our conversation so far:"
+SUMMARY_ACK = "Understood. I'll keep that in mind."
+
+SUMMARY_PROMPT = (
+    "You keep notes for a health assistant. Update the notes below with the conversation that follows. "
+    "Keep symptoms, conditions, medicines and doses, allergies, age and the advice already given; "
+    "leave out greetings and small talk. Reply with the updated notes only, in at most {words} words.\n\n"
+    "Notes:\n{previous}\n\nConversation:\n{turns}"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count: about four characters per token for English text."""
+    return (len(text) + 3) // 4
+
+
+def history_tokens(history) -> int:
+    """Estimated prompt tokens for a history, with a small per-message overhead."""
+    return sum(4 + sum(estimate_tokens(p) for p in item['parts']) for item in history_to_dicts(history))
+
+
+def summary_exchange(summary: str) -> list:
+    return [
+        {'role': 'user', 'parts': [f"{SUMMARY_PREFIX}\n{summary}"]},
+        {'role': 'model', 'parts': [SUMMARY_ACK]},
+    ]
+
+
+def split_summary(history: list):
+    """Returns (previous summary text or None, the turns after it)."""
+    items = history_to_dicts(history[:1])
+    if items and items[0]['role'] == 'user' and ''.join(items[0]['parts']).startswith(SUMMARY_PREFIX):
+        return ''.join(items[0]['parts'])[len(SUMMARY_PREFIX):].strip(), history[2:]
+    return None, history
+
+
+class HistoryCompactor:
+    def __init__(self, summarize=None, token_budget: int = 4000, max_messages: int = 40,
+                 keep_tokens: int = None, summary_words: int = 150):
+        """
+        summarize(prompt) returns the summary text; without it older turns
+        are dropped (a plain sliding window).
+        token_budget / max_messages: a history over either is compacted.
+        keep_tokens: size of the newest turns kept verbatim (default half the budget).
+        """
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.max_messages = max_messages
+        self.keep_tokens = keep_tokens if keep_tokens is not None else token_budget // 2
+        self.summary_words = summary_words
+
+    def needs_compaction(self, history) -> bool:
+        return len(history) > self.max_messages or history_tokens(history) > self.token_budget
+
+    def over_hard_limit(self, history) -> bool:
+        """Twice over budget: trim now rather than wait for a summary."""
+        return len(history) > 2 * self.max_messages or history_tokens(history) > 2 * self.token_budget
+
+    def cut_index(self, history) -> int:
+        """Where the verbatim tail starts: newest turns within keep_tokens, starting on a user turn."""
+        items = history_to_dicts(history)
+        limit = max(2, self.max_messages // 2)
+        used = 0
+        cut = len(items)
+        while cut > 0 and len(items) - cut < limit:
+            cost = 4 + sum(estimate_tokens(p) for p in items[cut - 1]['parts'])
+            if used + cost > self.keep_tokens and len(items) - cut >= 2:
+                break
+            used += cost
+            cut -= 1
+        while cut < len(items) and items[cut]['role'] != 'user':
+            cut += 1
+        return cut
+
+    def prompt(self, previous, turns) -> str:
+        lines = []
+        for item in history_to_dicts(turns):
+            speaker = 'Patient' if item['role'] == 'user' else 'Assistant'
+            lines.append(f"{speaker}: {' '.join(item['parts'])}")
+        return SUMMARY_PROMPT.format(words=self.summary_words, previous=previous or '(none)',
+                                     turns='\n'.join(lines))
+
+    def compact(self, history, summarize: bool = True) -> list:
+        """
+        Returns the compacted history. With summarize=False (or no
+        summarizer) the older turns are dropped and an existing summary is
+        kept as it is. Returns history itself when there is nothing to fold.
+        """
+        cut = self.cut_index(history)
+        previous, _ = split_summary(history)
+        older_start = 2 if previous is not None else 0
+        if cut <= older_start:
+            return history
+        history = list(history)
+        recent = history[cut:]
+        if not summarize or self.summarize is None:
+            return (summary_exchange(previous) if previous is not None else []) + recent
+        summary = self.summarize(self.prompt(previous, history[older_start:cut])).strip()
+        return summary_exchange(summary) + recent
+
+
+def compactor_from_env(summarize=None):
+    """Builds a HistoryCompactor from CHAT_HISTORY_* settings, or None with CHAT_HISTORY_COMPACTION=false."""
+    if os.environ.get("CHAT_HISTORY_COMPACTION", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if os.environ.get("CHAT_HISTORY_SUMMARY", "true").lower() not in ("1", "true", "yes"):
+        summarize = None
+    return HistoryCompactor(
+        summarize,
+        token_budget=int(os.environ.get("CHAT_SESSION_TOKEN_BUDGET", "4000")),
+        max_messages=int(os.environ.get("CHAT_SESSION_MAX_HISTORY", "40")),
+        summary_words=int(os.environ.get("CHAT_HISTORY_SUMMARY_WORDS", "150")),
+    )
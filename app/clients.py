@@ -0,0 +1,176 @@
+"""
+Lazily created clients for external services.
+
+app.py registers one factory per backend (Gemini, MongoDB, Speech, TTS,
+Twilio) instead of importing SDKs and connecting at import time. A client
+is created on first use, or ahead of time by warm(), which starts every
+backend in parallel background threads so one slow dependency does not
+hold up the others or the health checks. status() reports readiness and
+liveness per backend for /healthz and /readyz.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from logs import get_logger
+
+log = get_logger('clients')
+
+DISABLED = 'disabled'  # not configured
+IDLE = 'idle'          # configured, not created yet
+STARTING = 'starting'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class _Entry:
+    __slots__ = ('name', 'factory', 'enabled', 'required', 'check', 'on_ready', 'lock', 'state',
+                 'client', 'error', 'init_seconds', 'failed_at', 'alive', 'checked_at')
+
+    def __init__(self, name, factory, enabled, required, check, on_ready):
+        self.name = name
+        self.factory = factory
+        self.enabled = enabled
+        self.required = required
+        self.check = check
+        self.on_ready = on_ready
+        self.lock = threading.Lock()
+        self.state = IDLE if enabled else DISABLED
+        self.client = None
+        self.error = None
+        self.init_seconds = None
+        self.failed_at = 0.0
+        self.alive = None
+        self.checked_at = 0.0
+
+
+class ClientRegistry:
+    def __init__(self, retry_after: float = 30, check_interval: float = 10):
+        """
+        retry_after: seconds before a backend whose factory failed is tried again.
+        check_interval: seconds a liveness check result is reused by status().
+        """
+        self.retry_after = retry_after
+        self.check_interval = check_interval
+        self._entries = {}
+
+    def register(self, name, factory, enabled: bool = True, required: bool = False,
+                 check=None, on_ready=None):
+        """
+        factory() imports its SDK and returns the client. check(client)
+        raises if the backend is unreachable. on_ready(client) runs once
+        after the client is created.
+        """
+        self._entries[name] = _Entry(name, factory, enabled, required, check, on_ready)
+
+    def get(self, name):
+        """Returns the client, creating it on first use, or None if unavailable."""
+        entry = self._entries[name]
+        if entry.state == READY:
+            return entry.client
+        if not entry.enabled or self._backing_off(entry):
+            return None
+        with entry.lock:
+            if entry.state == READY:
+                return entry.client
+            if self._backing_off(entry):
+                return None
+            entry.state = STARTING
+            started = time.perf_counter()
+            try:
+                client = entry.factory()
+            except Exception as e:
+                entry.state = FAILED
+                entry.error = str(e)
+                entry.failed_at = time.monotonic()
+                log.error('client.failed', backend=name, error=str(e))
+                return None
+            entry.client = client
+            entry.error = None
+            entry.init_seconds = time.perf_counter() - started
+            entry.state = READY
+            log.info('client.ready', backend=name, init_ms=round(entry.init_seconds * 1000))
+        if entry.on_ready is not None:
+            try:
+                entry.on_ready(client)
+            except Exception:
+                log.exception('client.on_ready_failed', backend=name)
+        return client
+
+    def set(self, name, client):
+        """Replaces a backend's client (benchmarks and tests use fakes)."""
+        entry = self._entries[name]
+        with entry.lock:
+            entry.client = client
+            entry.enabled = client is not None
+            entry.state = READY if client is not None else DISABLED
+            entry.error = None
+
+    def proxy(self, name):
+        """An object that forwards attribute access to the client, created on first use."""
+        return _ClientProxy(self, name)
+
+    def warm(self, names=None):
+        """Creates the given (default: all enabled) clients in parallel, in the background."""
+        names = [n for n in (names or self._entries) if self._entries[n].enabled]
+        if not names:
+            return []
+        executor = ThreadPoolExecutor(max_workers=len(names), thread_name_prefix='client-warmup')
+        futures = [executor.submit(self.get, name) for name in names]
+        executor.shutdown(wait=False)
+        return futures
+
+    def ready(self) -> bool:
+        """True once every required, configured backend has a client."""
+        return all(e.state == READY for e in self._entries.values() if e.required and e.enabled)
+
+    def status(self, check: bool = True) -> dict:
+        out = {}
+        for entry in self._entries.values():
+            if check:
+                self._check(entry)
+            out[entry.name] = {
+                'state': entry.state,
+                'required': entry.required,
+                'alive': entry.alive,
+                'init_ms': round(entry.init_seconds * 1000, 1) if entry.init_seconds is not None else None,
+                'error': entry.error,
+            }
+        return out
+
+    def _backing_off(self, entry) -> bool:
+        return entry.state == FAILED and time.monotonic() - entry.failed_at < self.retry_after
+
+    def _check(self, entry):
+        if entry.state != READY:
+            entry.alive = None
+            return
+        if entry.check is None:
+            entry.alive = True
+            return
+        now = time.monotonic()
+        if now - entry.checked_at < self.check_interval:
+            return
+        entry.checked_at = now
+        try:
+            entry.check(entry.client)
+            entry.alive = True
+            entry.error = None
+        except Exception as e:
+            entry.alive = False
+            entry.error = str(e)
+
+
+class _ClientProxy:
+    __slots__ = ('_registry', '_name')
+
+    def __init__(self, registry, name):
+        self._registry = registry
+        self._name = name
+
+    def __getattr__(self, attr):
+        client = self._registry.get(self._name)
+        if client is None:
+            raise RuntimeError(f"{self._name} client is not available")
+        return getattr(client, attr)
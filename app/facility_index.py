@@ -0,0 +1,274 @@
+"""
+Offline index of emergency facilities for nearest-hospital queries.
+
+Facilities are loaded from CSV or GeoJSON and stored as flat NumPy arrays,
+sorted by a lat/lng grid cell so each cell's facilities are one contiguous
+slice. A k-nearest query scans rings of cells outward from the query's
+cell and stops once no unscanned cell can be closer than the k-th result.
+
+A saved index is a directory of .npy files plus a UTF-8 text blob, opened
+with memory mapping, so loading costs the same for 1K or 1M facilities:
+
+    flask --app app build-facility-index hospitals.geojson -o facilities.idx
+    FACILITY_INDEX_PATH=facilities.idx python app.py
+"""
+
+import csv
+import json
+import math
+import os
+
+import numpy as np
+
+EMERGENCY = 1
+OPEN_24H = 2
+
+INDEX_VERSION = 1
+DEFAULT_CELL_DEG = 0.1
+MAX_DISTANCE_M = 50000
+_EARTH_RADIUS_M = 6371000.0
+_SEP = '\x1f'
+_TRUE = {'1', 'true', 'yes', 'y', 't', 'designated', '24/7'}
+
+
+def _truthy(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in _TRUE
+
+
+def _first(row: dict, *keys):
+    for key in keys:
+        value = row.get(key)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+# ==========================================
+# LOADING
+# ==========================================
+def _record(name, address, phone, lat, lng, emergency, open_24h) -> dict:
+    lat, lng = float(lat), float(lng)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError(f"coordinates out of range: {lat}, {lng}")
+    return {
+        'name': str(name or ''), 'address': str(address or ''), 'phone': str(phone or ''),
+        'lat': lat, 'lng': lng, 'emergency': emergency, 'open_24h': open_24h,
+    }
+
+
+def _csv_record(row: dict) -> dict:
+    row = {(k or '').strip().lower(): v for k, v in row.items()}
+    return _record(
+        row.get('name'), row.get('address'), row.get('phone'),
+        _first(row, 'lat', 'latitude'), _first(row, 'lng', 'lon', 'longitude'),
+        _truthy(row.get('emergency')), _truthy(_first(row, 'open_24h', '24h')),
+    )
+
+
+def _geojson_record(feature: dict) -> dict:
+    """Point features; OSM-style emergency=yes and opening_hours=24/7 are understood."""
+    geometry = feature.get('geometry') or {}
+    if geometry.get('type') != 'Point':
+        raise ValueError(f"unsupported geometry: {geometry.get('type')}")
+    lng, lat = geometry['coordinates'][:2]
+    props = feature.get('properties') or {}
+    address = props.get('address') or ' '.join(
+        str(props[k]) for k in ('addr:housenumber', 'addr:street', 'addr:city') if props.get(k))
+    return _record(
+        props.get('name'), address, _first(props, 'phone', 'contact:phone'), lat, lng,
+        _truthy(props.get('emergency')),
+        _truthy(props.get('open_24h')) or props.get('opening_hours') == '24/7',
+    )
+
+
+def read_facilities(path: str):
+    """Returns (records, skipped) from a .csv or .geojson/.json file."""
+    records, skipped = [], 0
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if path.lower().endswith('.csv'):
+            rows, parse = csv.DictReader(f), _csv_record
+        else:
+            rows, parse = json.load(f).get('features', []), _geojson_record
+        for row in rows:
+            try:
+                records.append(parse(row))
+            except (KeyError, TypeError, ValueError, IndexError):
+                skipped += 1
+    return records, skipped
+
+
+# ==========================================
+# INDEX
+# ==========================================
+def _haversine_m(lat, lng, lats, lngs):
+    """Distances from one point to arrays of points, in meters."""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats, dtype=np.float64)
+    dphi = phi2 - phi1
+    dlmb = np.radians(lngs, dtype=np.float64) - math.radians(lng)
+    a = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * _EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class FacilityIndex:
+    """Grid-sorted facility arrays answering k-nearest queries."""
+
+    def __init__(self, coords, flags, text_offsets, text, cell_keys, cell_starts, cell_deg):
+        self.coords = coords              # (n, 2) float32 lat, lng; sorted by cell
+        self.flags = flags                # (n,) uint8 EMERGENCY | OPEN_24H
+        self.text_offsets = text_offsets  # (n + 1,) int64 into text
+        self.text = text                  # uint8 blob of name\x1faddress\x1fphone
+        self.cell_keys = cell_keys        # (m,) int64 sorted non-empty cells
+        self.cell_starts = cell_starts    # (m + 1,) int64 first facility of each cell
+        self.cell_deg = cell_deg
+        self.rows = int(math.ceil(180 / cell_deg))
+        self.cols = int(math.ceil(360 / cell_deg))
+
+    def __len__(self):
+        return len(self.flags)
+
+    @classmethod
+    def build(cls, records, cell_deg: float = DEFAULT_CELL_DEG) -> 'FacilityIndex':
+        n = len(records)
+        lats = np.fromiter((r['lat'] for r in records), np.float64, n)
+        lngs = np.fromiter((r['lng'] for r in records), np.float64, n)
+        flags = np.fromiter((EMERGENCY * bool(r['emergency']) | OPEN_24H * bool(r['open_24h'])
+                             for r in records), np.uint8, n)
+        cols = int(math.ceil(360 / cell_deg))
+        keys = cls._keys(lats, lngs, cell_deg, cols)
+        order = np.argsort(keys, kind='stable')
+
+        texts = [_SEP.join((r['name'], r['address'], r['phone'])).encode('utf-8') for r in records]
+        lengths = np.fromiter((len(texts[i]) for i in order), np.int64, n)
+        text_offsets = np.zeros(n + 1, np.int64)
+        np.cumsum(lengths, out=text_offsets[1:])
+        text = np.frombuffer(b''.join(texts[i] for i in order), np.uint8)
+
+        cell_keys, counts = np.unique(keys[order], return_counts=True)
+        cell_starts = np.zeros(len(cell_keys) + 1, np.int64)
+        np.cumsum(counts, out=cell_starts[1:])
+        coords = np.column_stack((lats[order], lngs[order])).astype(np.float32)
+        return cls(coords, flags[order], text_offsets, text, cell_keys, cell_starts, cell_deg)
+
+    @staticmethod
+    def _keys(lats, lngs, cell_deg, cols):
+        rows = np.minimum(((lats + 90) // cell_deg).astype(np.int64), int(math.ceil(180 / cell_deg)) - 1)
+        return rows * cols + ((lngs + 180) // cell_deg).astype(np.int64) % cols
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        for name in ('coords', 'flags', 'text_offsets', 'cell_keys', 'cell_starts'):
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+        np.asarray(self.text).tofile(os.path.join(path, 'text.bin'))
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'cell_deg': self.cell_deg, 'count': len(self)}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'FacilityIndex':
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != INDEX_VERSION:
+            raise ValueError(f"unsupported facility index version: {meta.get('version')}")
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode)
+                  for name in ('coords', 'flags', 'text_offsets', 'cell_keys', 'cell_starts')}
+        text_path = os.path.join(path, 'text.bin')
+        if os.path.getsize(text_path) == 0:
+            text = np.zeros(0, np.uint8)
+        elif mmap:
+            text = np.memmap(text_path, np.uint8, mode='r')
+        else:
+            text = np.fromfile(text_path, np.uint8)
+        return cls(text=text, cell_deg=meta['cell_deg'], **arrays)
+
+    # ----- queries -----
+    def nearest(self, lat: float, lng: float, k: int = 10, max_distance_m: float = MAX_DISTANCE_M,
+                require: int = 0):
+        """Returns (positions, distances in meters) of the k nearest matching facilities."""
+        cd = self.cell_deg
+        row = min(int((lat + 90) // cd), self.rows - 1)
+        col = int((lng + 180) // cd) % self.cols
+        best_pos = np.zeros(0, np.int64)
+        best_d = np.zeros(0)
+        ring = 0
+        while True:
+            slices = self._ring_slices(row, col, ring)
+            if slices:
+                pos = np.concatenate([np.arange(start, end) for start, end in slices])
+                if require:
+                    pos = pos[(self.flags[pos] & require) == require]
+                coords = self.coords[pos]
+                d = _haversine_m(lat, lng, coords[:, 0], coords[:, 1])
+                keep = d <= max_distance_m
+                best_pos = np.concatenate((best_pos, pos[keep]))
+                best_d = np.concatenate((best_d, d[keep]))
+                if len(best_d) > k:
+                    top = np.argpartition(best_d, k - 1)[:k]
+                    best_pos, best_d = best_pos[top], best_d[top]
+            bound = self._unscanned_bound(lat, lng, row, col, ring)
+            if bound > max_distance_m or (len(best_d) >= k and best_d.max() <= bound):
+                break
+            ring += 1
+        order = np.argsort(best_d, kind='stable')
+        return best_pos[order], best_d[order]
+
+    def find(self, lat: float, lng: float, radius: float = 5000, limit: int = 10,
+             emergency: bool = False, open_24h: bool = False) -> list:
+        """Hospital dicts (the /api/find_hospitals shape), nearest first."""
+        require = (EMERGENCY if emergency else 0) | (OPEN_24H if open_24h else 0)
+        positions, distances = self.nearest(lat, lng, limit, min(radius, MAX_DISTANCE_M), require)
+        return [self.facility(int(p), d) for p, d in zip(positions, distances)]
+
+    def facility(self, position: int, distance_m: float = None) -> dict:
+        start, end = self.text_offsets[position], self.text_offsets[position + 1]
+        name, address, phone = bytes(self.text[start:end]).decode('utf-8').split(_SEP)
+        flags = int(self.flags[position])
+        out = {
+            'name': name,
+            'address': address,
+            'phone': phone or None,
+            'rating': None,
+            'place_id': None,
+            'lat': round(float(self.coords[position, 0]), 6),
+            'lng': round(float(self.coords[position, 1]), 6),
+            'emergency': bool(flags & EMERGENCY),
+            'open_24h': bool(flags & OPEN_24H),
+        }
+        if distance_m is not None:
+            out['distance_km'] = round(float(distance_m) / 1000, 2)
+        return out
+
+    def _ring_slices(self, row, col, ring):
+        """Facility slices of the cells exactly `ring` cells away from (row, col)."""
+        if ring == 0:
+            cells = [(row, col)]
+        else:
+            cells = [(r, c) for r in (row - ring, row + ring) for c in range(col - ring, col + ring + 1)]
+            cells += [(r, c) for c in (col - ring, col + ring) for r in range(row - ring + 1, row + ring)]
+        keys = {r * self.cols + c % self.cols for r, c in cells if 0 <= r < self.rows}
+        if not keys:
+            return []
+        keys = np.fromiter(keys, np.int64, len(keys))
+        idx = np.searchsorted(self.cell_keys, keys)
+        inside = idx < len(self.cell_keys)
+        idx, keys = idx[inside], keys[inside]
+        idx = idx[self.cell_keys[idx] == keys]
+        return [(int(self.cell_starts[i]), int(self.cell_starts[i + 1])) for i in idx]
+
+    def _unscanned_bound(self, lat, lng, row, col, ring):
+        """Lower bound on the distance to any facility outside the scanned rings."""
+        cd = self.cell_deg
+        south, north = (row - ring) * cd - 90, (row + ring + 1) * cd - 90
+        d_lat = min(lat - south if south > -90 else math.inf, north - lat if north < 90 else math.inf)
+        d_lat = math.radians(d_lat) * _EARTH_RADIUS_M if d_lat != math.inf else math.inf
+        if 2 * ring + 1 >= self.cols:
+            d_lng = math.inf
+        else:
+            west, east = (col - ring) * cd - 180, (col + ring + 1) * cd - 180
+            dlmb = math.radians(min(lng - west, east - lng))
+            # Nearest point of a meridian dlmb away, over all latitudes
+            d_lng = (_EARTH_RADIUS_M * math.asin(min(1.0, math.cos(math.radians(lat)) * math.sin(dlmb)))
+                     if dlmb < math.pi / 2 else _EARTH_RADIUS_M * math.radians(90 - abs(lat)))
+        return min(d_lat, d_lng)
@@ -0,0 +1,302 @@
+"""
+Nearby hospital lookup with a geohash-bucketed cache of Places results.
+
+A miss asks Places for the hospitals nearest to the center of the query's
+geohash cell (rankby=distance, one page of 20). That page is complete
+within the distance of its farthest result, so it answers any later query
+nearby whose own nearest hospitals all fall inside that distance. Queries
+are checked against their own cell and its eight neighbours; the ones no
+cached page can answer exactly go straight to Places.
+"""
+
+import bisect
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from single_flight import SingleFlight
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_EARTH_RADIUS_M = 6371000.0
+PLACES_PAGE_SIZE = 20
+PLACES_MAX_RADIUS_M = 50000
+
+
+# ==========================================
+# GEOHASH
+# ==========================================
+def geohash_encode(lat: float, lng: float, precision: int = 6) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[bits])
+            bits = bit = 0
+    return ''.join(chars)
+
+
+def geohash_bounds(cell: str):
+    """Returns (min_lat, min_lng, max_lat, max_lng) of a geohash cell."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def geohash_center(cell: str):
+    min_lat, min_lng, max_lat, max_lng = geohash_bounds(cell)
+    return (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+
+
+def geohash_neighbors(cell: str):
+    """The eight cells around cell (same precision)."""
+    min_lat, min_lng, max_lat, max_lng = geohash_bounds(cell)
+    lat, lng = (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+    dlat, dlng = max_lat - min_lat, max_lng - min_lng
+    out = []
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if dx or dy:
+                n_lat = max(-89.999999, min(89.999999, lat + dy * dlat))
+                n_lng = (lng + dx * dlng + 180) % 360 - 180
+                out.append(geohash_encode(n_lat, n_lng, len(cell)))
+    return out
+
+
+def haversine_m(lat1, lng1, lat2, lng2) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * _EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+# ==========================================
+# PLACES CLIENT
+# ==========================================
+class PlacesClient:
+    """Google Places Nearby Search over a pooled requests.Session."""
+
+    def __init__(self, api_key: str, base_url: str = 'https://maps.googleapis.com',
+                 timeout=(3.05, 10), pool_size: int = 10):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def nearby_hospitals(self, lat: float, lng: float, radius: int = None) -> list:
+        """Hospitals within radius, or the nearest ones by distance when radius is None."""
+        params = {
+            'location': f"{lat},{lng}",
+            'type': 'hospital',
+            'keyword': 'hospital|clinic',
+            'key': self.api_key,
+        }
+        if radius is None:
+            params['rankby'] = 'distance'
+        else:
+            params['radius'] = int(radius)
+        response = self.session.get(
+            f"{self.base_url}/maps/api/place/nearbysearch/json",
+            params=params,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        data = response.json()
+        status = data.get('status')
+        if status not in ('OK', 'ZERO_RESULTS'):
+            raise RuntimeError(f"Places API error: {status} {data.get('error_message', '')}".strip())
+        return [_place_to_hospital(place) for place in data.get('results', [])]
+
+
+def _place_to_hospital(place: dict) -> dict:
+    location = (place.get('geometry') or {}).get('location') or {}
+    return {
+        'name': place.get('name'),
+        'address': place.get('vicinity'),
+        'rating': place.get('rating'),
+        'place_id': place.get('place_id'),
+        'lat': location.get('lat'),
+        'lng': location.get('lng'),
+        'open_now': (place.get('opening_hours') or {}).get('open_now'),
+    }
+
+
+# ==========================================
+# CACHE
+# ==========================================
+class _CachedArea:
+    __slots__ = ('lat', 'lng', 'radius', 'hospitals', 'expires_at')
+
+    def __init__(self, lat, lng, radius, hospitals, expires_at):
+        self.lat = lat
+        self.lng = lng
+        self.radius = radius
+        self.hospitals = hospitals
+        self.expires_at = expires_at
+
+    def nearest(self, lat, lng, radius, limit, exact=True):
+        """
+        Returns the cached hospitals nearest to lat/lng within radius, or
+        None (when exact) if some hospital this page does not hold could be
+        among them.
+        """
+        found, distances = [], []
+        for hospital in self.hospitals:
+            if hospital.get('lat') is None or hospital.get('lng') is None:
+                continue
+            distance = haversine_m(lat, lng, hospital['lat'], hospital['lng'])
+            if distance > radius:
+                continue
+            index = bisect.bisect(distances, distance)
+            distances.insert(index, distance)
+            found.insert(index, {**hospital, 'distance_km': round(distance / 1000, 2)})
+        # Anything nearer than the last answer lies inside this circle
+        reach = distances[limit - 1] if len(found) >= limit else radius
+        if exact and haversine_m(self.lat, self.lng, lat, lng) + reach > self.radius:
+            return None
+        return found[:limit]
+
+
+class LatencyWindow:
+    """Keeps the most recent samples for percentile reporting."""
+
+    def __init__(self, size: int = 2048):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentiles(self, *points) -> dict:
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return {f"p{p}_ms": None for p in points}
+        return {f"p{p}_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 2)
+                for p in points}
+
+
+class HospitalLookup:
+    def __init__(self, client: PlacesClient, ttl: float = 86400, precision: int = 6,
+                 max_cells: int = 10000, fetch=None, flights: SingleFlight = None):
+        """
+        fetch(fn, *args) runs the Places call; app.py passes the 'places'
+        backend executor so lookups share its concurrency limit and timeout.
+        flights merges concurrent fetches of the same cell (or, for dense
+        areas, the same point to ~10 m) into one Places call.
+        """
+        self.client = client
+        self.ttl = ttl
+        self.precision = precision
+        self.max_cells = max_cells
+        self.fetch = fetch or (lambda fn, *args: fn(*args))
+        self.flights = flights or SingleFlight('places', timeout=15.0)
+
+        self._cells = OrderedDict()  # geohash -> _CachedArea
+        self._lock = threading.Lock()
+        self.latency = LatencyWindow()
+        self.upstream_latency = LatencyWindow()
+        self.hits = 0
+        self.neighbor_hits = 0
+        self.misses = 0
+
+    def find(self, lat: float, lng: float, radius: float = 5000, limit: int = 10):
+        """Returns (hospitals sorted by distance, cached) for the circle around lat/lng."""
+        started = time.perf_counter()
+        limit = min(limit, PLACES_PAGE_SIZE)
+        cell = geohash_encode(lat, lng, self.precision)
+        hospitals, filled = self._from_cache(cell, lat, lng, radius, limit)
+        cached = hospitals is not None
+        if hospitals is None and not filled:
+            hospitals = self.flights.do(('cell', cell), self._fill, cell).nearest(lat, lng, radius, limit)
+        if hospitals is None:
+            # Dense area: the cell's page is too short for this query
+            point = ('point', round(lat, 4), round(lng, 4))
+            hospitals = self.flights.do(point, self._fetch, lat, lng).nearest(lat, lng, radius, limit, exact=False)
+        self.latency.add(time.perf_counter() - started)
+        return hospitals, cached
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.neighbor_hits + self.misses
+            out = {
+                'cells': len(self._cells),
+                'hits': self.hits,
+                'neighbor_hits': self.neighbor_hits,
+                'misses': self.misses,
+                'hit_ratio': ((self.hits + self.neighbor_hits) / lookups) if lookups else 0.0,
+            }
+        out['latency'] = self.latency.percentiles(50, 99)
+        out['upstream_latency'] = self.upstream_latency.percentiles(50, 99)
+        out['single_flight'] = self.flights.stats()
+        return out
+
+    def _from_cache(self, cell, lat, lng, radius, limit):
+        """Returns (hospitals or None, whether the query's own cell holds a page)."""
+        now = time.time()
+        with self._lock:
+            for index, key in enumerate([cell] + geohash_neighbors(cell)):
+                area = self._cells.get(key)
+                if area is None:
+                    continue
+                if area.expires_at <= now:
+                    del self._cells[key]
+                    continue
+                hospitals = area.nearest(lat, lng, radius, limit)
+                if hospitals is not None:
+                    self._cells.move_to_end(key)
+                    if index == 0:
+                        self.hits += 1
+                    else:
+                        self.neighbor_hits += 1
+                    return hospitals, True
+            self.misses += 1
+            return None, cell in self._cells
+
+    def _fetch(self, lat, lng):
+        started = time.perf_counter()
+        hospitals = self.fetch(self.client.nearby_hospitals, lat, lng)
+        self.upstream_latency.add(time.perf_counter() - started)
+        if len(hospitals) < PLACES_PAGE_SIZE:
+            reach = PLACES_MAX_RADIUS_M
+        else:
+            reach = max((haversine_m(lat, lng, h['lat'], h['lng']) for h in hospitals
+                         if h.get('lat') is not None and h.get('lng') is not None), default=0)
+        return _CachedArea(lat, lng, reach, hospitals, time.time() + self.ttl)
+
+    def _fill(self, cell):
+        area = self._fetch(*geohash_center(cell))
+        with self._lock:
+            self._cells[cell] = area
+            self._cells.move_to_end(cell)
+            while len(self._cells) > self.max_cells:
+                self._cells.popitem(last=False)
+        return area
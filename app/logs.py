@@ -0,0 +1,95 @@
+"""
+Structured logging.
+
+get_logger(name) returns an EventLogger whose calls take an event name
+and key=value fields instead of a formatted message:
+
+    log.info('reminder.scheduled', reminder_id=reminder_id, at=when)
+
+LOG_FORMAT=json writes one JSON object per line for log shippers; the
+default 'text' format writes `time LEVEL event key=value ...`. Events on
+hot paths pass sample=HOT_PATH_SAMPLE (LOG_SAMPLE_RATE, default 0.1);
+dropped and disabled calls return before anything is formatted.
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+
+# Sample rate for per-request and per-message events (LOG_SAMPLE_RATE)
+HOT_PATH_SAMPLE = float(os.environ.get("LOG_SAMPLE_RATE", "0.1"))
+
+
+class EventLogger:
+    __slots__ = ('_logger',)
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    def _log(self, level, event, sample, exc_info, fields):
+        if not self._logger.isEnabledFor(level):
+            return
+        if sample < 1.0:
+            if random.random() >= sample:
+                return
+            fields['sample_rate'] = sample
+        self._logger.log(level, event, exc_info=exc_info, extra={'fields': fields}, stacklevel=3)
+
+    def debug(self, event, sample: float = 1.0, **fields):
+        self._log(logging.DEBUG, event, sample, None, fields)
+
+    def info(self, event, sample: float = 1.0, **fields):
+        self._log(logging.INFO, event, sample, None, fields)
+
+    def warning(self, event, sample: float = 1.0, **fields):
+        self._log(logging.WARNING, event, sample, None, fields)
+
+    def error(self, event, sample: float = 1.0, **fields):
+        self._log(logging.ERROR, event, sample, None, fields)
+
+    def exception(self, event, **fields):
+        """Logs at ERROR with the current exception's traceback."""
+        self._log(logging.ERROR, event, 1.0, True, fields)
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        out = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        out.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            out['exc'] = self.formatException(record.exc_info)
+        return json.dumps(out, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.getMessage()}"
+        for key, value in getattr(record, 'fields', {}).items():
+            value = json.dumps(value, default=str, separators=(',', ':')) if isinstance(value, (dict, list)) else str(value)
+            line += f" {key}={json.dumps(value, ensure_ascii=False) if (' ' in value or not value) else value}"
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(fmt: str = None, level: str = None):
+    """Sends 'healthmate.*' loggers to stdout; LOG_FORMAT (text|json) and LOG_LEVEL pick the defaults."""
+    fmt = (fmt or os.environ.get("LOG_FORMAT", "text")).lower()
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JSONFormatter() if fmt == 'json' else TextFormatter())
+    root = logging.getLogger('healthmate')
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    root.propagate = False
+
+
+def get_logger(name: str) -> EventLogger:
+    return EventLogger(logging.getLogger(f'healthmate.{name}'))
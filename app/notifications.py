@@ -0,0 +1,378 @@
+"""
+Queued SMS/email delivery for reminders.
+
+Messages are queued and sent by background workers per channel:
+- SMTP connections are pooled and stay authenticated between messages
+- one Twilio client (and its HTTP session) is shared by all SMS workers
+- each channel has a token-bucket rate limit
+- failed sends are retried with exponential backoff
+- emails queued within the same second are sent together over one
+  connection, and identical reminders go out as a single message with one
+  envelope recipient per patient
+"""
+
+import queue
+import random
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+
+from logs import HOT_PATH_SAMPLE, get_logger
+from metrics import dependency_timer
+
+log = get_logger('notifications')
+
+
+def mask_recipient(to) -> str:
+    """A phone number or email address cut down to what is safe to log, e.g. '***42' or 'j***@example.com'."""
+    to = str(to or '')
+    if '@' in to:
+        local, domain = to.rsplit('@', 1)
+        return f"{local[:1]}***@{domain}"
+    return f"***{to[-2:]}" if len(to) > 4 else '***'
+
+
+def make_twilio_client(account_sid, auth_token, base_url=None):
+    """
+    Builds one Twilio client to share across workers; its HTTP client keeps
+    a pooled requests.Session. base_url points it at a stand-in server.
+    """
+    from twilio.http.http_client import TwilioHttpClient
+    from twilio.rest import Client as TwilioClient
+
+    if base_url:
+        class _RebasedHttpClient(TwilioHttpClient):
+            def request(self, method, url, *args, **kwargs):
+                url = url.replace('https://api.twilio.com', base_url.rstrip('/'), 1)
+                return super().request(method, url, *args, **kwargs)
+
+        http_client = _RebasedHttpClient(pool_connections=True, timeout=15)
+    else:
+        http_client = TwilioHttpClient(pool_connections=True, timeout=15)
+    return TwilioClient(account_sid, auth_token, http_client=http_client)
+
+
+class TokenBucket:
+    """Allows `rate` operations per second with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Blocks until tokens are available."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SMTPConnectionPool:
+    """Keeps authenticated SMTP sessions open and hands them out one at a time."""
+
+    def __init__(self, host, port, user=None, password=None, size: int = 2,
+                 starttls: bool = True, timeout: float = 15, max_idle: float = 60):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue(maxsize=size)
+        self.connects = 0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls()
+        if self.user and self.password:
+            server.login(self.user, self.password)
+        self.connects += 1
+        return server
+
+    def acquire(self):
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used < self.max_idle:
+                return server
+            # Idle too long; the server may have dropped it
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._close(server)
+
+    def release(self, server, broken: bool = False):
+        if broken:
+            self._close(server)
+            return
+        try:
+            self._idle.put_nowait((server, time.monotonic()))
+        except queue.Full:
+            self._close(server)
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+
+class _Message:
+    __slots__ = ('to', 'subject', 'body', 'attempt', 'not_before')
+
+    def __init__(self, to, body, subject=None):
+        self.to = to
+        self.subject = subject
+        self.body = body
+        self.attempt = 1
+        self.not_before = 0.0
+
+
+class _Channel:
+    def __init__(self, name, workers, rate, burst, max_attempts, backoff):
+        self.name = name
+        self.queue = queue.Queue()
+        self.limiter = TokenBucket(rate, burst)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.lock = threading.Lock()
+
+    def take(self, timeout):
+        """Returns the next message that is ready to send, or None."""
+        try:
+            message = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        delay = message.not_before - time.monotonic()
+        if delay > 0:
+            # Still backing off: put it back behind the others
+            self.queue.put(message)
+            self.queue.task_done()
+            time.sleep(min(delay, 0.05))
+            return None
+        return message
+
+    def retry_later(self, message, error):
+        if message.attempt >= self.max_attempts:
+            with self.lock:
+                self.failed += 1
+            masked = mask_recipient(message.to)
+            # Provider errors often quote the recipient back
+            log.error('notification.failed', channel=self.name, to=masked, attempts=message.attempt,
+                      error=str(error).replace(str(message.to), masked) if message.to else str(error))
+            return
+        with self.lock:
+            self.retried += 1
+        delay = self.backoff * (2 ** (message.attempt - 1)) * (0.5 + random.random())
+        message.attempt += 1
+        message.not_before = time.monotonic() + delay
+        self.queue.put(message)
+
+
+class NotificationDispatcher:
+    def __init__(self, twilio_client=None, twilio_from=None, smtp_pool=None, smtp_from=None,
+                 sms_workers: int = 4, sms_rate: float = 10, email_workers: int = 2, email_rate: float = 20,
+                 email_batch_size: int = 50, email_batch_window: float = 1.0,
+                 max_attempts: int = 4, backoff: float = 0.5):
+        self.twilio_client = twilio_client
+        self.twilio_from = twilio_from
+        self.smtp_pool = smtp_pool
+        self.smtp_from = smtp_from
+        self.email_batch_size = email_batch_size
+        self.email_batch_window = email_batch_window
+
+        self.sms = _Channel('sms', sms_workers, sms_rate, max(1, int(sms_rate)), max_attempts, backoff)
+        self.email = _Channel('email', email_workers, email_rate, max(1, int(email_rate)), max_attempts, backoff)
+        self._threads = []
+        self._stopping = threading.Event()
+
+    # ------------------------------------------
+    # Public API
+    # ------------------------------------------
+    def start(self):
+        if self._threads:
+            return
+        if self.twilio_client is not None:
+            for i in range(self.sms.workers):
+                self._spawn(self._sms_worker, f"sms-worker-{i}")
+        if self.smtp_pool is not None:
+            for i in range(self.email.workers):
+                self._spawn(self._email_worker, f"email-worker-{i}")
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        if self.smtp_pool is not None:
+            self.smtp_pool.close()
+
+    def send_sms(self, to_number: str, body: str) -> bool:
+        if self.twilio_client is None or not to_number:
+            return False
+        self.sms.queue.put(_Message(to_number, body))
+        return True
+
+    def send_email(self, to_email: str, subject: str, body: str) -> bool:
+        if self.smtp_pool is None or not to_email:
+            return False
+        self.email.queue.put(_Message(to_email, body, subject=subject))
+        return True
+
+    def join(self):
+        """Waits until every queued message has been sent or given up on."""
+        self.sms.queue.join()
+        self.email.queue.join()
+
+    def stats(self) -> dict:
+        out = {}
+        for channel in (self.sms, self.email):
+            with channel.lock:
+                out[channel.name] = {
+                    'queued': channel.queue.qsize(),
+                    'sent': channel.sent,
+                    'failed': channel.failed,
+                    'retried': channel.retried,
+                }
+        if self.smtp_pool is not None:
+            out['email']['smtp_connects'] = self.smtp_pool.connects
+        return out
+
+    # ------------------------------------------
+    # Workers
+    # ------------------------------------------
+    def _spawn(self, target, name):
+        t = threading.Thread(target=target, name=name, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _sms_worker(self):
+        channel = self.sms
+        while not self._stopping.is_set():
+            message = channel.take(timeout=0.5)
+            if message is None:
+                continue
+            try:
+                channel.limiter.acquire()
+                with dependency_timer('twilio', 'messages.create'):
+                    self.twilio_client.messages.create(to=message.to, from_=self.twilio_from, body=message.body)
+                with channel.lock:
+                    channel.sent += 1
+                log.info('notification.sent', sample=HOT_PATH_SAMPLE, channel='sms', to=mask_recipient(message.to))
+            except Exception as e:
+                channel.retry_later(message, e)
+            finally:
+                channel.queue.task_done()
+
+    def _email_worker(self):
+        channel = self.email
+        while not self._stopping.is_set():
+            first = channel.take(timeout=0.5)
+            if first is None:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.email_batch_window
+            while len(batch) < self.email_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                message = channel.take(timeout=remaining)
+                if message is not None:
+                    batch.append(message)
+                elif channel.queue.empty():
+                    break
+            try:
+                self._send_email_batch(batch)
+            finally:
+                for _ in batch:
+                    channel.queue.task_done()
+
+    def _send_email_batch(self, batch):
+        channel = self.email
+        # Identical reminders become one message with several envelope recipients
+        groups = {}
+        for message in batch:
+            groups.setdefault((message.subject, message.body), []).append(message)
+        groups = list(groups.items())
+
+        try:
+            server = self.smtp_pool.acquire()
+        except Exception as e:
+            for message in batch:
+                channel.retry_later(message, e)
+            return
+
+        broken = False
+        for index, ((subject, body), messages) in enumerate(groups):
+            recipients = [m.to for m in messages]
+            msg = MIMEText(body)
+            msg['Subject'] = subject
+            msg['From'] = self.smtp_from
+            msg['To'] = recipients[0] if len(recipients) == 1 else self.smtp_from
+            try:
+                channel.limiter.acquire()
+                with dependency_timer('smtp', 'send_message'):
+                    refused = server.send_message(msg, from_addr=self.smtp_from, to_addrs=recipients) or {}
+                with channel.lock:
+                    channel.sent += len(recipients) - len(refused)
+                for m in messages:
+                    if m.to in refused:
+                        channel.retry_later(m, refused[m.to])
+                log.info('notification.sent', sample=HOT_PATH_SAMPLE, channel='email',
+                         recipients=len(recipients) - len(refused))
+            except smtplib.SMTPServerDisconnected as e:
+                broken, error = True, e
+            except smtplib.SMTPException as e:
+                for m in messages:
+                    channel.retry_later(m, e)
+                continue
+            except OSError as e:
+                broken, error = True, e
+            except Exception as e:
+                for m in messages:
+                    channel.retry_later(m, e)
+                continue
+            if broken:
+                # The connection is gone: requeue this group and everything after it
+                for _, pending in groups[index:]:
+                    for m in pending:
+                        channel.retry_later(m, error)
+                break
+
+        self.smtp_pool.release(server, broken=broken)
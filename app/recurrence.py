@@ -0,0 +1,118 @@
+"""
+Recurrence rules for reminders.
+
+Supports the RRULE subset that medication schedules need:
+
+    FREQ=DAILY;BYHOUR=8,20;BYMINUTE=0;COUNT=28     8:00 and 20:00 for 14 days
+    FREQ=WEEKLY;BYDAY=MO,TH;BYHOUR=9;UNTIL=20260301T000000
+    FREQ=DAILY;INTERVAL=2                          every other day at DTSTART's time
+
+Occurrences are computed one at a time with next_after(), so a regimen is
+stored as a single reminder document whatever its length.
+"""
+
+from datetime import datetime, time, timedelta
+
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+FREQUENCIES = ('DAILY', 'WEEKLY')
+
+
+def _int_list(value, name, low, high):
+    try:
+        numbers = sorted({int(x) for x in value.split(',') if x.strip()})
+    except ValueError as exc:
+        raise ValueError(f"Invalid {name}: {value}") from exc
+    if not numbers or numbers[0] < low or numbers[-1] > high:
+        raise ValueError(f"Invalid {name}: {value}")
+    return numbers
+
+
+def _parse_until(value):
+    value = value.strip().rstrip('Z')
+    for fmt in ('%Y%m%dT%H%M%S', '%Y%m%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as exc:
+        raise ValueError(f"Invalid UNTIL: {value}") from exc
+
+
+class Recurrence:
+    """A parsed rule anchored at dtstart (naive local time)."""
+
+    __slots__ = ('rule', 'dtstart', 'freq', 'interval', 'weekdays', 'times', 'count', 'until')
+
+    def __init__(self, rule: str, dtstart: datetime):
+        self.rule = rule
+        self.dtstart = dtstart.replace(second=0, microsecond=0)
+        parts = {}
+        for part in (rule or '').upper().replace('RRULE:', '').split(';'):
+            if not part.strip():
+                continue
+            key, sep, value = part.partition('=')
+            if not sep:
+                raise ValueError(f"Invalid recurrence rule part: {part}")
+            parts[key.strip()] = value.strip()
+
+        self.freq = parts.pop('FREQ', None)
+        if self.freq not in FREQUENCIES:
+            raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+        self.interval = int(parts.pop('INTERVAL', '1'))
+        if self.interval < 1:
+            raise ValueError("INTERVAL must be at least 1")
+
+        hours = _int_list(parts.pop('BYHOUR'), 'BYHOUR', 0, 23) if 'BYHOUR' in parts else [self.dtstart.hour]
+        minutes = _int_list(parts.pop('BYMINUTE'), 'BYMINUTE', 0, 59) if 'BYMINUTE' in parts else [self.dtstart.minute]
+        self.times = tuple(time(h, m) for h in hours for m in minutes)
+
+        if 'BYDAY' in parts:
+            days = [d.strip() for d in parts.pop('BYDAY').split(',') if d.strip()]
+            if not days or any(d not in WEEKDAYS for d in days):
+                raise ValueError(f"Invalid BYDAY: {','.join(days)}")
+            self.weekdays = frozenset(WEEKDAYS.index(d) for d in days)
+        elif self.freq == 'WEEKLY':
+            self.weekdays = frozenset([self.dtstart.weekday()])
+        else:
+            self.weekdays = None
+
+        self.count = int(parts.pop('COUNT')) if 'COUNT' in parts else None
+        if self.count is not None and self.count < 1:
+            raise ValueError("COUNT must be at least 1")
+        self.until = _parse_until(parts.pop('UNTIL')) if 'UNTIL' in parts else None
+        if parts:
+            raise ValueError(f"Unsupported recurrence rule parts: {', '.join(sorted(parts))}")
+
+    def _day_matches(self, day) -> bool:
+        if self.weekdays is not None and day.weekday() not in self.weekdays:
+            return False
+        if self.interval == 1:
+            return True
+        start = self.dtstart.date()
+        if self.freq == 'DAILY':
+            return (day - start).days % self.interval == 0
+        week_start = start - timedelta(days=start.weekday())
+        return ((day - week_start).days // 7) % self.interval == 0
+
+    def next_after(self, after: datetime):
+        """Returns the first occurrence strictly after `after`, or None once UNTIL has passed."""
+        if after < self.dtstart:
+            after = self.dtstart - timedelta(microseconds=1)
+        day = after.date()
+        # One full cycle is enough to find the next matching day
+        for _ in range(7 * self.interval + 1):
+            if self._day_matches(day):
+                for at in self.times:
+                    candidate = datetime.combine(day, at)
+                    if candidate > after:
+                        if self.until is not None and candidate > self.until:
+                            return None
+                        return candidate
+            day += timedelta(days=1)
+        return None
+
+    def first(self):
+        """The first occurrence at or after dtstart."""
+        return self.next_after(self.dtstart - timedelta(microseconds=1))
@@ -0,0 +1,133 @@
+"""
+Pre-rendered spoken reminders.
+
+When reminders are created (one by one or in bulk), their spoken text is
+queued here and synthesized in the background, so a due reminder can
+point the browser at a ready clip instead of synthesizing on the firing
+path. Each reminder document gets an `audio_key`, the TTS cache key of its
+text; many reminders for the same medicine share one clip, and each
+distinct text is synthesized once however many reminders use it.
+
+A text is queued only once its reminder is stored. The clip lives in the
+TTS cache of the process that rendered it; other processes, or this one
+after an eviction, render it again from the reminder on first request.
+"""
+
+import queue
+import threading
+import time
+
+from logs import get_logger
+
+log = get_logger('reminder_audio')
+
+
+class ReminderAudioRenderer:
+    def __init__(self, synthesize, text_for, key_for, is_rendered, workers: int = 4, max_queue: int = 100_000):
+        """
+        synthesize(text) renders and stores one clip (returns None on failure).
+        text_for(medicine_name) is the spoken text; key_for(text) its cache key;
+        is_rendered(key) tells whether the clip is already stored.
+        """
+        self.synthesize = synthesize
+        self.text_for = text_for
+        self.key_for = key_for
+        self.is_rendered = is_rendered
+        self.workers = workers
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = set()  # keys queued or being rendered
+        self._lock = threading.Lock()
+        self._threads = []
+        self._started = False
+        self.rendered = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def prepare(self, reminder: dict) -> str:
+        """Sets reminder['audio_key']; call render() once the reminder is stored."""
+        key = self.key_for(self.text_for(reminder.get('medicine_name')))
+        reminder['audio_key'] = key
+        return key
+
+    def render(self, reminder: dict) -> bool:
+        """Queues a stored reminder's text unless it is rendered or queued already."""
+        text = self.text_for(reminder.get('medicine_name'))
+        return self.enqueue(text, reminder.get('audio_key') or self.key_for(text))
+
+    def enqueue(self, text: str, key: str = None) -> bool:
+        key = key or self.key_for(text)
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+        if self.is_rendered(key):
+            with self._lock:
+                self._pending.discard(key)
+            return False
+        try:
+            self._queue.put_nowait((text, key))
+        except queue.Full:
+            with self._lock:
+                self._pending.discard(key)
+                self.dropped += 1
+            return False
+        self.start()
+        return True
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"reminder-audio-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._started = False
+
+    def join(self, timeout: float = None) -> bool:
+        """Waits until every queued text is rendered; returns False on timeout."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            text, key = item
+            try:
+                ok = self.synthesize(text) is not None
+            except Exception as e:
+                log.error('reminder_audio.failed', key=key, error=str(e))
+                ok = False
+            with self._lock:
+                self._pending.discard(key)
+                if ok:
+                    self.rendered += 1
+                else:
+                    self.failed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'rendered': self.rendered,
+                'failed': self.failed,
+                'dropped': self.dropped,
+                'workers': self.workers,
+            }
@@ -0,0 +1,204 @@
+"""
+Bulk import and export of reminders as JSON Lines or CSV.
+
+Imports read the upload one row at a time, validate each row, write in
+chunks with unordered insert_many and register scheduler jobs once per
+chunk. Bad rows are reported by line number instead of failing the whole
+upload. Exports stream straight from the Mongo cursor.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+from reminder_scheduler import STATUS_PENDING, apply_recurrence, to_local_naive
+from reminder_store import ASCENDING, REMINDER_PROJECTION, build_reminder_query, serialize_reminder
+from reminder_workers import assign_shard
+
+FORMATS = ('jsonl', 'csv')
+EXPORT_FIELDS = ['_id', 'medicine_name', 'reminder_time', 'phone', 'email', 'owner', 'recurrence']
+EXPORT_MIMETYPES = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def detect_format(explicit=None, content_type=None, filename=None) -> str:
+    """Picks 'jsonl' or 'csv' from an explicit value, a filename or a content type."""
+    if explicit:
+        fmt = explicit.lower()
+        if fmt in ('json', 'ndjson'):
+            fmt = 'jsonl'
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {explicit}")
+        return fmt
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if 'csv' in (content_type or '').lower():
+        return 'csv'
+    return 'jsonl'
+
+
+def iter_rows(stream, fmt: str):
+    """
+    Yields (line_number, row) from a binary or text stream.
+
+    row is a dict, or an Exception for lines that could not be parsed.
+    """
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, ValueError(f"Invalid JSON: {exc}")
+            continue
+        if not isinstance(row, dict):
+            row = ValueError("Each line must be a JSON object")
+        yield line_number, row
+
+
+def _field(row, name):
+    value = row.get(name)
+    return value.strip() if isinstance(value, str) else value
+
+
+def build_reminder(row: dict, parse_time, owner=None, now=None) -> dict:
+    """Validates one row and returns the document to insert; raises ValueError."""
+    medicine_name = _field(row, 'medicine_name')
+    reminder_time = _field(row, 'reminder_time')
+    if not medicine_name or not reminder_time:
+        raise ValueError("Medicine name and time required")
+    reminder = {
+        'medicine_name': medicine_name,
+        'reminder_time': to_local_naive(parse_time(str(reminder_time))),
+        'phone': _field(row, 'phone') or None,
+        'email': _field(row, 'email') or None,
+        'owner': owner or _field(row, 'owner') or None,
+        'status': STATUS_PENDING,
+        'created_at': now or datetime.now(),
+    }
+    assign_shard(reminder)
+    recurrence = _field(row, 'recurrence')
+    if recurrence:
+        apply_recurrence(reminder, recurrence)
+    return reminder
+
+
+class ImportResult:
+    def __init__(self, max_errors: int = 1000):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.scheduled = 0
+        self.errors = []
+
+    def error(self, line_number, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line_number, 'error': str(message)})
+
+    def to_dict(self) -> dict:
+        return {
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'scheduled': self.scheduled,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def import_reminders(collection, rows, parse_time, owner=None, scheduler=None,
+                     chunk_size: int = 1000, max_errors: int = 1000, audio=None) -> ImportResult:
+    """
+    Validates and inserts rows from iter_rows() in chunks.
+
+    owner, when given, overrides any owner column in the rows. scheduler is
+    a ReminderScheduler; inserted reminders are handed to schedule_many().
+    audio is a ReminderAudioRenderer; each reminder is linked to its spoken
+    clip, and every distinct text is queued for rendering once it is inserted.
+    """
+    result = ImportResult(max_errors)
+    chunk, lines = [], []
+    now = datetime.now()
+
+    for line_number, row in rows:
+        result.rows += 1
+        if isinstance(row, Exception):
+            result.error(line_number, row)
+            continue
+        try:
+            reminder = build_reminder(row, parse_time, owner, now)
+        except ValueError as e:
+            result.error(line_number, e)
+            continue
+        if audio is not None:
+            audio.prepare(reminder)
+        chunk.append(reminder)
+        lines.append(line_number)
+        if len(chunk) >= chunk_size:
+            _flush(collection, chunk, lines, scheduler, result, audio)
+            chunk, lines = [], []
+
+    if chunk:
+        _flush(collection, chunk, lines, scheduler, result, audio)
+    return result
+
+
+def _flush(collection, docs, lines, scheduler, result, audio=None):
+    from pymongo.errors import BulkWriteError
+
+    failed = set()
+    try:
+        collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details.get('writeErrors', []):
+            failed.add(write_error['index'])
+            result.error(lines[write_error['index']], write_error.get('errmsg', 'write failed'))
+    inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+    result.inserted += len(inserted)
+    if scheduler is not None and inserted:
+        result.scheduled += scheduler.schedule_many(inserted)
+    if audio is not None:
+        for doc in inserted:
+            audio.render(doc)
+
+
+def find_reminders_for_export(collection, owner=None, start=None, end=None, batch_size: int = 1000):
+    """Returns a cursor over every matching reminder in (reminder_time, _id) order."""
+    query = build_reminder_query(owner, start, end)
+    return (collection.find(query, REMINDER_PROJECTION)
+            .sort([("reminder_time", ASCENDING), ("_id", ASCENDING)])
+            .batch_size(batch_size))
+
+
+def export_rows(reminders, fmt: str):
+    """Yields the export one line at a time."""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for reminder in reminders:
+            writer.writerow(serialize_reminder(reminder))
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+        return
+
+    for reminder in reminders:
+        yield json.dumps(serialize_reminder(reminder)) + '\n'
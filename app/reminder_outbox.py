@@ -0,0 +1,381 @@
+"""
+Write-behind persistence for reminders.
+
+With REMINDER_OUTBOX set, a new reminder is appended to a local SQLite
+(WAL) outbox and acknowledged straight away; a background flusher sends
+the outbox to MongoDB in bulk_write batches. The outbox survives
+restarts, and a slow or unreachable MongoDB only makes the backlog grow.
+
+Ordering: operations on the same reminder (its insert, then a delete)
+are applied in the order they were accepted. A batch never holds two
+operations for one reminder, so each batch can be sent unordered, and an
+operation that fails stays at the head of the outbox ahead of anything
+later for its reminder. Inserts use the reminder's own ObjectId, so a
+batch replayed after a crash or timeout finds the duplicates and skips
+them. Connection errors are retried with backoff for as long as it
+takes; an operation MongoDB itself rejects `max_attempts` times is moved
+to the outbox_dead table.
+
+Several processes may share one outbox file; a lease row lets only one
+of them flush at a time.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import timezone
+
+from bson import json_util
+from bson.objectid import ObjectId
+
+from logs import get_logger
+
+log = get_logger('reminder_outbox')
+
+OP_INSERT = 'insert'
+OP_DELETE = 'delete'
+_DUPLICATE_KEY = 11000
+
+
+def _as_stored(when):
+    """Compares datetimes the way MongoDB does: aware ones as UTC, naive ones as they are."""
+    if when is not None and when.tzinfo is not None:
+        return when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when
+
+
+def _matches(doc, owner=None, start=None, end=None, after=None) -> bool:
+    """The in-memory equivalent of reminder_store.build_reminder_query()."""
+    start, end = _as_stored(start), _as_stored(end)
+    if owner and doc.get('owner') != owner:
+        return False
+    when = doc.get('reminder_time')
+    if start is not None and not when >= start:
+        return False
+    if end is not None and not when < end:
+        return False
+    if after is not None:
+        after_time, after_id = _as_stored(after[0]), after[1]
+        if (when, doc['_id']) <= (after_time, after_id):
+            return False
+    return True
+
+
+class _Pending:
+    __slots__ = ('row', 'done', 'error')
+
+    def __init__(self, row):
+        self.row = row
+        self.done = False
+        self.error = None
+
+
+class ReminderOutbox:
+    def __init__(self, path: str, collection_for, on_flushed=None, batch_size: int = 500,
+                 interval: float = 0.05, max_attempts: int = 5, retry_max: float = 30.0, lease: float = 10.0):
+        """
+        collection_for() returns the reminders collection, or None while
+        MongoDB is not connected; on_flushed(docs) gets each batch of
+        reminders once they are in MongoDB.
+        """
+        self.path = path
+        self.collection_for = collection_for
+        self.on_flushed = on_flushed
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.retry_max = retry_max
+        self.lease = lease
+        self.holder = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._lock = threading.Lock()  # the SQLite connection
+        self._write_lock = threading.Lock()  # one group commit at a time
+        self._queue_lock = threading.Lock()
+        self._queue = []  # _Pending entries waiting for the next group commit
+        self._stop = threading.Event()
+        self._thread = None
+        self.flushed = 0
+        self.batches = 0
+        self.retries = 0
+        self.dead = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # An acknowledged reminder must survive a power cut, not just a crash
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT NOT NULL, reminder_id TEXT NOT NULL, "
+            "owner TEXT, doc TEXT, attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_owner ON outbox (owner, seq)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_reminder ON outbox (reminder_id, seq)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox_dead ("
+            "seq INTEGER PRIMARY KEY, op TEXT NOT NULL, reminder_id TEXT NOT NULL, doc TEXT, "
+            "error TEXT, failed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox_lease ("
+            "id INTEGER PRIMARY KEY CHECK (id = 1), holder TEXT NOT NULL, until REAL NOT NULL)"
+        )
+
+    # ------------------------------------------
+    # Accepting writes
+    # ------------------------------------------
+    def append_insert(self, reminder: dict) -> str:
+        """Durably queues a new reminder, giving it an ObjectId if it has none; returns the id."""
+        if not isinstance(reminder.get('_id'), ObjectId):
+            reminder['_id'] = ObjectId()
+        reminder_id = str(reminder['_id'])
+        self._append(OP_INSERT, reminder_id, reminder.get('owner'), json_util.dumps(reminder))
+        return reminder_id
+
+    def append_delete(self, reminder_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT owner FROM outbox WHERE reminder_id = ? ORDER BY seq DESC LIMIT 1", (reminder_id,)
+            ).fetchone()
+        # Filed under the insert's owner, so that owner's listings see the delete
+        self._append(OP_DELETE, reminder_id, row[0] if row else None, None)
+
+    def _append(self, op, reminder_id, owner, doc):
+        """
+        Returns once the entry is committed. Group commit: whoever holds
+        the write lock commits every entry queued so far in one transaction,
+        so concurrent requests share a single fsync.
+        """
+        entry = _Pending((op, reminder_id, owner, doc, time.time()))
+        with self._queue_lock:
+            self._queue.append(entry)
+        with self._write_lock:
+            if not entry.done:
+                with self._queue_lock:
+                    batch, self._queue = self._queue, []
+                error = None
+                try:
+                    self._commit([e.row for e in batch])
+                except Exception as e:
+                    error = e
+                for e in batch:
+                    e.error, e.done = error, True
+        if entry.error is not None:
+            raise entry.error
+        self.start()
+
+    def _commit(self, rows):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO outbox (op, reminder_id, owner, doc, created_at) VALUES (?, ?, ?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ------------------------------------------
+    # Reading unflushed reminders
+    # ------------------------------------------
+    def is_pending_insert(self, reminder_id: str) -> bool:
+        """Whether the reminder is still only in the outbox (and not already deleted there)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT op FROM outbox WHERE reminder_id = ? ORDER BY seq DESC LIMIT 1", (reminder_id,)
+            ).fetchone()
+        return row is not None and row[0] == OP_INSERT
+
+    def pending(self, owner=None, start=None, end=None, after=None):
+        """
+        Returns (reminders, deleted): the unflushed reminders matching the
+        query in (reminder_time, _id) order, and the ids with a delete still
+        queued, which MongoDB may not have applied yet.
+        """
+        sql = "SELECT op, reminder_id, doc FROM outbox"
+        params = ()
+        if owner:
+            sql, params = sql + " WHERE owner = ?", (owner,)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY seq", params).fetchall()
+        reminders, deleted = {}, set()
+        for op, reminder_id, doc in rows:
+            if op == OP_INSERT:
+                reminders[reminder_id] = json_util.loads(doc)
+                deleted.discard(reminder_id)
+            else:
+                reminders.pop(reminder_id, None)
+                deleted.add(reminder_id)
+        matching = [doc for doc in reminders.values() if _matches(doc, owner, start, end, after)]
+        matching.sort(key=lambda doc: (doc['reminder_time'], doc['_id']))
+        return matching, deleted
+
+    # ------------------------------------------
+    # Flushing
+    # ------------------------------------------
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='reminder-outbox', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        backoff = 0.0
+        while not self._stop.is_set():
+            try:
+                flushed = self.flush_once()
+                backoff = 0.0
+            except Exception as e:
+                self.retries += 1
+                backoff = min(self.retry_max, max(self.interval, backoff * 2 or 0.5))
+                log.warning('reminder_outbox.flush_failed', error=str(e), retry_in=round(backoff, 2),
+                            pending=self.backlog())
+                self._stop.wait(backoff)
+                continue
+            if flushed < self.batch_size:
+                self._stop.wait(self.interval)  # let the next batch fill up
+
+    def flush_once(self) -> int:
+        """Sends one batch; returns how many outbox entries it retired."""
+        collection = self.collection_for()
+        if collection is None or not self._hold_lease():
+            return 0
+        rows = self._next_batch()
+        if not rows:
+            return 0
+
+        from pymongo import DeleteOne, InsertOne
+        from pymongo.errors import BulkWriteError
+
+        ops = [InsertOne(json_util.loads(doc)) if op == OP_INSERT else DeleteOne({'_id': ObjectId(reminder_id)})
+               for _, op, reminder_id, doc, _ in rows]
+        failed = {}
+        try:
+            collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            if e.details.get('writeConcernErrors'):
+                raise
+            for error in e.details.get('writeErrors', []):
+                if error.get('code') != _DUPLICATE_KEY:  # a duplicate is an insert that already landed
+                    failed[error['index']] = error.get('errmsg', '')
+
+        done, dead, retry, inserted = [], [], [], []
+        for index, (seq, op, reminder_id, doc, attempts) in enumerate(rows):
+            if index not in failed:
+                done.append(seq)
+                if op == OP_INSERT:
+                    inserted.append(json_util.loads(doc))
+            elif attempts + 1 >= self.max_attempts:
+                dead.append((seq, op, reminder_id, doc, failed[index], time.time()))
+            else:
+                retry.append(seq)
+        self._retire(done, dead, retry)
+
+        self.batches += 1
+        self.flushed += len(done)
+        self.dead += len(dead)
+        for row in dead:
+            log.error('reminder_outbox.dead_letter', reminder_id=row[2], op=row[1], error=row[4])
+        if inserted and self.on_flushed is not None:
+            self.on_flushed(inserted)
+        return len(done) + len(dead)
+
+    def _next_batch(self) -> list:
+        """The oldest entries, stopping before a second entry for the same reminder."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, op, reminder_id, doc, attempts FROM outbox ORDER BY seq LIMIT ?", (self.batch_size,)
+            ).fetchall()
+        batch, seen = [], set()
+        for row in rows:
+            if row[2] in seen:
+                break
+            seen.add(row[2])
+            batch.append(row)
+        return batch
+
+    def _retire(self, done, dead, retry):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if dead:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO outbox_dead (seq, op, reminder_id, doc, error, failed_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", dead)
+                self._conn.executemany("DELETE FROM outbox WHERE seq = ?",
+                                       [(seq,) for seq in done] + [(row[0],) for row in dead])
+                self._conn.executemany("UPDATE outbox SET attempts = attempts + 1 WHERE seq = ?",
+                                       [(seq,) for seq in retry])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _hold_lease(self) -> bool:
+        """Takes or renews the flusher lease; False while another process holds it."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT holder, until FROM outbox_lease WHERE id = 1").fetchone()
+                mine = row is None or row[0] == self.holder or row[1] < now
+                if mine:
+                    self._conn.execute("INSERT OR REPLACE INTO outbox_lease (id, holder, until) VALUES (1, ?, ?)",
+                                       (self.holder, now + self.lease))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return mine
+
+    def drain(self, timeout: float = None) -> bool:
+        """Waits until the outbox is empty; returns False on timeout."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self.backlog():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def backlog(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending, oldest = self._conn.execute("SELECT COUNT(*), MIN(created_at) FROM outbox").fetchone()
+        return {
+            'pending': pending,
+            'oldest_age': round(time.time() - oldest, 3) if oldest else 0.0,
+            'flushed': self.flushed,
+            'batches': self.batches,
+            'retries': self.retries,
+            'dead': self.dead,
+        }
+
+
+def reminder_outbox_from_env(collection_for, on_flushed=None):
+    """REMINDER_OUTBOX=sqlite:///path/outbox.db turns write-behind on; unset keeps writes synchronous."""
+    url = os.environ.get("REMINDER_OUTBOX")
+    if not url:
+        return None
+    if not url.startswith('sqlite:///'):
+        raise ValueError(f"Unsupported REMINDER_OUTBOX: {url} (expected sqlite:///path)")
+    return ReminderOutbox(
+        url[len('sqlite:///'):],
+        collection_for,
+        on_flushed=on_flushed,
+        batch_size=int(os.environ.get("REMINDER_OUTBOX_BATCH", "500")),
+        interval=float(os.environ.get("REMINDER_OUTBOX_INTERVAL", "0.05")),
+        max_attempts=int(os.environ.get("REMINDER_OUTBOX_MAX_ATTEMPTS", "5")),
+    )
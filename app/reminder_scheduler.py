@@ -0,0 +1,283 @@
+"""
+Restart-safe reminder scheduling.
+
+db.reminders is the source of truth: each reminder carries a status
+('pending', 'sent' or 'missed'). Only reminders due within a short horizon
+are held in memory, in a TimerQueue; a periodic APScheduler refill job
+loads the next window with an indexed range scan on reminder_time, so boot
+only touches the reminders that are about to fire. Reminders missed while
+the process was down are fired on boot if they are within the misfire
+grace window, and marked 'missed' otherwise.
+
+Recurring reminders keep a single document whose reminder_time is the next
+occurrence; claiming an occurrence advances it to the one after.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+
+from recurrence import Recurrence
+from reminder_store import ASCENDING
+from timer_queue import TimerQueue
+from logs import get_logger
+
+log = get_logger('reminders')
+
+STATUS_PENDING = 'pending'
+STATUS_SENT = 'sent'
+STATUS_MISSED = 'missed'
+
+REFILL_JOB_ID = 'reminder-refill'
+
+
+def job_id_for(reminder_id) -> str:
+    return f"reminder-{reminder_id}"
+
+
+def to_local_naive(dt: datetime) -> datetime:
+    """Converts aware datetimes to naive local time, matching datetime.now()."""
+    if dt.tzinfo is not None:
+        return dt.astimezone().replace(tzinfo=None)
+    return dt
+
+
+def recurrence_of(reminder: dict):
+    """Returns the Recurrence of a reminder document, or None for one-off reminders."""
+    rule = reminder.get('recurrence')
+    if not rule:
+        return None
+    return Recurrence(rule, reminder.get('recurrence_start') or reminder['reminder_time'])
+
+
+def apply_recurrence(reminder: dict, rule: str) -> dict:
+    """
+    Turns a new reminder into a recurring one starting at its reminder_time;
+    reminder_time becomes the first occurrence. Raises ValueError.
+    """
+    recurrence = Recurrence(rule, reminder['reminder_time'])
+    first = recurrence.first()
+    if first is None:
+        raise ValueError("Recurrence rule has no occurrences")
+    reminder['recurrence'] = rule
+    reminder['recurrence_start'] = recurrence.dtstart
+    reminder['reminder_time'] = first
+    reminder['occurrence'] = 0
+    return reminder
+
+
+def advance_occurrence(reminder: dict, now: datetime, misfire_grace: timedelta):
+    """
+    Returns (update, following) for firing the due occurrence of a pending
+    reminder: the fields to $set, and the next occurrence (None once done).
+    """
+    update = {'fired_at': now}
+    recurrence = recurrence_of(reminder)
+    if recurrence is None:
+        update['status'] = STATUS_SENT
+        return update, None
+    # A late occurrence must not make the following ones fire in a burst: those
+    # already past the grace window are skipped, and count against COUNT
+    cutoff = now - misfire_grace
+    occurrence = reminder.get('occurrence', 0) + 1
+    skipped = 0
+    following = recurrence.next_after(reminder['reminder_time'])
+    while following is not None and following <= cutoff:
+        if recurrence.count and occurrence >= recurrence.count:
+            break
+        occurrence += 1
+        skipped += 1
+        following = recurrence.next_after(following)
+    update['occurrence'] = occurrence
+    if skipped:
+        update['missed_occurrences'] = reminder.get('missed_occurrences', 0) + skipped
+    if following is None or (recurrence.count and occurrence >= recurrence.count):
+        update['status'] = STATUS_SENT
+        return update, None
+    update['reminder_time'] = following
+    return update, following
+
+
+def mark_missed_reminders(collection, cutoff: datetime) -> int:
+    """
+    Marks pending one-off reminders due before cutoff as missed and moves
+    recurring ones past the occurrences they missed. Returns how many
+    occurrences were missed.
+    """
+    missed = 0
+    stale = collection.find(
+        {'status': STATUS_PENDING, 'recurrence': {'$ne': None}, 'reminder_time': {'$lt': cutoff}},
+        {'reminder_time': 1, 'recurrence': 1, 'recurrence_start': 1, 'occurrence': 1},
+    )
+    for reminder in stale:
+        missed += _skip_missed(collection, reminder, cutoff)
+
+    result = collection.update_many(
+        {'status': STATUS_PENDING, 'recurrence': None, 'reminder_time': {'$lt': cutoff}},
+        {'$set': {'status': STATUS_MISSED}},
+    )
+    return missed + result.modified_count
+
+
+def _skip_missed(collection, reminder, cutoff: datetime) -> int:
+    """Advances a recurring reminder past occurrences missed before cutoff."""
+    recurrence = recurrence_of(reminder)
+    due = reminder['reminder_time']
+    occurrence = reminder.get('occurrence', 0)
+    skipped = 0
+    following = due
+    while following is not None and following < cutoff:
+        skipped += 1
+        following = recurrence.next_after(following)
+    occurrence += skipped
+    update = {'occurrence': occurrence}
+    if following is None or (recurrence.count and occurrence >= recurrence.count):
+        update['status'] = STATUS_MISSED
+    else:
+        update['reminder_time'] = following
+    collection.update_one(
+        {'_id': reminder['_id'], 'status': STATUS_PENDING, 'reminder_time': due},
+        {'$set': update, '$inc': {'missed_occurrences': skipped}},
+    )
+    return skipped
+
+
+class ReminderScheduler:
+    def __init__(self, scheduler, collection, fire, horizon: float = 3600,
+                 refill_interval: float = 300, misfire_grace: float = 300, workers: int = 4):
+        """
+        fire(reminder_id) is called when a reminder is due, on one of
+        `workers` threads. scheduler (APScheduler) only runs the refill job.
+        horizon, refill_interval and misfire_grace are in seconds.
+        """
+        self.scheduler = scheduler
+        self.collection = collection
+        self.fire = fire
+        self.horizon = timedelta(seconds=horizon)
+        self.refill_interval = refill_interval
+        self.misfire_grace = timedelta(seconds=misfire_grace)
+        self._loaded_until = None
+        self.timers = TimerQueue(
+            self._on_due,
+            executor=ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reminder-fire'),
+            name='reminder-timers',
+        )
+
+    def ensure_indexes(self):
+        self.collection.create_index([("status", ASCENDING), ("reminder_time", ASCENDING)])
+        # Reminders created before statuses existed are still pending
+        self.collection.update_many({'status': {'$exists': False}}, {'$set': {'status': STATUS_PENDING}})
+
+    def start(self) -> int:
+        """Catches up missed reminders, loads the first window and starts refilling."""
+        now = datetime.now()
+        self.mark_missed(now)
+        scheduled = self.refill(now)
+        self.timers.start()
+        self.scheduler.add_job(
+            self.refill,
+            'interval',
+            seconds=self.refill_interval,
+            id=REFILL_JOB_ID,
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1,
+        )
+        return scheduled
+
+    def stop(self):
+        self.timers.stop()
+
+    def mark_missed(self, now: datetime = None) -> int:
+        """
+        Marks pending reminders older than the grace window as missed;
+        recurring reminders skip ahead to their next occurrence instead.
+        """
+        missed = mark_missed_reminders(self.collection, (now or datetime.now()) - self.misfire_grace)
+        if missed:
+            log.warning('reminder.missed', count=missed)
+        return missed
+
+    def refill(self, now: datetime = None) -> int:
+        """Schedules pending reminders due between the grace window and now + horizon."""
+        now = now or datetime.now()
+        since = now - self.misfire_grace
+        until = now + self.horizon + timedelta(seconds=self.refill_interval)
+        cursor = self.collection.find(
+            {'status': STATUS_PENDING, 'reminder_time': {'$gte': since, '$lt': until}},
+            {'_id': 1, 'reminder_time': 1},
+        )
+        count = len(self.timers)
+        self.timers.schedule_many(
+            (str(reminder['_id']), to_local_naive(reminder['reminder_time']).timestamp())
+            for reminder in cursor
+        )
+        self._loaded_until = until
+        return len(self.timers) - count
+
+    def schedule(self, reminder: dict) -> bool:
+        """Registers a new reminder if it falls inside the loaded window."""
+        due = to_local_naive(reminder['reminder_time'])
+        if self._loaded_until is not None and due >= self._loaded_until:
+            return False  # the refill job will pick it up
+        self.timers.schedule(str(reminder['_id']), due.timestamp())
+        return True
+
+    def schedule_many(self, reminders) -> int:
+        """Registers a batch of new reminders; returns how many were in the window."""
+        due_soon = [
+            (str(reminder['_id']), to_local_naive(reminder['reminder_time']))
+            for reminder in reminders
+        ]
+        if self._loaded_until is not None:
+            due_soon = [(rid, due) for rid, due in due_soon if due < self._loaded_until]
+        if due_soon:
+            self.timers.schedule_many((rid, due.timestamp()) for rid, due in due_soon)
+        return len(due_soon)
+
+    def cancel(self, reminder_id) -> bool:
+        return self.timers.cancel(str(reminder_id))
+
+    def claim(self, reminder_id):
+        """
+        Atomically claims the due occurrence of a pending reminder and returns
+        the reminder as it was when due, or None if it was already handled.
+        One-off reminders flip to sent; recurring ones advance reminder_time
+        to their next occurrence (and flip to sent after the last one).
+        """
+        oid = ObjectId(str(reminder_id))
+        now = datetime.now()
+        claimed = self.collection.find_one_and_update(
+            {'_id': oid, 'status': STATUS_PENDING, 'recurrence': None},
+            {'$set': {'status': STATUS_SENT, 'fired_at': now}},
+        )
+        if claimed is not None:
+            return claimed
+
+        reminder = self.collection.find_one({'_id': oid, 'status': STATUS_PENDING})
+        if reminder is None:
+            return None
+        due = reminder['reminder_time']
+        update, following = advance_occurrence(reminder, now, self.misfire_grace)
+
+        # Compare-and-set on reminder_time so each occurrence is claimed once
+        claimed = self.collection.find_one_and_update(
+            {'_id': oid, 'status': STATUS_PENDING, 'reminder_time': due},
+            {'$set': update},
+        )
+        if claimed is not None:
+            if following is not None:
+                self.schedule({'_id': oid, 'reminder_time': following})
+            else:
+                self.cancel(oid)
+        return claimed
+
+    def stats(self) -> dict:
+        return {**self.timers.stats(), 'loaded_until': self._loaded_until.isoformat() if self._loaded_until else None}
+
+    def _on_due(self, reminder_id):
+        try:
+            self.fire(reminder_id)
+        except Exception:
+            log.exception('reminder.fire_failed', reminder_id=reminder_id)
@@ -0,0 +1,106 @@
+"""
+Query helpers for the reminders collection.
+
+Owner-scoped, time-windowed keyset pagination on (reminder_time, _id) and
+the indexes those queries rely on.
+"""
+
+import base64
+from datetime import datetime
+
+from bson.objectid import ObjectId
+
+# pymongo.ASCENDING; pymongo itself is imported only when MongoDB is used
+ASCENDING = 1
+
+REMINDER_PROJECTION = {"_id": 1, "medicine_name": 1, "reminder_time": 1, "phone": 1, "email": 1, "owner": 1,
+                       "recurrence": 1}
+
+# Selects reminders with no owner (missing or null), e.g. from before owners existed
+NO_OWNER = object()
+
+# Indexes backing list_reminders() and the reminder audio route; created at startup
+REMINDER_INDEXES = [
+    [("owner", ASCENDING), ("reminder_time", ASCENDING), ("_id", ASCENDING)],
+    [("reminder_time", ASCENDING), ("_id", ASCENDING)],
+    [("audio_key", ASCENDING)],  # re-rendering a spoken clip from its reminder
+]
+
+
+def ensure_reminder_indexes(collection):
+    for keys in REMINDER_INDEXES:
+        collection.create_index(keys)
+
+
+def encode_cursor(reminder_time: datetime, reminder_id) -> str:
+    raw = f"{reminder_time.isoformat()}|{reminder_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Returns (reminder_time, ObjectId) from a cursor made by encode_cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        time_part, id_part = base64.urlsafe_b64decode(padded.encode()).decode().split('|', 1)
+        return datetime.fromisoformat(time_part), ObjectId(id_part)
+    except Exception as exc:
+        raise ValueError(f"Invalid cursor: {cursor}") from exc
+
+
+def build_reminder_query(owner=None, start=None, end=None, after=None) -> dict:
+    """
+    Builds the filter for one page.
+
+    after is the (reminder_time, _id) of the last reminder already returned.
+    """
+    query = {}
+    if owner is NO_OWNER:
+        query['owner'] = None  # matches a missing field too
+    elif owner:
+        query['owner'] = owner
+
+    time_range = {}
+    if start is not None:
+        time_range['$gte'] = start
+    if end is not None:
+        time_range['$lt'] = end
+    if time_range:
+        query['reminder_time'] = time_range
+
+    if after is not None:
+        after_time, after_id = after
+        keyset = {'$or': [
+            {'reminder_time': {'$gt': after_time}},
+            {'reminder_time': after_time, '_id': {'$gt': after_id}},
+        ]}
+        query = {'$and': [query, keyset]} if query else keyset
+    return query
+
+
+def assign_owner(collection, owner: str, phone: str = None, email: str = None) -> int:
+    """Gives reminders without an owner to owner, optionally only those for one phone or email."""
+    query = {'owner': None}
+    if phone:
+        query['phone'] = phone
+    if email:
+        query['email'] = email
+    return collection.update_many(query, {'$set': {'owner': owner}}).modified_count
+
+
+def find_reminders_page(collection, owner=None, start=None, end=None, after=None, limit=50):
+    """Returns a cursor over at most limit + 1 reminders, in (reminder_time, _id) order."""
+    query = build_reminder_query(owner, start, end, after)
+    return (collection.find(query, REMINDER_PROJECTION)
+            .sort([("reminder_time", ASCENDING), ("_id", ASCENDING)])
+            .limit(limit + 1))
+
+
+def serialize_reminder(reminder: dict) -> dict:
+    out = dict(reminder)
+    out['_id'] = str(out['_id'])
+    when = out.get('reminder_time')
+    out['reminder_time'] = when.isoformat() if isinstance(when, datetime) else str(when)
+    for key, value in out.items():
+        if isinstance(value, datetime):
+            out[key] = value.isoformat()
+    return out
@@ -0,0 +1,269 @@
+"""
+Multi-worker reminder firing for running several app replicas.
+
+Instead of in-memory timers, each worker polls db.reminders for due
+reminders and leases them in batches (lease_owner / lease_token /
+lease_until), so a reminder is handled by one worker at a time.
+
+- Sharding: reminders are spread over SHARD_COUNT virtual shards. A worker
+  can be pinned to its share with worker_index/worker_count, so workers do
+  not compete for the same rows. A due reminder that nobody has leased
+  takeover_after seconds past its time (its worker is down or was never
+  started) is leased by whichever worker sees it first, whatever its shard.
+- At-least-once delivery: a lease is released only after the reminder is
+  delivered. The lease of a crashed worker expires, and the reminder is
+  then past takeover_after, so another worker picks it up within the
+  misfire grace window.
+- Idempotency: each occurrence has a delivery id
+  ("<reminder id>:<occurrence>") recorded in db.reminder_deliveries, so an
+  occurrence that went out just before its lease lapsed is not sent again.
+- Leader election: one worker at a time holds a lease in
+  db.scheduler_leases and runs the missed-reminder sweep.
+"""
+
+import os
+import random
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from reminder_scheduler import STATUS_PENDING, advance_occurrence, mark_missed_reminders
+from reminder_store import ASCENDING
+from logs import get_logger
+
+log = get_logger('reminder_workers')
+
+SHARD_COUNT = 64
+LEADER_LEASE_ID = 'reminder-leader'
+
+
+def assign_shard(reminder: dict) -> dict:
+    reminder['shard'] = random.randrange(SHARD_COUNT)
+    return reminder
+
+
+def shards_for(worker_index: int, worker_count: int):
+    """The virtual shards owned by one worker, or None when a single worker owns all of them."""
+    if worker_count <= 1:
+        return None
+    if not 0 <= worker_index < worker_count:
+        raise ValueError(f"worker_index must be between 0 and {worker_count - 1}")
+    return [shard for shard in range(SHARD_COUNT) if shard % worker_count == worker_index]
+
+
+def delivery_id_for(reminder: dict) -> str:
+    return f"{reminder['_id']}:{reminder.get('occurrence') or 0}"
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaderLease:
+    """A renewable lease held by at most one owner at a time."""
+
+    def __init__(self, collection, name: str, owner: str, ttl: float = 30):
+        self.collection = collection
+        self.name = name
+        self.owner = owner
+        self.ttl = timedelta(seconds=ttl)
+
+    def acquire(self, now: datetime = None) -> bool:
+        """Takes or renews the lease; returns False while someone else holds it."""
+        from pymongo.errors import DuplicateKeyError
+
+        now = now or datetime.now()
+        try:
+            self.collection.find_one_and_update(
+                {'_id': self.name, '$or': [{'owner': self.owner}, {'expires_at': {'$lt': now}}]},
+                {'$set': {'owner': self.owner, 'expires_at': now + self.ttl}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def release(self):
+        self.collection.delete_one({'_id': self.name, 'owner': self.owner})
+
+
+class ReminderLeaseWorker:
+    def __init__(self, collection, deliveries, leases, deliver, worker_id: str = None,
+                 worker_index: int = 0, worker_count: int = 1, lease_seconds: float = 60,
+                 batch_size: int = 100, poll_interval: float = 1.0, misfire_grace: float = 300,
+                 sweep_interval: float = 60, delivery_ttl: float = 7 * 86400, takeover_after: float = 30):
+        """
+        deliver(reminder, delivery_id) sends one due occurrence; if it raises,
+        the reminder stays leased and is retried once the lease expires.
+        takeover_after is capped at half of misfire_grace, so a reminder from
+        another worker's shard is taken over before the sweep marks it missed.
+        """
+        self.collection = collection
+        self.deliveries = deliveries
+        self.deliver = deliver
+        self.worker_id = worker_id or default_worker_id()
+        self.shards = shards_for(worker_index, worker_count)
+        self.lease = timedelta(seconds=lease_seconds)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.misfire_grace = timedelta(seconds=misfire_grace)
+        self.takeover_after = timedelta(seconds=min(takeover_after, misfire_grace / 2))
+        self.sweep_interval = sweep_interval
+        self.delivery_ttl = delivery_ttl
+        self.leader = LeaderLease(leases, LEADER_LEASE_ID, self.worker_id, ttl=max(sweep_interval * 2, 30))
+
+        self._stopping = threading.Event()
+        self._thread = None
+        self._last_sweep = None
+        self.fired = 0
+        self.taken_over = 0
+        self.duplicates_skipped = 0
+        self.failed = 0
+
+    def ensure_indexes(self):
+        from pymongo import UpdateOne
+
+        self.collection.create_index([("status", ASCENDING), ("shard", ASCENDING), ("reminder_time", ASCENDING)])
+        self.deliveries.create_index("delivered_at", expireAfterSeconds=int(self.delivery_ttl))
+        # Reminders created before sharding get a shard once
+        missing = [r['_id'] for r in self.collection.find({'shard': {'$exists': False}}, {'_id': 1})]
+        if missing:
+            self.collection.bulk_write(
+                [UpdateOne({'_id': rid}, {'$set': {'shard': random.randrange(SHARD_COUNT)}}) for rid in missing],
+                ordered=False,
+            )
+            log.info('reminder.shards_assigned', count=len(missing))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='reminder-lease-worker', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.leader.release()
+
+    def stats(self) -> dict:
+        return {
+            'mode': 'lease',
+            'worker_id': self.worker_id,
+            'shards': len(self.shards) if self.shards is not None else SHARD_COUNT,
+            'fired': self.fired,
+            'taken_over': self.taken_over,
+            'duplicates_skipped': self.duplicates_skipped,
+            'failed': self.failed,
+        }
+
+    # ------------------------------------------
+    # Polling
+    # ------------------------------------------
+    def poll_once(self, now: datetime = None) -> int:
+        """Leases one batch of due reminders and delivers it; returns the batch size."""
+        now = now or datetime.now()
+        token, batch = self.lease_batch(now)
+        if not batch:
+            return 0
+
+        delivery_ids = {reminder['_id']: delivery_id_for(reminder) for reminder in batch}
+        already_sent = {
+            d['_id'] for d in self.deliveries.find({'_id': {'$in': list(delivery_ids.values())}}, {'_id': 1})
+        }
+
+        delivered, completed = [], []
+        for reminder in batch:
+            delivery_id = delivery_ids[reminder['_id']]
+            if delivery_id in already_sent:
+                self.duplicates_skipped += 1
+            else:
+                try:
+                    self.deliver(reminder, delivery_id)
+                except Exception:
+                    self.failed += 1
+                    log.exception('reminder.deliver_failed', reminder_id=reminder['_id'])
+                    continue  # lease expires and another attempt is made
+                delivered.append(delivery_id)
+            completed.append(reminder)
+
+        if delivered:
+            from pymongo import UpdateOne
+
+            self.deliveries.bulk_write([
+                UpdateOne({'_id': delivery_id},
+                          {'$setOnInsert': {'worker': self.worker_id, 'delivered_at': datetime.now()}},
+                          upsert=True)
+                for delivery_id in delivered
+            ], ordered=False)
+        if completed:
+            self.collection.bulk_write([self._complete(reminder, token, now) for reminder in completed],
+                                       ordered=False)
+        self.fired += len(delivered)
+        return len(batch)
+
+    def lease_batch(self, now: datetime):
+        """Returns (lease token, reminders leased to this worker)."""
+        lease_free = {'$or': [{'lease_until': None}, {'lease_until': {'$lt': now}}]}
+        query = {
+            'status': STATUS_PENDING,
+            'reminder_time': {'$gte': now - self.misfire_grace, '$lte': now},
+            **lease_free,
+        }
+        if self.shards is not None:
+            # Other shards too once their reminders are overdue: their worker is not running
+            query = {'$and': [query, {'$or': [{'shard': {'$in': self.shards}},
+                                              {'reminder_time': {'$lte': now - self.takeover_after}}]}]}
+        found = list(self.collection.find(query, {'_id': 1, 'shard': 1})
+                     .sort('reminder_time', ASCENDING).limit(self.batch_size))
+        if not found:
+            return None, []
+        ids = [r['_id'] for r in found]
+        if self.shards is not None:
+            foreign = sum(1 for r in found if r.get('shard') not in self.shards)
+            if foreign:
+                self.taken_over += foreign
+                log.warning('reminder.taken_over', worker_id=self.worker_id, count=foreign)
+
+        token = uuid.uuid4().hex
+        self.collection.update_many(
+            {'_id': {'$in': ids}, 'status': STATUS_PENDING, **lease_free},
+            {'$set': {'lease_owner': self.worker_id, 'lease_token': token, 'lease_until': now + self.lease}},
+        )
+        return token, list(self.collection.find({'_id': {'$in': ids}, 'lease_token': token}))
+
+    def sweep(self, now: datetime = None) -> int:
+        """Runs the missed-reminder sweep if this worker is the leader."""
+        now = now or datetime.now()
+        if not self.leader.acquire(now):
+            return 0
+        missed = mark_missed_reminders(self.collection, now - self.misfire_grace)
+        if missed:
+            log.warning('reminder.missed', count=missed)
+        return missed
+
+    def _complete(self, reminder, token, now):
+        from pymongo import UpdateOne
+
+        update, _ = advance_occurrence(reminder, now, self.misfire_grace)
+        return UpdateOne(
+            {'_id': reminder['_id'], 'lease_token': token, 'reminder_time': reminder['reminder_time']},
+            {'$set': update, '$unset': {'lease_owner': '', 'lease_token': '', 'lease_until': ''}},
+        )
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                now = datetime.now()
+                if self._last_sweep is None or (now - self._last_sweep).total_seconds() >= self.sweep_interval:
+                    self._last_sweep = now
+                    self.sweep(now)
+                leased = self.poll_once(now)
+            except Exception:
+                log.exception('reminder.worker_error', worker_id=self.worker_id)
+                leased = 0
+            if leased < self.batch_size:
+                self._stopping.wait(self.poll_interval)
@@ -0,0 +1,232 @@
+"""
+Response cache for first-turn chat questions.
+
+Two tiers: an exact match on the normalized question and, when enabled
+(near=True, off by default), a near-duplicate match using MinHash
+signatures over character shingles with LSH banding. A near match is
+accepted only above a similarity threshold and only when both questions
+carry the same guard tokens (numbers, negations, and qualifiers such as
+ages, pregnancy or units), since "500 mg" vs "50 mg" or "pregnant" vs
+"not pregnant" need different answers however similar the text is.
+Entries expire after a TTL and the cache is bounded by entry count (LRU).
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from logs import get_logger
+
+log = get_logger('response_cache')
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+_MERSENNE_PRIME = (1 << 61) - 1
+# Words that never change the meaning of a question
+_FILLER_WORDS = frozenset({'a', 'an', 'the', 'please', 'pls', 'hi', 'hello', 'hey'})
+# Words that change which answer is right; a near match must have the same ones
+_NEGATIONS = frozenset({'no', 'not', 'never', 'without', 'none', 'nor', 'cannot', 'cant', 'dont', 'doesnt',
+                        'isnt', 'arent', 'wasnt', 'wont', 'shouldnt', 'didnt', 't', 'non', 'avoid', 'stop'})
+_QUALIFIERS = frozenset({
+    'pregnant', 'pregnancy', 'breastfeeding', 'nursing', 'baby', 'babies', 'infant', 'toddler', 'child',
+    'children', 'kid', 'kids', 'teen', 'teenager', 'adult', 'adults', 'elderly', 'old', 'young', 'male',
+    'female', 'man', 'woman', 'men', 'women', 'boy', 'girl', 'mg', 'mcg', 'g', 'kg', 'ml', 'l', 'lb', 'lbs',
+    'iu', 'tablet', 'tablets', 'pill', 'pills', 'dose', 'doses', 'hour', 'hours', 'day', 'days', 'week',
+    'weeks', 'month', 'months', 'year', 'years', 'daily', 'twice', 'once', 'overdose', 'allergic', 'allergy',
+    'diabetic', 'diabetes', 'kidney', 'liver', 'heart', 'blood', 'pressure', 'alcohol', 'before', 'after',
+    'with', 'more', 'less', 'maximum', 'max', 'minimum', 'min', 'high', 'low',
+})
+_DIGIT = re.compile(r"\d")
+
+
+def normalize_question(text: str) -> str:
+    text = _PUNCTUATION.sub(' ', (text or '').lower())
+    return ' '.join(w for w in _WHITESPACE.split(text) if w and w not in _FILLER_WORDS)
+
+
+def guard_tokens(normalized: str) -> tuple:
+    """The tokens of a normalized question that a near-duplicate must share exactly."""
+    return tuple(w for w in normalized.split()
+                 if w in _NEGATIONS or w in _QUALIFIERS or _DIGIT.search(w))
+
+
+class MinHasher:
+    """MinHash signatures over character shingles of a normalized string."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 4, seed: int = 7):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        params = []
+        for i in range(num_perm):
+            digest = hashlib.sha256(f"{seed}:{i}".encode()).digest()
+            a = int.from_bytes(digest[:8], 'big') % _MERSENNE_PRIME or 1
+            b = int.from_bytes(digest[8:16], 'big') % _MERSENNE_PRIME
+            params.append((a, b))
+        self._params = params
+
+    def shingles(self, text: str) -> set:
+        k = self.shingle_size
+        if len(text) <= k:
+            return {zlib.crc32(text.encode())}
+        return {zlib.crc32(text[i:i + k].encode()) for i in range(len(text) - k + 1)}
+
+    def signature(self, text: str) -> tuple:
+        hashes = self.shingles(text)
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+            for a, b in self._params
+        )
+
+    @staticmethod
+    def similarity(sig_a: tuple, sig_b: tuple) -> float:
+        same = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+        return same / len(sig_a)
+
+
+class ResponseCache:
+    def __init__(self, ttl: float = 86400, max_entries: int = 5000, near: bool = False, threshold: float = 0.95,
+                 num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.near = near
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm=num_perm)
+
+        self._entries = OrderedDict()  # key -> (response, expires_at, signature, guard tokens)
+        self._buckets = {}             # (band, band hash) -> set of keys
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.guard_rejects = 0
+
+    def get(self, question: str):
+        """Returns a cached response for question or a near-duplicate of it, else None."""
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        key = self._key(normalized)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.exact_hits += 1
+                    return entry[0]
+                self._remove(key)
+                self.expired += 1
+            if not self.near:
+                self.misses += 1
+                return None
+
+        signature = self.hasher.signature(normalized)
+        guard = guard_tokens(normalized)
+        with self._lock:
+            best_key, best_score = None, 0.0
+            for candidate in self._candidates(signature):
+                entry = self._entries.get(candidate)
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    self._remove(candidate)
+                    self.expired += 1
+                    continue
+                score = MinHasher.similarity(signature, entry[2])
+                if score >= self.threshold and entry[3] != guard:
+                    self.guard_rejects += 1
+                    continue
+                if score > best_score:
+                    best_key, best_score = candidate, score
+            if best_key is not None and best_score >= self.threshold:
+                self._entries.move_to_end(best_key)
+                self.near_hits += 1
+                return self._entries[best_key][0]
+            self.misses += 1
+        return None
+
+    def put(self, question: str, response: str):
+        normalized = normalize_question(question)
+        if not normalized or not response:
+            return
+        key = self._key(normalized)
+        signature = self.hasher.signature(normalized) if self.near else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (response, time.time() + self.ttl, signature, guard_tokens(normalized))
+            if signature is not None:
+                for band_key in self._band_keys(signature):
+                    self._buckets.setdefault(band_key, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.exact_hits + self.near_hits
+            lookups = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'exact_hits': self.exact_hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'guard_rejects': self.guard_rejects,
+                'hit_ratio': (hits / lookups) if lookups else 0.0,
+            }
+
+    def _key(self, normalized: str) -> str:
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+    def _band_keys(self, signature: tuple):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, hash(signature[start:start + self.rows])
+
+    def _candidates(self, signature: tuple) -> set:
+        found = set()
+        for band_key in self._band_keys(signature):
+            found.update(self._buckets.get(band_key, ()))
+        return found
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None or entry[2] is None:
+            return
+        for band_key in self._band_keys(entry[2]):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+
+def response_cache_from_env():
+    """Builds the response cache when RESPONSE_CACHE is enabled, else returns None."""
+    if os.environ.get("RESPONSE_CACHE", "false").lower() not in ("1", "true", "yes"):
+        return None
+    cache = ResponseCache(
+        ttl=float(os.environ.get("RESPONSE_CACHE_TTL", "86400")),
+        max_entries=int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "5000")),
+        # Near-duplicate answers are opt-in: a similar question is not always the same question
+        near=os.environ.get("RESPONSE_CACHE_NEAR", "false").lower() in ("1", "true", "yes"),
+        threshold=float(os.environ.get("RESPONSE_CACHE_SIMILARITY", "0.95")),
+    )
+    log.info('response_cache.enabled')
+    return cache
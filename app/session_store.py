@@ -0,0 +1,428 @@
+"""
+Bounded chat-session store for the Health Assistant.
+
+Keeps Gemini chat sessions in an LRU with idle-TTL eviction, caps on the
+number of sessions, total history size and per-session history length, and
+optionally persists trimmed histories to SQLite or Redis so a restarted
+worker can pick a conversation back up. With a HistoryCompactor (see
+chat_history.py) long histories are summarized in the background instead
+of being cut off.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from logs import get_logger
+
+log = get_logger('sessions')
+
+
+# ==========================================
+# HISTORY HELPERS
+# ==========================================
+def _content_to_dict(content) -> dict:
+    """Converts a Gemini Content (or plain dict) into a JSON-safe dict."""
+    if isinstance(content, dict):
+        parts = content.get('parts') or []
+        return {
+            'role': content.get('role', 'user'),
+            'parts': [p if isinstance(p, str) else p.get('text', '') for p in parts],
+        }
+    return {
+        'role': content.role or 'model',
+        'parts': [p.text for p in content.parts if getattr(p, 'text', None)],
+    }
+
+
+def history_to_dicts(history) -> list:
+    return [_content_to_dict(c) for c in history]
+
+
+def history_size(history) -> int:
+    """Rough size in bytes of a history: text length plus per-message overhead."""
+    total = 0
+    for item in history_to_dicts(history):
+        total += 64 + sum(len(p.encode('utf-8')) for p in item['parts'])
+    return total
+
+
+def trim_history(history, max_messages: int) -> list:
+    """Keeps the newest max_messages entries, starting on a user turn."""
+    history = list(history)
+    if max_messages <= 0 or len(history) <= max_messages:
+        return history
+    trimmed = history[-max_messages:]
+    while trimmed and _content_to_dict(trimmed[0])['role'] != 'user':
+        trimmed = trimmed[1:]
+    return trimmed
+
+
+# ==========================================
+# PERSISTENCE BACKENDS
+# ==========================================
+class SQLiteSessionBackend:
+    """Stores trimmed session histories in a local SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_sessions ("
+            "session_id TEXT PRIMARY KEY, history TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chat_sessions_updated_at ON chat_sessions (updated_at)")
+        self._conn.commit()
+
+    def load(self, session_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT history FROM chat_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id: str, history: list):
+        payload = json.dumps(history)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_sessions (session_id, history, updated_at) VALUES (?, ?, ?)",
+                (session_id, payload, time.time()),
+            )
+            self._conn.commit()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def purge_older_than(self, max_age: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM chat_sessions WHERE updated_at < ?", (time.time() - max_age,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+
+class RedisSessionBackend:
+    """Stores trimmed session histories in Redis (or any Redis-compatible server)."""
+
+    def __init__(self, url: str, ttl: int = 0, prefix: str = 'healthmate:chat:'):
+        import redis  # optional dependency, only needed for this backend
+
+        self._redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def load(self, session_id: str):
+        raw = self._redis.get(self.prefix + session_id)
+        return json.loads(raw) if raw else None
+
+    def save(self, session_id: str, history: list):
+        self._redis.set(self.prefix + session_id, json.dumps(history), ex=self.ttl or None)
+
+    def delete(self, session_id: str):
+        self._redis.delete(self.prefix + session_id)
+
+
+def make_backend(url: str, ttl: int = 0):
+    """Builds a backend from a URL: sqlite:///path/to/file.db or redis://host:port/db."""
+    url = (url or '').strip()
+    if not url:
+        return None
+    if url.startswith('sqlite:///'):
+        return SQLiteSessionBackend(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisSessionBackend(url, ttl=ttl)
+    raise ValueError(f"Unsupported chat session backend: {url}")
+
+
+# ==========================================
+# SESSION STORE
+# ==========================================
+class SessionStore:
+    """
+    LRU + idle-TTL store of chat sessions.
+
+    factory(history) must return a new chat object (e.g. model.start_chat).
+    compactor replaces the max_history cut-off with summarization.
+    Persisted histories idle for longer than idle_ttl are purged from the
+    backend too, at most every purge_interval seconds.
+    """
+
+    def __init__(self, factory, max_sessions: int = 1000, idle_ttl: float = 1800,
+                 max_history: int = 40, max_bytes: int = 64 * 1024 * 1024, backend=None,
+                 compactor=None, purge_interval: float = 60):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_history = max_history
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.compactor = compactor
+        self.purge_interval = purge_interval
+
+        self._sessions = OrderedDict()  # session_id -> [chat, last_access, size]
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.restored = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.compactions = 0
+        self.compaction_failures = 0
+        self.purged = 0
+        self._next_purge = time.monotonic() + purge_interval
+
+        self._compact_queue = queue.Queue()
+        self._compact_pending = set()
+        self._compact_thread = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def get_or_create(self, session_id: str):
+        """Returns the chat for session_id, restoring or creating it on a miss."""
+        self._purge_backend()
+        with self._lock:
+            now = time.monotonic()
+            self._expire_idle(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self.hits += 1
+                entry[1] = now
+                self._sessions.move_to_end(session_id)
+                return entry[0]
+
+            self.misses += 1
+            history = []
+            if self.backend is not None:
+                try:
+                    history = self.backend.load(session_id) or []
+                    if history:
+                        self.restored += 1
+                except Exception as e:
+                    log.error('session.load_failed', error=str(e))
+                    history = []
+
+            history = self._trim(history)
+            chat = self.factory(history)
+            size = history_size(history)
+            self._sessions[session_id] = [chat, now, size]
+            self._total_bytes += size
+            self._enforce_limits(keep=session_id)
+            if self.compactor is not None and history and self.compactor.needs_compaction(history):
+                self._schedule_compaction(session_id)
+            return chat
+
+    def save(self, session_id: str, chat=None):
+        """Trims the session history after a turn and persists it to the backend."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                if chat is None:
+                    return
+                entry = [chat, time.monotonic(), 0]
+                self._sessions[session_id] = entry
+            chat = entry[0]
+
+            history = self._trim(chat.history)
+            if len(history) != len(chat.history):
+                chat.history = history
+            if self.compactor is not None and self.compactor.needs_compaction(history):
+                self._schedule_compaction(session_id)
+
+            size = history_size(history)
+            self._total_bytes += size - entry[2]
+            entry[1] = time.monotonic()
+            entry[2] = size
+            self._sessions.move_to_end(session_id)
+            self._enforce_limits(keep=session_id)
+
+        if self.backend is not None:
+            try:
+                self.backend.save(session_id, history_to_dicts(history))
+            except Exception as e:
+                log.error('session.save_failed', error=str(e))
+
+    def drop(self, session_id: str):
+        """Removes a session from memory and from the backend."""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is not None:
+                self._total_bytes -= entry[2]
+        if self.backend is not None:
+            try:
+                self.backend.delete(session_id)
+            except Exception as e:
+                log.error('session.delete_failed', error=str(e))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'sessions': len(self._sessions),
+                'bytes': self._total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits / lookups) if lookups else 0.0,
+                'restored': self.restored,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'compactions': self.compactions,
+                'compaction_failures': self.compaction_failures,
+                'compactions_pending': len(self._compact_pending),
+                'purged': self.purged,
+            }
+
+    # ------------------------------------------
+    # Compaction
+    # ------------------------------------------
+    def _trim(self, history) -> list:
+        """Synchronous cut-off: max_history without a compactor, else only past its hard limit."""
+        if self.compactor is None:
+            return trim_history(history, self.max_history)
+        if self.compactor.summarize is None:
+            limit_hit = self.compactor.needs_compaction(history)
+        else:
+            limit_hit = self.compactor.over_hard_limit(history)
+        return self.compactor.compact(history, summarize=False) if limit_hit else history
+
+    def _schedule_compaction(self, session_id):
+        if self.compactor.summarize is None or session_id in self._compact_pending:
+            return
+        self._compact_pending.add(session_id)
+        if self._compact_thread is None:
+            self._compact_thread = threading.Thread(target=self._compact_worker, name='history-compactor',
+                                                    daemon=True)
+            self._compact_thread.start()
+        self._compact_queue.put(session_id)
+
+    def _compact_worker(self):
+        while True:
+            session_id = self._compact_queue.get()
+            try:
+                self.compact(session_id)
+            finally:
+                with self._lock:
+                    self._compact_pending.discard(session_id)
+
+    def compact(self, session_id: str) -> bool:
+        """
+        Summarizes a session's older turns. The summary call runs outside
+        the lock; turns added meanwhile are kept.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return False
+            snapshot = list(entry[0].history)
+        try:
+            compacted = self.compactor.compact(snapshot)
+        except Exception as e:
+            with self._lock:
+                self.compaction_failures += 1
+            log.error('session.compaction_failed', error=str(e))
+            return False
+        if compacted is snapshot:
+            return False
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return False
+            current = list(entry[0].history)
+            # Applies only if the summarized turns are still the head of the history
+            if len(current) < len(snapshot) or \
+                    history_to_dicts(current[:len(snapshot)]) != history_to_dicts(snapshot):
+                return False
+            history = compacted + current[len(snapshot):]
+            entry[0].history = history
+            size = history_size(history)
+            self._total_bytes += size - entry[2]
+            entry[2] = size
+            self.compactions += 1
+        log.info('session.compacted', messages_before=len(current), messages_after=len(history))
+        if self.backend is not None:
+            try:
+                self.backend.save(session_id, history_to_dicts(history))
+            except Exception as e:
+                log.error('session.save_failed', error=str(e))
+        return True
+
+    def _expire_idle(self, now: float):
+        if self.idle_ttl <= 0:
+            return
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry[1] < self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            self._total_bytes -= entry[2]
+            self.expirations += 1
+
+    def _purge_backend(self):
+        """Deletes persisted histories past idle_ttl; Redis expires its own keys."""
+        purge = getattr(self.backend, 'purge_older_than', None)
+        if purge is None or self.idle_ttl <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_purge:
+                return
+            self._next_purge = now + self.purge_interval
+        try:
+            purged = purge(self.idle_ttl)
+        except Exception as e:
+            log.error('session.purge_failed', error=str(e))
+            return
+        if purged:
+            with self._lock:
+                self.purged += purged
+            log.info('session.purged', sessions=purged)
+
+    def _enforce_limits(self, keep=None):
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes
+        ):
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                if len(self._sessions) == 1:
+                    break
+                self._sessions.move_to_end(session_id)
+                continue
+            entry = self._sessions.pop(session_id)
+            self._total_bytes -= entry[2]
+            self.evictions += 1
+
+
+def session_store_from_env(factory, compactor=None) -> SessionStore:
+    """Builds a SessionStore configured from CHAT_SESSION_* environment variables."""
+    idle_ttl = float(os.environ.get("CHAT_SESSION_IDLE_TTL", "1800"))
+    backend = None
+    backend_url = os.environ.get("CHAT_SESSION_BACKEND")
+    if backend_url:
+        try:
+            backend = make_backend(backend_url, ttl=int(idle_ttl))
+            log.info('session.backend', backend=backend_url.split('://', 1)[0])
+        except Exception as e:
+            log.error('session.backend_failed', error=str(e))
+    return SessionStore(
+        factory,
+        max_sessions=int(os.environ.get("CHAT_SESSION_MAX", "1000")),
+        idle_ttl=idle_ttl,
+        max_history=int(os.environ.get("CHAT_SESSION_MAX_HISTORY", "40")),
+        max_bytes=int(os.environ.get("CHAT_SESSION_MAX_BYTES", str(64 * 1024 * 1024))),
+        backend=backend,
+        compactor=compactor,
+    )
@@ -0,0 +1,137 @@
+"""
+Single-flight deduplication of identical in-flight upstream calls.
+
+When several requests need the same upstream result at the same moment
+(the same sentence to synthesize, the same first question to Gemini, the
+same Places cell), the first one runs the call and the others wait for it
+and share its result, or its exception. Only calls that are in flight at
+the same time are merged; the caches in front of them handle the rest.
+
+A follower waits at most `timeout` seconds and then gets BackendTimeout.
+A flight that has run for longer than that counts as abandoned, and the
+next caller with its key starts a new one.
+"""
+
+import threading
+import time
+
+from backends import BackendTimeout
+
+
+class Flight:
+    """One in-flight call: its leader resolves it, its followers wait on it."""
+
+    __slots__ = ('started', 'followers', 'value', 'error', '_done')
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.followers = 0
+        self.value = None
+        self.error = None
+        self._done = threading.Event()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None):
+        """Returns the leader's result or raises its exception."""
+        if not self._done.wait(timeout):
+            raise BackendTimeout(f"shared call did not finish within {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class SingleFlight:
+    def __init__(self, name: str, timeout: float = 60.0, enabled: bool = True):
+        self.name = name
+        self.timeout = timeout
+        self.enabled = enabled
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def join(self, key):
+        """Returns (flight, True) when the caller should make the call, else (flight, False) to wait on it."""
+        now = time.monotonic()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and now - flight.started <= self.timeout:
+                flight.followers += 1
+                self.shared += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            self.leaders += 1
+            return flight, True
+
+    def finish(self, key, flight: Flight, value=None, error: BaseException = None):
+        """Publishes the leader's result to its followers and retires the flight."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.value = value
+        flight.error = error
+        flight._done.set()
+
+    def do(self, key, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) once for all concurrent callers with the same key."""
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        flight, leader = self.join(key)
+        if not leader:
+            return flight.wait(self.timeout)
+        try:
+            value = fn(*args, **kwargs)
+        except Exception as e:
+            self.finish(key, flight, error=e)
+            raise
+        except BaseException as e:
+            # The leader went away (e.g. a closed stream); let followers retry
+            self.finish(key, flight, error=BackendTimeout(f"shared call abandoned ({type(e).__name__})"))
+            raise
+        self.finish(key, flight, value=value)
+        return value
+
+    def submit(self, key, start):
+        """
+        Shares a started call: start() returns a PendingCall and runs only
+        for the first caller; everyone gets a handle with done()/result().
+        """
+        if not self.enabled:
+            return start()
+        flight, leader = self.join(key)
+        if not leader:
+            return _FollowerCall(flight, self.timeout)
+        try:
+            pending = start()
+        except Exception as e:
+            self.finish(key, flight, error=e)
+            raise
+        # Followers are released when the call finishes, whether or not the leader waits for it
+        pending.add_done_callback(lambda outcome: self._finish_from(key, flight, outcome))
+        return pending
+
+    def _finish_from(self, key, flight: Flight, outcome):
+        try:
+            value = outcome()
+        except Exception as e:
+            self.finish(key, flight, error=e)
+            return
+        self.finish(key, flight, value=value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'in_flight': len(self._flights), 'leaders': self.leaders, 'shared': self.shared}
+
+
+class _FollowerCall:
+    def __init__(self, flight: Flight, timeout: float):
+        self._flight = flight
+        self._timeout = timeout
+
+    def done(self) -> bool:
+        return self._flight.done()
+
+    def result(self, timeout: float = None):
+        return self._flight.wait(self._timeout if timeout is None else timeout)
@@ -0,0 +1,149 @@
+"""
+Message queue setup for Socket.IO emits across processes.
+
+With SOCKETIO_MESSAGE_QUEUE set, an emit from any process (a web worker, a
+reminder worker) reaches clients connected to every other process:
+
+- redis://, amqp://, kafka:// and zmq URLs use python-socketio's own
+  queue managers
+- local://host:port uses LocalQueueManager, a stand-in for machines
+  without Redis. One process runs LocalQueueBroker (set
+  SOCKETIO_QUEUE_BROKER=true, or run `python socket_queue.py`), which
+  relays newline-delimited JSON messages to every subscribed process.
+"""
+
+import argparse
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+
+import socketio
+
+DEFAULT_LOCAL_QUEUE = 'local://127.0.0.1:5055'
+
+
+def _address(url: str):
+    parsed = urlparse(url)
+    return parsed.hostname or '127.0.0.1', parsed.port or 5055
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        role = self.rfile.readline().strip()
+        if role == b'SUB':
+            # Held open until a send to this subscriber fails
+            self.server.subscribe(self.connection).wait()
+            return
+        for line in self.rfile:
+            self.server.relay(line)
+
+
+class LocalQueueBroker(socketserver.ThreadingTCPServer):
+    """Relays every published line to every subscriber."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, send_timeout: float = 5):
+        super().__init__(address, _BrokerHandler)
+        self.send_timeout = send_timeout
+        # connection -> (Event set when it is dropped, lock held while a line is sent to it)
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, conn) -> threading.Event:
+        conn.settimeout(self.send_timeout)
+        dropped = threading.Event()
+        with self._lock:
+            self._subscribers[conn] = (dropped, threading.Lock())
+        return dropped
+
+    def unsubscribe(self, conn):
+        with self._lock:
+            entry = self._subscribers.pop(conn, None)
+        if entry is not None:
+            entry[0].set()
+
+    def relay(self, line: bytes):
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for conn, (_, send_lock) in subscribers:
+            try:
+                # Publishers relay from their own handler threads; one line at a time per subscriber
+                with send_lock:
+                    conn.sendall(line)
+            except OSError:
+                # A subscriber that cannot keep up is dropped; it reconnects
+                self.unsubscribe(conn)
+                try:
+                    conn.close()
+                except OSError:
+                    pass
+
+
+def start_local_broker(url: str = DEFAULT_LOCAL_QUEUE) -> LocalQueueBroker:
+    broker = LocalQueueBroker(_address(url))
+    threading.Thread(target=broker.serve_forever, name='socketio-queue-broker', daemon=True).start()
+    return broker
+
+
+class LocalQueueManager(socketio.PubSubManager):
+    """python-socketio client manager that publishes through a LocalQueueBroker."""
+
+    name = 'local'
+
+    def __init__(self, url: str = DEFAULT_LOCAL_QUEUE, channel: str = 'flask-socketio',
+                 write_only: bool = False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.address = _address(url)
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+
+    def _publish(self, data):
+        line = (self.json.dumps({'channel': self.channel, 'data': data}) + '\n').encode()
+        with self._publish_lock:
+            for _ in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = socket.create_connection(self.address, timeout=5)
+                        self._publisher.sendall(b'PUB\n')
+                    self._publisher.sendall(line)
+                    return
+                except OSError as e:
+                    error = e
+                    if self._publisher is not None:
+                        self._publisher.close()
+                    self._publisher = None
+        self._get_logger().error(f'Cannot publish to the local message queue: {error}')
+
+    def _listen(self):
+        while True:
+            try:
+                with socket.create_connection(self.address) as conn:
+                    conn.sendall(b'SUB\n')
+                    for line in conn.makefile('rb'):
+                        message = self.json.loads(line)
+                        if message.get('channel') == self.channel:
+                            yield message['data']
+            except (OSError, ValueError) as e:
+                self._get_logger().error(f'Local message queue connection lost: {e}')
+            time.sleep(1)
+
+
+def socketio_queue_options(url: str = None, write_only: bool = False) -> dict:
+    """Returns the SocketIO() keyword arguments for a message queue URL."""
+    if not url:
+        return {}
+    if url.startswith('local://'):
+        return {'client_manager': LocalQueueManager(url, write_only=write_only)}
+    return {'message_queue': url}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the local Socket.IO message queue broker.')
+    parser.add_argument('--url', default=DEFAULT_LOCAL_QUEUE)
+    args = parser.parse_args()
+    print(f"✓ Socket.IO queue broker listening on {args.url}")
+    LocalQueueBroker(_address(args.url)).serve_forever()
@@ -30,6 +30,13 @@ document.addEventListener('DOMContentLoaded', () => {
 
     let socket; 
 
+    // Stable per-browser id so the reminders list only shows this user's reminders
+    let ownerId = localStorage.getItem('healthmate_owner_id');
+    if (!ownerId) {
+        ownerId = 'owner_' + Date.now() + '_' + Math.random().toString(36).slice(2, 10);
+        localStorage.setItem('healthmate_owner_id', ownerId);
+    }
+
     // Request notification permission on page load
     if ('Notification' in window) {
         Notification.requestPermission();
@@ -53,9 +60,16 @@ document.addEventListener('DOMContentLoaded', () => {
     window.addEventListener('click', armAudio);
     window.addEventListener('keydown', armAudio);
 
-    function playAlarmAndNotify(reminder) {
+    function playAlarmAndNotify(reminder, audioUrl) {
         console.log("Playing alarm and showing notification for reminder:", reminder);
         if (alarmSound) {
+            if (audioUrl) {
+                // Speak the pre-rendered reminder once the alarm has played
+                alarmSound.onended = () => {
+                    alarmSound.onended = null;
+                    new Audio(audioUrl).play().catch(e => console.error("Error playing reminder audio:", e));
+                };
+            }
             alarmSound.play().catch(e => console.error("Error playing alarm sound:", e));
         }
 
@@ -87,6 +101,10 @@ document.addEventListener('DOMContentLoaded', () => {
     // function showAlert(message, type = 'success') { ... }
     
     function formatTime(time) {
+        // Accepts "HH:MM" or an ISO datetime like "2024-05-01T08:30:00"
+        if (time.includes('T')) {
+            time = time.split('T')[1];
+        }
         const [hours, minutes] = time.split(':');
         const hour = parseInt(hours);
         const ampm = hour >= 12 ? 'PM' : 'AM';
@@ -96,7 +114,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     async function loadReminders() {
         try {
-            const response = await fetch('/api/reminders');
+            const response = await fetch('/api/reminders?owner=' + encodeURIComponent(ownerId));
             const data = await response.json();
             
             if (data.success && data.reminders.length > 0) {
@@ -138,9 +156,9 @@ document.addEventListener('DOMContentLoaded', () => {
         reminderCard.innerHTML = `
             <div class="reminder-info">
                 <h3>${reminder.medicine_name}</h3>
-                <div class="reminder-time">⏰ ${formatTime(reminder.reminder_time)}</div>
+                <div class="reminder-time">⏰ ${formatTime(reminder.reminder_time)}${reminder.recurrence ? ' 🔁' : ''}</div>
             </div>
-            <button class="btn btn-danger" onclick="deleteReminder(${reminder.id})">Delete</button>
+            <button class="btn btn-danger" onclick="deleteReminder('${reminder._id}')">Delete</button>
         `;
         remindersContainer.appendChild(reminderCard);
     }
@@ -150,6 +168,8 @@ document.addEventListener('DOMContentLoaded', () => {
         
         const medicineName = document.getElementById('medicine-name').value;
         const reminderTime = document.getElementById('reminder-time').value;
+        const repeatSelect = document.getElementById('reminder-repeat');
+        const recurrence = repeatSelect ? repeatSelect.value : '';
 
         try {
             const response = await fetch('/api/reminders', {
@@ -159,7 +179,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 },
                 body: JSON.stringify({
                     medicine_name: medicineName,
-                    reminder_time: reminderTime
+                    reminder_time: reminderTime,
+                    recurrence: recurrence,
+                    owner: ownerId
                 }),
             });
 
@@ -256,8 +278,9 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    // Initialize Socket.IO connection
-    socket = io();
+    // Initialize Socket.IO connection; the server puts us in our owner's room
+    socket = io({ auth: { owner: ownerId } });
+    const seenDeliveries = new Set();
 
     socket.on('connect', () => {
         console.log('Connected to Socket.IO');
@@ -269,7 +292,11 @@ document.addEventListener('DOMContentLoaded', () => {
 
     socket.on('reminder_due', (data) => {
         console.log('Reminder due event received:', data);
-        playAlarmAndNotify(data.reminder);
+        if (data.delivery_id) {
+            if (seenDeliveries.has(data.delivery_id)) return;
+            seenDeliveries.add(data.delivery_id);
+        }
+        playAlarmAndNotify(data.reminder, data.audio_url);
     });
 
     // Make deleteReminder available globally
@@ -353,10 +380,14 @@ document.addEventListener('DOMContentLoaded', () => {
                 });
 
                 const data = await response.json();
-                
+
                 hideTypingIndicator();
 
-                if (data.success && data.response) {
+                if (response.status === 429 || response.status === 503) {
+                    // Rate limited or shed: say when to try again rather than retrying
+                    const retryAfter = response.headers.get('Retry-After') || 'a few';
+                    addMessage(`I'm getting a lot of requests right now. Please try again in ${retryAfter} seconds.`, false);
+                } else if (data.success && data.response) {
                     addMessage(data.response, false);
                     // const audioBlob = await getSpeechFromText(data.response); // REMOVED
                     // if (audioBlob) { // REMOVED
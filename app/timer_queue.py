@@ -0,0 +1,163 @@
+"""
+In-process timer queue for reminder occurrences.
+
+A binary heap of next-fire times served by one thread. Each scheduled key
+costs one small __slots__ entry; rescheduling or cancelling marks the old
+entry dead instead of searching the heap, and dead entries are compacted
+away once they outnumber live ones.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+from logs import get_logger
+
+log = get_logger('timers')
+
+
+class _Timer:
+    __slots__ = ('due', 'seq', 'key', 'live')
+
+    def __init__(self, due: float, seq: int, key):
+        self.due = due
+        self.seq = seq
+        self.key = key
+        self.live = True
+
+    def __lt__(self, other):
+        return (self.due, self.seq) < (other.due, other.seq)
+
+
+class TimerQueue:
+    def __init__(self, callback, executor=None, name: str = 'timer-queue'):
+        """
+        callback(key) runs when a key's time comes; it is submitted to
+        executor when one is given, otherwise run on the timer thread.
+        """
+        self.callback = callback
+        self.executor = executor
+        self.name = name
+        self._heap = []
+        self._timers = {}  # key -> live _Timer
+        self._seq = itertools.count()
+        self._dead = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self.fired = 0
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def schedule(self, key, due: float):
+        """Schedules (or reschedules) key at the epoch timestamp due."""
+        with self._cond:
+            self._push(key, due)
+            if self._heap[0].key == key:
+                self._cond.notify()
+
+    def schedule_many(self, items):
+        """Schedules an iterable of (key, due) pairs with a single wakeup."""
+        with self._cond:
+            for key, due in items:
+                self._push(key, due)
+            self._cond.notify()
+
+    def cancel(self, key) -> bool:
+        with self._cond:
+            timer = self._timers.pop(key, None)
+            if timer is None:
+                return False
+            timer.live = False
+            self._dead += 1
+            self._maybe_compact()
+            return True
+
+    def next_due(self):
+        with self._cond:
+            self._drop_dead_head()
+            return self._heap[0].due if self._heap else None
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {'scheduled': len(self._timers), 'heap': len(self._heap), 'fired': self.fired}
+
+    # ------------------------------------------
+    # Internals
+    # ------------------------------------------
+    def _push(self, key, due):
+        old = self._timers.get(key)
+        if old is not None:
+            old.live = False
+            self._dead += 1
+        timer = _Timer(due, next(self._seq), key)
+        self._timers[key] = timer
+        heapq.heappush(self._heap, timer)
+        self._maybe_compact()
+
+    def _drop_dead_head(self):
+        while self._heap and not self._heap[0].live:
+            heapq.heappop(self._heap)
+            self._dead -= 1
+
+    def _maybe_compact(self):
+        if self._dead > 1024 and self._dead > len(self._timers):
+            self._heap = [t for t in self._heap if t.live]
+            heapq.heapify(self._heap)
+            self._dead = 0
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0].due <= now:
+            timer = heapq.heappop(self._heap)
+            if not timer.live:
+                self._dead -= 1
+                continue
+            del self._timers[timer.key]
+            due.append(timer.key)
+        return due
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    self._drop_dead_head()
+                    now = time.time()
+                    if self._heap and self._heap[0].due <= now:
+                        break
+                    wait = (self._heap[0].due - now) if self._heap else None
+                    self._cond.wait(wait)
+                if self._stopping:
+                    return
+                keys = self._pop_due(time.time())
+                self.fired += len(keys)
+
+            for key in keys:
+                try:
+                    if self.executor is not None:
+                        self.executor.submit(self.callback, key)
+                    else:
+                        self.callback(key)
+                except Exception:
+                    log.exception('timer.callback_failed', key=key)
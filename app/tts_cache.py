@@ -0,0 +1,224 @@
+"""
+Content-addressed cache for synthesized speech.
+
+Audio is keyed on the normalized text plus voice parameters. A small
+in-memory LRU sits in front of an on-disk tier; disk entries are read
+through mmap so hits share the OS page cache instead of copying audio
+into the Python heap, and the disk tier is evicted oldest-first once it
+grows past its size limit.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from logs import get_logger
+
+log = get_logger('tts_cache')
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text or '')).strip()
+
+
+def cache_key(text: str, voice_name: str, language_code: str, encoding: str) -> str:
+    payload = json.dumps([normalize_text(text), voice_name, language_code, encoding])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CachedAudio:
+    """A cached clip: path is set for disk-backed entries, data is a read-only buffer."""
+
+    __slots__ = ('key', 'path', 'data', 'size')
+
+    def __init__(self, key: str, data, path: str = None):
+        self.key = key
+        self.data = data
+        self.path = path
+        self.size = len(data)
+
+
+class TTSCache:
+    def __init__(self, directory: str = None, memory_bytes: int = 16 * 1024 * 1024,
+                 disk_bytes: int = 512 * 1024 * 1024, extension: str = 'mp3'):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.extension = extension
+
+        self._memory = OrderedDict()  # key -> CachedAudio
+        self._memory_size = 0
+        self._disk = OrderedDict()    # key -> size, oldest first
+        self._disk_size = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load_disk_index()
+
+    # ------------------------------------------
+    # Public API
+    # ------------------------------------------
+    def lookup(self, text, voice_name, language_code, encoding):
+        return self.get(cache_key(text, voice_name, language_code, encoding))
+
+    def store(self, text, voice_name, language_code, encoding, audio: bytes) -> CachedAudio:
+        return self.put(cache_key(text, voice_name, language_code, encoding), audio)
+
+    def contains(self, key: str) -> bool:
+        """Whether a clip is cached, without counting a lookup or loading it."""
+        with self._lock:
+            return key in self._memory or key in self._disk
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+            on_disk = key in self._disk
+
+        if on_disk:
+            entry = self._open(key)
+            if entry is not None:
+                try:
+                    os.utime(entry.path)  # keeps eviction order across restarts
+                except OSError:
+                    pass
+                with self._lock:
+                    self.disk_hits += 1
+                    self._disk.move_to_end(key)
+                    self._remember(entry)
+                return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, audio: bytes) -> CachedAudio:
+        if not audio:
+            return CachedAudio(key, audio)
+        if self.directory:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(audio)
+            os.replace(tmp, path)
+            with self._lock:
+                if key not in self._disk:
+                    self._disk[key] = len(audio)
+                    self._disk_size += len(audio)
+                self._disk.move_to_end(key)
+                self._evict_disk()
+            entry = self._open(key) or CachedAudio(key, audio)
+        else:
+            entry = CachedAudio(key, audio)
+
+        with self._lock:
+            self._remember(entry)
+        return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_size,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_size,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': ((self.memory_hits + self.disk_hits) / lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+            }
+
+    # ------------------------------------------
+    # Internals
+    # ------------------------------------------
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{self.extension}")
+
+    def _open(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            with self._lock:
+                size = self._disk.pop(key, None)
+                if size is not None:
+                    self._disk_size -= size
+            return None
+        return CachedAudio(key, memoryview(mapped), path=path)
+
+    def _remember(self, entry: CachedAudio):
+        if entry.size > self.memory_bytes:
+            return
+        old = self._memory.pop(entry.key, None)
+        if old is not None:
+            self._memory_size -= old.size
+        self._memory[entry.key] = entry
+        self._memory_size += entry.size
+        while self._memory_size > self.memory_bytes:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_size -= dropped.size
+
+    def _evict_disk(self):
+        while self._disk_size > self.disk_bytes and len(self._disk) > 1:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            self.evictions += 1
+            dropped = self._memory.pop(key, None)
+            if dropped is not None:
+                self._memory_size -= dropped.size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _load_disk_index(self):
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.' + self.extension):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found.append((st.st_mtime, name[:-len(self.extension) - 1], st.st_size))
+        for _, key, size in sorted(found):
+            self._disk[key] = size
+            self._disk_size += size
+        self._evict_disk()
+
+
+def tts_cache_from_env() -> TTSCache:
+    """Builds the TTS cache from TTS_CACHE_* environment variables."""
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tts_cache')
+    directory = os.environ.get("TTS_CACHE_DIR", default_dir)
+    cache = TTSCache(
+        directory=directory or None,
+        memory_bytes=int(os.environ.get("TTS_CACHE_MEMORY_BYTES", str(16 * 1024 * 1024))),
+        disk_bytes=int(os.environ.get("TTS_CACHE_DISK_BYTES", str(512 * 1024 * 1024))),
+    )
+    if directory:
+        log.info('tts_cache.loaded', clips=len(cache._disk), directory=directory)
+    return cache
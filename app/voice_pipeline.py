@@ -0,0 +1,85 @@
+"""
+Pipelined voice chat helpers.
+
+Splits a streamed LLM reply into sentences and synthesizes each sentence
+while the next one is still being generated, yielding audio in order.
+"""
+
+import re
+import time
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])["\')\]]*\s+')
+
+
+def split_sentences(chunks, min_chars: int = 40):
+    """
+    Re-chunks streamed text at sentence boundaries.
+
+    Short sentences are merged with the following one until at least min_chars
+    are buffered, so each TTS request carries a useful amount of speech.
+    """
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            cut = None
+            for match in _SENTENCE_END.finditer(buffer):
+                if len(buffer[:match.end()].strip()) >= min_chars:
+                    cut = match.end()
+                    break
+            if cut is None:
+                break
+            yield buffer[:cut].strip()
+            buffer = buffer[cut:]
+    if buffer.strip():
+        yield buffer.strip()
+
+
+class StageTimer:
+    """Records per-stage timings (in milliseconds) for one voice request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.timings = {}
+
+    def mark(self, stage: str):
+        """Records the time since the request started, once per stage."""
+        self.timings.setdefault(stage, round((time.perf_counter() - self.start) * 1000, 1))
+
+    def add(self, stage: str, seconds: float):
+        """Accumulates a duration under a stage."""
+        self.timings[stage] = round(self.timings.get(stage, 0.0) + seconds * 1000, 1)
+
+    def server_timing(self) -> str:
+        """Formats timings as an HTTP Server-Timing header value."""
+        return ', '.join(f"{name};dur={dur}" for name, dur in self.timings.items())
+
+
+def synthesize_pipelined(sentences, submit_tts, timer: StageTimer = None):
+    """
+    Yields (sentence, audio_bytes) in order.
+
+    submit_tts(text) must start synthesis without blocking and return an
+    object whose .result() gives the audio. Synthesis of each sentence
+    overlaps with generation of the following ones.
+    """
+    pending = []
+    for sentence in sentences:
+        if timer:
+            timer.mark('llm_first_sentence')
+        pending.append((sentence, submit_tts(sentence), time.perf_counter()))
+        while pending and pending[0][1].done():
+            yield _collect(pending.pop(0), timer)
+    if timer:
+        timer.mark('llm_done')
+    while pending:
+        yield _collect(pending.pop(0), timer)
+
+
+def _collect(item, timer):
+    sentence, call, submitted = item
+    audio = call.result()
+    if timer:
+        timer.add('tts_total', time.perf_counter() - submitted)
+        timer.mark('first_audio')
+    return sentence, audio